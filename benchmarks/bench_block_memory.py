@@ -0,0 +1,69 @@
+"""
+Benchmark of the memory used by decoded blocks, and of the access to
+their fields.
+
+Reads a capture of small enhanced packets, keeping all the decoded
+blocks in memory, and reports the memory they use (traced by
+:py:mod:`tracemalloc`) per packet, including the packet data and options
+they hold; then times reading some fields of the decoded blocks.
+
+Usage::
+
+    python benchmarks/bench_block_memory.py [number of packets]
+"""
+
+import io
+import sys
+import timeit
+import tracemalloc
+
+from pcapng import FileScanner
+from pcapng.blocks import SectionHeader, InterfaceDescription, EnhancedPacket
+
+
+def make_capture(packets):
+    """Write a capture of small packets, without options"""
+    stream = io.BytesIO()
+    shb = SectionHeader()
+    shb.write(stream)
+    shb.new_member(InterfaceDescription, link_type=1).write(stream)
+    for num in range(packets):
+        shb.new_member(EnhancedPacket, interface_id=0, timestamp_high=num,
+                       timestamp_low=num, packet_data=b'x' * 64).write(stream)
+    return stream.getvalue()
+
+
+def load_packets(capture):
+    """Read and decode all the packets of a capture"""
+    packets = []
+    for block in FileScanner(io.BytesIO(capture)):
+        if isinstance(block, EnhancedPacket):
+            block.interface_id  # Decode the block
+            packets.append(block)
+    return packets
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    capture = make_capture(count)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    packets = load_packets(capture)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('{0:<24} {1:8.1f} bytes/packet ({2} packets, 64 bytes of data)'
+          .format('decoded EnhancedPacket', (after - before) / count, count))
+
+    for name in ('interface_id', 'timestamp_low', 'packet_len',
+                 'packet_data'):
+        def run():
+            for packet in packets:
+                getattr(packet, name)
+        best = min(timeit.repeat(run, number=1, repeat=5))
+        print('{0:<24} {1:8.1f} ns/access'.format(
+            name, best / count * 10 ** 9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark of the precompiled struct cache used to read and write integers.
+
+Compares, per field, reading integers by building the format string on
+each call (as ``read_int`` used to) against going through the cache of
+precompiled structs, then times decoding all the options of an
+option-heavy capture.
+
+Usage::
+
+    python benchmarks/bench_struct_cache.py [number of packets]
+"""
+
+import io
+import struct
+import sys
+import timeit
+
+from pcapng import FileScanner
+from pcapng.blocks import SectionHeader, InterfaceDescription, EnhancedPacket
+from pcapng.structs import INT_FORMATS, int_struct, read_bytes, read_int
+
+
+def legacy_read_int(stream, size, signed=False, endianness='='):
+    """``read_int``, as it was before the struct cache"""
+    fmt = INT_FORMATS.get(size)
+    fmt = fmt.lower() if signed else fmt.upper()
+    assert endianness in '<>!='
+    fmt = endianness + fmt
+    size_bytes = size // 8
+    data = read_bytes(stream, size_bytes)
+    return struct.unpack(fmt, data)[0]
+
+
+def legacy_unpack_int(data, size, signed=False, endianness='='):
+    """Decoding part of the legacy ``read_int``"""
+    fmt = INT_FORMATS.get(size)
+    fmt = fmt.lower() if signed else fmt.upper()
+    return struct.unpack(endianness + fmt, data)[0]
+
+
+def cached_unpack_int(data, size, signed=False, endianness='='):
+    """Decoding part of ``read_int``"""
+    return int_struct(size, signed, endianness).unpack(data)[0]
+
+
+def make_capture(packets):
+    """Write a capture whose blocks carry lots of options"""
+    stream = io.BytesIO()
+    shb = SectionHeader(options={
+        'shb_hardware': 'x86_64', 'shb_os': 'Linux',
+        'shb_userappl': 'benchmark'})
+    shb.write(stream)
+    shb.new_member(InterfaceDescription, link_type=1, options={
+        'if_name': 'eth0', 'if_description': 'Benchmark interface',
+        'if_speed': 10 ** 9, 'if_tsresol': b'\x09', 'if_tzone': 0,
+        'if_fcslen': 4, 'if_tsoffset': 0, 'if_os': 'Linux',
+    }).write(stream)
+    for num in range(packets):
+        shb.new_member(EnhancedPacket, interface_id=0, timestamp_high=num,
+                       timestamp_low=num, packet_data=b'x' * 64, options={
+                           'opt_comment': 'packet {0}'.format(num),
+                           'epb_flags': 0x1,
+                           'epb_dropcount': num,
+                       }).write(stream)
+    return stream.getvalue()
+
+
+def decode_options(data):
+    for block in FileScanner(io.BytesIO(data)):
+        for key in block.options:
+            block.options[key]
+
+
+def main():
+    packets = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    fields = 100000
+    data = struct.pack('<I', 0x12345678) * fields
+
+    def time_fields(name, run):
+        best = min(timeit.repeat(run, number=1, repeat=5))
+        print('{0:<20} {1:8.1f} ns/field'.format(
+            name, best / fields * 10 ** 9))
+
+    for name, func in [('legacy read_int', legacy_read_int),
+                       ('cached read_int', read_int)]:
+        def run():
+            stream = io.BytesIO(data)
+            for _ in range(fields):
+                func(stream, 32, False, '<')
+        time_fields(name, run)
+
+    raw = data[:4]
+    for name, func in [('legacy unpack only', legacy_unpack_int),
+                       ('cached unpack only', cached_unpack_int)]:
+        def run():
+            for _ in range(fields):
+                func(raw, 32, False, '<')
+        time_fields(name, run)
+
+    capture = make_capture(packets)
+    best = min(timeit.repeat(lambda: decode_options(capture),
+                             number=1, repeat=3))
+    print('{0:<20} {1:8.1f} us/packet ({2} packets, all options decoded)'
+          .format('option-heavy file', best / packets * 10 ** 6, packets))
+
+
+if __name__ == '__main__':
+    main()
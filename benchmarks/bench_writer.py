@@ -0,0 +1,75 @@
+"""
+Benchmark of writing captures.
+
+Reads a capture of small enhanced packets, then times writing all its
+blocks out, one ``Block.write()`` call at a time and through a
+:py:class:`~pcapng.FileWriter`; reading the capture is timed as well, for
+comparison.
+
+Usage::
+
+    python benchmarks/bench_writer.py [number of packets]
+"""
+
+import io
+import sys
+import timeit
+
+from pcapng import FileScanner, FileWriter
+from pcapng.blocks import SectionHeader, InterfaceDescription, EnhancedPacket
+
+
+def make_capture(packets):
+    """Write a capture of small packets, some of them with options"""
+    stream = io.BytesIO()
+    shb = SectionHeader()
+    shb.write(stream)
+    shb.new_member(InterfaceDescription, link_type=1).write(stream)
+    for num in range(packets):
+        options = {}
+        if num % 10 == 0:
+            options['opt_comment'] = 'packet {0}'.format(num)
+        shb.new_member(EnhancedPacket, interface_id=0, timestamp_high=num,
+                       timestamp_low=num, packet_data=b'x' * 64,
+                       options=options).write(stream)
+    return stream.getvalue()
+
+
+def read_blocks(capture):
+    blocks = []
+    for block in FileScanner(io.BytesIO(capture)):
+        block.options  # Decode the block
+        blocks.append(block)
+    return blocks
+
+
+def write_blocks(blocks):
+    out = io.BytesIO()
+    for block in blocks:
+        block.write(out)
+    return out
+
+
+def write_buffered(blocks):
+    out = io.BytesIO()
+    with FileWriter(out) as writer:
+        writer.write_blocks(blocks)
+    return out
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    capture = make_capture(count)
+    blocks = read_blocks(capture)
+    assert write_buffered(blocks).getvalue() == capture
+
+    for name, run in [('read', lambda: read_blocks(capture)),
+                      ('Block.write()', lambda: write_blocks(blocks)),
+                      ('FileWriter', lambda: write_buffered(blocks))]:
+        best = min(timeit.repeat(run, number=1, repeat=3))
+        print('{0:<16} {1:8.2f} us/packet ({2} packets)'.format(
+            name, best / count * 10 ** 6, count))
+
+
+if __name__ == '__main__':
+    main()
@@ -18,5 +18,5 @@ if __name__ == '__main__':
             dump_information(scanner)
 
     else:
-        scanner = pcapng.FileScanner(sys.stdin)
+        scanner = pcapng.FileScanner(getattr(sys.stdin, 'buffer', sys.stdin))
         dump_information(scanner)
@@ -251,7 +251,7 @@ def main():
             scanner = pcapng.FileScanner(fp)
             dump_information(scanner)
     else:
-        scanner = pcapng.FileScanner(sys.stdin)
+        scanner = pcapng.FileScanner(getattr(sys.stdin, 'buffer', sys.stdin))
         dump_information(scanner)
 
 
@@ -40,7 +40,7 @@ def human_number(num, k=1000):
 
 if __name__ == '__main__':
     import sys
-    rdr = FileScanner(sys.stdin)
+    rdr = FileScanner(getattr(sys.stdin, 'buffer', sys.stdin))
 
     ip_src_count = Counter()
     ip_dst_count = Counter()
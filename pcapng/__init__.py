@@ -4,4 +4,5 @@
 # See: http://www.winpcap.org/ntar/draft/PCAP-DumpFileFormat.html
 # ----------------------------------------------------------------------
 
-from .scanner import FileScanner  # noqa
+from .scanner import BlockParser, FileScanner  # noqa
+from .writer import FileWriter  # noqa
@@ -0,0 +1,76 @@
+"""
+Module providing an asyncio version of the
+:py:class:`~pcapng.scanner.FileScanner`.
+
+This module requires Python 3.5 or later.
+
+Example usage:
+
+    .. code-block:: python
+
+        import asyncio
+
+        from pcapng.aio import AsyncFileScanner
+
+        async def main(host, port):
+            reader, writer = await asyncio.open_connection(host, port)
+            async for block in AsyncFileScanner(reader):
+                pass  # do something with the block...
+"""
+
+from pcapng.exceptions import StreamEmpty, TruncatedFile
+from pcapng.readers import DEFAULT_BUFFER_SIZE
+from pcapng.scanner import BlockParser
+
+
+class AsyncFileScanner(BlockParser):
+    """
+    pcap-ng scanner reading from an asynchronous stream.
+
+    This object can be iterated with ``async for`` to get blocks out of an
+    :py:class:`asyncio.StreamReader`, or any object providing a
+    ``read(size)`` coroutine returning an empty bytes object at the end of
+    the stream (as asynchronous file libraries do). Blocks are decoded by
+    the same classes as with :py:class:`~pcapng.scanner.FileScanner`, and
+    returned as soon as they are complete.
+
+    :param stream:
+        the asynchronous stream from which to read the data.
+
+    :param buffer_size:
+        maximum amount of data requested from the stream at once.
+
+    The ``headers_only``, ``block_types``, ``interfaces``, ``section`` and
+    ``zero_copy`` arguments are the same as for
+    :py:class:`~pcapng.scanner.BlockParser`.
+    """
+    __slots__ = [ 'stream', 'buffer_size' ]
+
+    def __init__(self, stream, buffer_size=DEFAULT_BUFFER_SIZE,
+                 headers_only=False, block_types=None, interfaces=None,
+                 section=None, zero_copy=False):
+        super(AsyncFileScanner, self).__init__(
+            headers_only=headers_only, block_types=block_types,
+            interfaces=interfaces, section=section, zero_copy=zero_copy)
+        self.stream = stream
+        self.buffer_size = buffer_size
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            try:
+                block = self._read_block()
+            except (StreamEmpty, TruncatedFile):
+                chunk = await self.stream.read(self.buffer_size)
+                if not chunk:
+                    self.close()
+                    raise StopAsyncIteration
+                self._reader.feed(chunk)
+                continue
+            if block is not None:
+                return block
+
+    def feed(self, data):
+        raise TypeError('AsyncFileScanner reads its data from its stream')
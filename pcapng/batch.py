@@ -0,0 +1,125 @@
+"""
+Module providing columnar batches of packets, as returned by
+:py:meth:`~pcapng.scanner.FileScanner.iter_batches`.
+
+Rather than one block object per packet, a batch holds one array per
+packet field, and the data of all its packets in a single buffer. Packet
+headers are decoded straight from the raw block data, so no block object
+gets built at all; this is much cheaper for jobs going over every packet
+of large captures, and the arrays can be handed over as is to code
+working on whole columns (eg. ``numpy.frombuffer``).
+"""
+
+import struct
+from array import array
+
+from pcapng.constants.block_types import (
+    BLK_PACKET, BLK_PACKET_SIMPLE, BLK_ENHANCED_PACKET)
+from pcapng.utils import timestamp_to_ns
+
+
+# Default number of packets per batch
+DEFAULT_BATCH_SIZE = 4096
+
+# Block types collected into batches
+BATCH_BLOCK_TYPES = (BLK_ENHANCED_PACKET, BLK_PACKET, BLK_PACKET_SIMPLE)
+
+# Fixed-size headers of the packet blocks, by endianness: interface id,
+# (drops count,) timestamp (high and low), captured length, packet length
+_ENHANCED_HEADERS = dict(
+    (endianness, struct.Struct(endianness + 'IIIII')) for endianness in '<>')
+_OBSOLETE_HEADERS = dict(
+    (endianness, struct.Struct(endianness + 'HHIIII')) for endianness in '<>')
+_SIMPLE_HEADERS = dict(
+    (endianness, struct.Struct(endianness + 'I')) for endianness in '<>')
+
+
+class PacketBatch(object):
+    """
+    Batch of packets, stored as columns.
+
+    All columns have one item per packet. The data of packet ``num`` is
+    ``data[offsets[num]:offsets[num] + captured_lens[num]]``.
+
+    :ivar timestamps: ``array('Q')`` of the packet timestamps, as integer
+        nanoseconds since the epoch (zero for simple packets, which have
+        no timestamp)
+    :ivar captured_lens: ``array('I')`` of the captured lengths
+    :ivar packet_lens: ``array('I')`` of the original packet lengths
+    :ivar interface_ids: ``array('I')`` of the interface ids, within the
+        section the packet belongs to
+    :ivar offsets: ``array('Q')`` of the offsets of the packet data in
+        ``data``
+    :ivar data: a :py:class:`bytearray` holding the data of all the
+        packets. It stays empty in ``headers_only`` mode.
+    """
+    __slots__ = [ 'timestamps', 'captured_lens', 'packet_lens',
+                  'interface_ids', 'offsets', 'data' ]
+
+    def __init__(self):
+        self.timestamps = array('Q')
+        self.captured_lens = array('I')
+        self.packet_lens = array('I')
+        self.interface_ids = array('I')
+        self.offsets = array('Q')
+        self.data = bytearray()
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __repr__(self):
+        return '<PacketBatch ({0} packets, {1} bytes of data)>'.format(
+            len(self), len(self.data))
+
+    def packet_data(self, num):
+        """Get the data of a packet, as a bytes object"""
+        offset = self.offsets[num]
+        return bytes(self.data[offset:offset + self.captured_lens[num]])
+
+    def append(self, block_type, data, section, copy_data=True):
+        """
+        Append a packet, decoding its header from the raw block payload.
+
+        :param block_type: the block type code, one of
+            :py:data:`BATCH_BLOCK_TYPES`
+        :param data: the raw block payload
+        :param section: the :py:class:`~pcapng.blocks.SectionHeader` the
+            block belongs to, with its interfaces registered
+        :param copy_data: whether to copy the packet data into the batch
+        """
+        endianness = section.endianness
+        if block_type == BLK_ENHANCED_PACKET:
+            interface_id, high, low, captured_len, packet_len = \
+                _ENHANCED_HEADERS[endianness].unpack_from(data)
+            start = 20
+        elif block_type == BLK_PACKET:
+            interface_id, _, high, low, captured_len, packet_len = \
+                _OBSOLETE_HEADERS[endianness].unpack_from(data)
+            start = 20
+        elif block_type == BLK_PACKET_SIMPLE:
+            packet_len, = _SIMPLE_HEADERS[endianness].unpack_from(data)
+            interface_id = high = low = 0
+            captured_len = packet_len
+            snaplen = section.interfaces[0].snaplen
+            if snaplen:
+                captured_len = min(captured_len, snaplen)
+            start = 4
+        else:
+            raise ValueError(
+                'Not a packet block type: 0x{0:08x}'.format(block_type))
+
+        timestamp = 0
+        if block_type != BLK_PACKET_SIMPLE:
+            interface = section.interfaces.get(interface_id)
+            if interface is not None:
+                timestamp = interface.timestamp_converter.split_to_ns(
+                    high, low)
+            else:
+                timestamp = timestamp_to_ns((high << 32) + low)
+        self.timestamps.append(timestamp)
+        self.captured_lens.append(captured_len)
+        self.packet_lens.append(packet_len)
+        self.interface_ids.append(interface_id)
+        self.offsets.append(len(self.data))
+        if copy_data:
+            self.data += data[start:start + captured_len]
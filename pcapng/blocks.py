@@ -18,18 +18,85 @@ import six
 import pcapng.strictness as strictness
 import pcapng.exceptions as exceptions
 from pcapng.structs import (
-    write_bytes_padded, write_int, block_decode, struct_decode,
-    IntField, OptionsField, RawBytes, PacketBytes, EPBFlags,
+    write_bytes_padded, write_int, compile_schema,
+    stream_from_buffer,
+    IntField, OptionsField, RawBytes, PacketBytes,
+    SkippedData, EPBFlags,
     Options, Option, ListField, NameResolutionRecordField)
 from pcapng.constants import link_types
-from pcapng.utils import unpack_timestamp_resolution
+from pcapng.utils import TimestampConverter
 
 
 KNOWN_BLOCKS = {}
 
 
+class BlockMeta(type):
+    """
+    Metaclass of the blocks, generating slots to store the fields of their
+    schema.
+
+    Each field of the schema of a block class gets a slot of the same
+    name, unless the name is taken by an attribute of the class (eg. the
+    ``packet_len`` property of packet blocks), in which case the field is
+    stored in a slot prefixed with an underscore (eg. ``_packet_len``).
+    The slots of the fields are listed in ``_field_slots``: ``{<field
+    name>: <slot name>}``.
+
+    The schema is also compiled (see
+    :py:func:`~pcapng.structs.compile_schema`) into the ``_decoder`` of
+    the class, and into its ``_headers_decoder``, which skips the packet
+    data.
+    """
+
+    def __new__(mcs, name, bases, namespace):
+        field_slots = {}
+        for base in reversed(bases):
+            field_slots.update(getattr(base, '_field_slots', {}))
+        new_slots = []
+        for field_name, field, default in namespace.get('schema', []):
+            if field_name in field_slots:
+                continue
+            slot = field_name
+            if (field_name in namespace or
+                    any(hasattr(base, field_name) for base in bases)):
+                slot = '_' + field_name
+            field_slots[field_name] = slot
+            new_slots.append(slot)
+        if '__slots__' in namespace:
+            namespace['__slots__'] = list(namespace['__slots__']) + new_slots
+        elif new_slots:
+            # Keep the instance dictionary of classes not declaring slots,
+            # unless a base already provides it
+            namespace['__slots__'] = new_slots
+            if not any(base.__dictoffset__ for base in bases):
+                namespace['__slots__'].append('__dict__')
+        namespace['_field_slots'] = field_slots
+        cls = super(BlockMeta, mcs).__new__(mcs, name, bases, namespace)
+        # Setters of the slots, bypassing __setattr__()
+        cls._field_setters = dict(
+            (field_name, getattr(cls, slot).__set__)
+            for field_name, slot in field_slots.items())
+        if 'schema' in namespace:
+            schema = namespace['schema']
+            decoder = compile_schema(schema)
+            headers_decoder = decoder
+            if any(isinstance(field, PacketBytes) for _, field, _ in schema):
+                headers_decoder = compile_schema(schema, headers_only=True)
+            cls._decoder = staticmethod(decoder)
+            cls._headers_decoder = staticmethod(headers_decoder)
+        return cls
+
+
+@six.add_metaclass(BlockMeta)
 class Block(object):
-    """Base class for blocks"""
+    """
+    Base class for blocks
+
+    The fields of the schema are stored in slots (see
+    :py:class:`BlockMeta`), filled in when the block is decoded: blocks
+    read from a file are only decoded when one of their fields is first
+    accessed.
+    """
 
     schema = []
     readonly_fields = set()
@@ -37,20 +104,21 @@ class Block(object):
             # These are in addition to the above two properties
             'magic_number',
             '_raw',
-            '_decoded',
+            '_extra',
     ]
 
     def __init__(self, **kwargs):
+        self._extra = None
         if 'raw' in kwargs:
             self._raw = kwargs['raw']
-            self._decoded = None
         else:
-            self._decoded = {}
+            self._raw = None
+            setters = self._field_setters
             for key, packed_type, default in self.schema:
                 if key == 'options':
-                    self._decoded[key] = Options(schema=packed_type.options_schema, data={}, endianness='=')
-                else:
-                    self._decoded[key] = default
+                    default = Options(schema=packed_type.compiled_schema,
+                                      data={}, endianness='=')
+                setters[key](self, default)
             for aky, avl in kwargs.items():
                 if aky == 'options':
                     for oky, ovl in avl.items():
@@ -60,9 +128,15 @@ class Block(object):
 
     def _decode(self):
         """Decodes the raw data of this block into its fields"""
-        stream = six.BytesIO(self._raw)
-        self._decoded = block_decode(self, stream)
-        del self._raw
+        stream = stream_from_buffer(self._raw)
+        self._store(self._decoder(stream, self.section.endianness))
+        self._raw = None
+
+    def _store(self, decoded):
+        """Store decoded fields in their slots"""
+        setters = self._field_setters
+        for name, value in decoded.items():
+            setters[name](self, value)
 
     def write(self, outstream):
         """Writes this block into the given output stream"""
@@ -73,10 +147,11 @@ class Block(object):
         block_length = 12 + subblock_length
         if subblock_length % 4 != 0:
             block_length += (4 - (subblock_length % 4))
-        write_int(self.magic_number, outstream, 32)
-        write_int(block_length, outstream, 32)
+        endianness = self.section.endianness
+        write_int(self.magic_number, outstream, 32, endianness=endianness)
+        write_int(block_length, outstream, 32, endianness=endianness)
         write_bytes_padded(outstream, encoded_block)
-        write_int(block_length, outstream, 32)
+        write_int(block_length, outstream, 32, endianness=endianness)
 
     def _encode(self, outstream):
         """Encodes the fields of this block into raw data"""
@@ -85,29 +160,37 @@ class Block(object):
 
     def __getattr__(self, name):
         # __getattr__ is only called when getting an attribute that
-        # this object doesn't have.
+        # this object doesn't have: the fields are missing until decoded.
+        if name in ('_raw', '_extra'):
+            # Blocks not initialized by Block.__init__()
+            raise AttributeError(name)
+        if self._raw is not None:
+            self._decode()
+            return getattr(self, name)
         try:
-            if self._decoded is None:
-                self._decode()
-            return self._decoded[name]
-        except KeyError:
+            return self._extra[name]
+        except (KeyError, TypeError):
             raise AttributeError(name)
 
     def __setattr__(self, name, value):
         # __setattr__ is called for *any* attribute, real or not.
+        if name in self.readonly_fields:
+            raise AttributeError("'{cls}' object property '{prop}' is read-only".format(prop=name, cls=self.__class__.__name__))
+        setter = self._field_setters.get(name)
+        if setter is not None:
+            if self._raw is not None:
+                # Don't lose the other fields
+                self._decode()
+            return setter(self, value)
         try:
             # See it if it names an attribute we defined in our __slots__
             return object.__setattr__(self, name, value)
         except AttributeError:
-            # It's not an attribute, proceed with our nice interface to the schema
+            # Keep it along with the fields
             pass
-        if name in self.readonly_fields:
-            raise AttributeError("'{cls}' object property '{prop}' is read-only".format(prop=name, cls=self.__class__.__name__))
-        if self._decoded is None:
-            self._decoded = {}
-            for key, packed_type, default in self.schema:
-                self._decoded[key] = None
-        self._decoded[name] = value
+        if self._extra is None:
+            self._extra = {}
+        self._extra[name] = value
 
     def __repr__(self):
         args = []
@@ -130,7 +213,9 @@ class SectionMemberBlock(Block):
         self.section = section
 
 def register_block(block):
-    """Handy decorator to register a new known block type"""
+    """
+    Handy decorator to register a new known block type.
+    """
     KNOWN_BLOCKS[block.magic_number] = block
     return block
 
@@ -230,7 +315,7 @@ class InterfaceDescription(SectionMemberBlock):
     unless otherwise noted.
     """
     magic_number = 0x00000001
-    __slots__ = []
+    __slots__ = [ '_timestamp_cache' ]
     schema = [
         ('link_type', IntField(16, False), 0),  # todo: enc/decode
         ('reserved', IntField(16, False), 0),
@@ -252,7 +337,38 @@ class InterfaceDescription(SectionMemberBlock):
             Option(15, 'if_hardware', 'string'),
         ]), None)]
 
-    @property  # todo: cache this property
+    def __init__(self, section, **kwargs):
+        self._timestamp_cache = None
+        super(InterfaceDescription, self).__init__(section, **kwargs)
+
+    @property
+    def timestamp_converter(self):
+        """
+        The :py:class:`~pcapng.utils.TimestampConverter` for the timestamps
+        of this interface.
+
+        It is only created again when the ``if_tsresol`` or ``if_tsoffset``
+        options are changed.
+        """
+        options = self.options
+        # The lists of values of the options, which are replaced when the
+        # options are set or deleted
+        tsresol = tsoffset = None
+        if 'if_tsresol' in options:
+            tsresol = options.get_all('if_tsresol')
+        if 'if_tsoffset' in options:
+            tsoffset = options.get_all('if_tsoffset')
+        cache = self._timestamp_cache
+        if (cache is None or cache[0] is not tsresol
+                or cache[1] is not tsoffset):
+            converter = TimestampConverter(
+                tsresol[0] if tsresol else None,
+                tsoffset[0] if tsoffset else 0)
+            cache = (tsresol, tsoffset, converter)
+            self._timestamp_cache = cache
+        return cache[2]
+
+    @property
     def timestamp_resolution(self):
         # ------------------------------------------------------------
         # Resolution of timestamps. If the Most Significant Bit is
@@ -266,11 +382,7 @@ class InterfaceDescription(SectionMemberBlock):
         # (i.e. timestamps have the same resolution of the standard
         # 'libpcap' timestamps).
         # ------------------------------------------------------------
-
-        if 'if_tsresol' in self.options:
-            return unpack_timestamp_resolution(self.options['if_tsresol'])
-
-        return 1e-6
+        return self.timestamp_converter.resolution
 
     @property
     def statistics(self):
@@ -298,6 +410,17 @@ class BlockWithTimestampMixin(object):
         return (((self.timestamp_high << 32) + self.timestamp_low)
                 * self.timestamp_resolution)
 
+    @property
+    def timestamp_ns(self):
+        """
+        The timestamp, as an integer number of nanoseconds since the epoch.
+
+        Unlike :py:attr:`timestamp`, this is exact, and applies the
+        ``if_tsoffset`` option of the interface.
+        """
+        return self.interface.timestamp_converter.split_to_ns(
+            self.timestamp_high, self.timestamp_low)
+
     @property
     def timestamp_resolution(self):
         return self.interface.timestamp_resolution
@@ -340,11 +463,29 @@ class BasePacketBlock(
 
     This class makes the ``captured_len`` a read-only property returning
     the current length of the packet data.
+
+    Packet blocks read with ``headers_only=True`` skip their packet data
+    when decoded: ``packet_data`` is then a
+    :py:class:`~pcapng.structs.SkippedData` placeholder, only telling the
+    length of the data, while all the other fields (options included) are
+    available as usual.
     """
 
-    __slots__ = []
+    __slots__ = [ '_headers_only' ]
     readonly_fields = set(('captured_len',))
 
+    def __init__(self, section, headers_only=False, **kwargs):
+        self._headers_only = headers_only
+        super(BasePacketBlock, self).__init__(section, **kwargs)
+
+    def _decode(self):
+        """Decodes the raw data of this block into its fields"""
+        if not self._headers_only:
+            return super(BasePacketBlock, self)._decode()
+        stream = stream_from_buffer(self._raw)
+        self._store(self._headers_decoder(stream, self.section.endianness))
+        self._raw = None
+
     @property
     def captured_len(self):
         return len(self.packet_data)
@@ -355,7 +496,7 @@ class BasePacketBlock(
     # the captured data length.
     @property
     def packet_len(self):
-        plen = self.__getattr__('packet_len') or 0 # this call prevents recursion
+        plen = self._packet_len or 0  # the field, hidden by this property
         return max(plen, len(self.packet_data))
 
 
@@ -401,14 +542,28 @@ class SimplePacket(BasePacketBlock):
 
     readonly_fields = set(('captured_len', 'interface_id'))
 
+    # Decoder of the fields which can be decoded before knowing
+    # ``captured_len``
+    _header_decoder = staticmethod(compile_schema(schema[:1]))
+
     def _decode(self):
         """Decodes the raw data of this block into its fields"""
-        stream = six.BytesIO(self._raw)
-        self._decoded = struct_decode(self.schema[:1], stream, self.section.endianness)
-        # Now we can get our ``captured_len`` property which is required
-        # to really know how much data we can load
-        self._decoded['packet_data'] = RawBytes(self.captured_len).load(stream, self.section.endianness)
-        del self._raw
+        stream = stream_from_buffer(self._raw)
+        decoded = self._header_decoder(stream, self.section.endianness)
+        # Now we can get our ``captured_len`` which is required to really
+        # know how much data we can load (as the property does, which
+        # can't be used before the packet data is loaded)
+        captured_len = decoded['packet_len']
+        snap_len = self.interface.snaplen
+        if snap_len:
+            captured_len = min(snap_len, captured_len)
+        if self._headers_only:
+            decoded['packet_data'] = SkippedData(captured_len)
+        else:
+            decoded['packet_data'] = RawBytes(captured_len).load(
+                stream, self.section.endianness)
+        self._store(decoded)
+        self._raw = None
 
 
     @property
@@ -0,0 +1,242 @@
+"""
+Module providing transparent decompression of compressed captures.
+
+Captures compressed with gzip, bzip2 or xz are recognized by their magic
+bytes, and read through the decompressors from the standard library. The
+decompression can run in a background thread, so that it overlaps with
+the decoding of blocks (the decompressors release the GIL while working).
+"""
+
+import bz2
+import gzip
+import threading
+
+from six.moves import queue
+
+try:
+    import lzma
+except ImportError:  # Python 2
+    lzma = None
+
+
+GZIP_MAGIC = b'\x1f\x8b'
+BZIP2_MAGIC = b'BZh'
+XZ_MAGIC = b'\xfd7zXZ\x00'
+
+# Amount of decompressed data produced at once by the background thread
+DECOMPRESS_CHUNK_SIZE = 1024 * 1024
+
+# Number of decompressed chunks the background thread can get ahead
+DECOMPRESS_QUEUE_SIZE = 8
+
+
+def sniff_compression(data):
+    """
+    Recognize the compression format of some data, from its first bytes.
+
+    :param data: the first (at least 6) bytes of the data
+    :returns: one of ``'gzip'``, ``'bz2'`` or ``'xz'``, or ``None`` if the
+        data doesn't look compressed
+    """
+    if data.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if data.startswith(BZIP2_MAGIC):
+        return 'bz2'
+    if data.startswith(XZ_MAGIC):
+        return 'xz'
+    return None
+
+
+def open_decompressed(stream, threaded=True,
+                      chunk_size=DECOMPRESS_CHUNK_SIZE):
+    """
+    Get a stream of the decompressed data of a stream, if it is compressed.
+
+    The first bytes of the stream are peeked at (without consuming them,
+    when the stream allows it) to recognize its compression format.
+
+    :param stream: a binary file-like object
+    :param threaded: whether to decompress in a background thread (see
+        :py:class:`ThreadedReader`)
+    :param chunk_size: amount of data decompressed at once
+    :returns: a stream of the decompressed data, or a stream of the
+        original data if it is not compressed
+    """
+    head, stream = _peek(stream, len(XZ_MAGIC))
+    compression = sniff_compression(head)
+    if compression is None:
+        return stream
+
+    if compression == 'gzip':
+        # Handles multi-member files, as produced by eg. pigz
+        decompressed = gzip.GzipFile(fileobj=stream, mode='rb')
+    elif compression == 'bz2':
+        decompressed = bz2.BZ2File(stream, mode='rb')
+    else:
+        if lzma is None:
+            raise ValueError('xz compressed captures require the lzma module')
+        decompressed = lzma.LZMAFile(stream, mode='rb')
+
+    if threaded:
+        return ThreadedReader(decompressed, chunk_size)
+    return decompressed
+
+
+def _peek(stream, size):
+    """
+    Get the first bytes of a stream.
+
+    :returns: a ``(data, stream)`` tuple, where ``stream`` still provides
+        the peeked bytes
+    """
+    if hasattr(stream, 'peek'):
+        return stream.peek(size)[:size], stream
+    try:
+        position = stream.tell()
+        data = stream.read(size)
+        stream.seek(position)
+        return data, stream
+    except (AttributeError, IOError, OSError, ValueError):
+        pass
+    data = stream.read(size)
+    return data, PrefixedReader(data, stream)
+
+
+class PrefixedReader(object):
+    """
+    Stream returning some data, then the data of another stream. Used to
+    put back data peeked out of non-seekable streams.
+
+    :param prefix: the data to return first
+    :param stream: the stream to read once the prefix was read
+    """
+    __slots__ = [ 'prefix', 'stream' ]
+
+    def __init__(self, prefix, stream):
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, size=-1):
+        if not self.prefix:
+            return self.stream.read(size)
+        if size is None or size < 0:
+            data, self.prefix = self.prefix + self.stream.read(), b''
+            return data
+        data, self.prefix = self.prefix[:size], self.prefix[size:]
+        return data
+
+
+class ThreadedReader(object):
+    """
+    Read-only stream reading another stream from a background thread.
+
+    The thread reads chunks of data ahead, while the consumer is busy with
+    the previous ones. This is useful with streams doing some CPU-heavy
+    work which releases the GIL, such as decompressing data.
+
+    :param stream: the stream to read from
+    :param chunk_size: amount of data read from the stream at once
+    :param queue_size: maximum number of chunks read ahead
+    """
+    __slots__ = [ 'stream', 'chunk_size', '_queue', '_thread', '_chunk',
+                  '_position', '_closed', '_eof' ]
+
+    def __init__(self, stream, chunk_size=DECOMPRESS_CHUNK_SIZE,
+                 queue_size=DECOMPRESS_QUEUE_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self._queue = queue.Queue(queue_size)
+        self._chunk = b''
+        self._position = 0
+        self._closed = threading.Event()
+        self._eof = False
+        # The thread doesn't reference the reader, so that a reader which
+        # is dropped without being closed still gets collected, and its
+        # thread stopped (see __del__)
+        self._thread = threading.Thread(
+            target=_read_ahead,
+            args=(stream, chunk_size, self._queue, self._closed))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _next_chunk(self):
+        if self._eof:
+            return b''
+        item = self._queue.get()
+        if isinstance(item, Exception):
+            self._eof = True
+            raise item
+        if not item:
+            self._eof = True
+        return item
+
+    def read1(self, size=-1):
+        """Read up to ``size`` bytes, waiting for at most one chunk"""
+        if not self._chunk:
+            self._chunk = self._next_chunk()
+        if size is None or size < 0:
+            size = len(self._chunk)
+        data, self._chunk = self._chunk[:size], self._chunk[size:]
+        self._position += len(data)
+        return data
+
+    def read(self, size=-1):
+        """Read ``size`` bytes (or all the data), unless at the end"""
+        parts = []
+        while size is None or size < 0 or size > 0:
+            data = self.read1(-1 if size is None or size < 0 else size)
+            if not data:
+                break
+            parts.append(data)
+            if size is not None and size >= 0:
+                size -= len(data)
+        return b''.join(parts)
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        """Stop the background thread, and close the stream"""
+        self._closed.set()
+        self._thread.join()
+        self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        # Only stop the thread: it may be busy reading the stream, which
+        # it will then leave alone
+        closed = getattr(self, '_closed', None)
+        if closed is not None:
+            closed.set()
+
+
+def _read_ahead(stream, chunk_size, chunks, closed):
+    """
+    Body of the thread of a :py:class:`ThreadedReader`: read chunks of the
+    stream into the ``chunks`` queue, until the end of the stream (marked
+    by an empty chunk) or an error (put in the queue), or until ``closed``
+    is set.
+    """
+    try:
+        while not closed.is_set():
+            chunk = stream.read(chunk_size)
+            if not _put(chunks, chunk, closed) or not chunk:
+                return
+    except Exception as error:
+        _put(chunks, error, closed)
+
+
+def _put(chunks, item, closed):
+    """Put an item in the queue, unless ``closed`` gets set first"""
+    while not closed.is_set():
+        try:
+            chunks.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
@@ -60,3 +60,11 @@ class BadMagic(PcapngLoadError):
     byte order marker).
     """
     pass
+
+
+class BadIndex(PcapngLoadError):
+    """
+    Exception used to indicate that a block index file is invalid,
+    or doesn't match the capture file it is used with.
+    """
+    pass
@@ -1,5 +1,13 @@
 """
 Module to wrap an integer in bitwise flag/field accessors.
+
+The layout of the flags is described by a list of :py:class:`FlagField`.
+Classes wrapping a given kind of flag word (such as
+:py:class:`~pcapng.structs.EPBFlags`) declare it once, as their
+``flag_schema``: it gets compiled, on first use, into accessors shared by
+all the instances, so that each instance only holds an integer. The same
+layout can be used to query many raw flag words at once (see
+:py:meth:`FlagWord.count`).
 """
 
 from collections import OrderedDict
@@ -10,6 +18,10 @@ class FlagBase(object):
     """\
     Base class for flag types to be used in a Flags object.
     Handles the bitwise math so subclasses don't have to worry about it.
+
+    Flags are descriptors of the :py:class:`FlagWord` class they are
+    part of: getting or setting them on an instance reads or updates its
+    value.
     """
 
     __slots__ = [
@@ -31,28 +43,45 @@ class FlagBase(object):
         self.extra = extra
         self.mask = ((1 << self.size)-1) << self.offset
 
-    def get_bits(self):
-        return (self.owner._value & self.mask) >> self.offset
+    def get_bits(self, word):
+        return (word & self.mask) >> self.offset
 
-    def set_bits(self, val):
+    def set_bits(self, word, val):
         val &= (1 << self.size) - 1
-        self.owner._value &= ~self.mask
-        self.owner._value |= (val << self.offset)
+        return (word & ~self.mask) | (val << self.offset)
+
+    def get(self, word):
+        """Get the value of this flag, out of a flag word"""
+        return self.get_bits(word)
+
+    def set(self, word, val):
+        """Get a flag word, with this flag set to the given value"""
+        return self.set_bits(word, val)
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return self.get(instance._value)
+
+    def __set__(self, instance, val):
+        instance._value = self.set(instance._value, val)
 
 
 class FlagBool(FlagBase):
     """Object representing a single boolean flag"""
 
+    __slots__ = []
+
     def __init__(self, owner, offset, size, extra=None):
         if size != 1:
             raise TypeError('{cls} can only be 1 bit in size'.format(cls=self.__class__.__name__))
         super(FlagBool, self).__init__(owner, offset, size)
 
-    def get(self):
-        return bool(self.get_bits())
+    def get(self, word):
+        return bool(self.get_bits(word))
 
-    def set(self, val):
-        self.set_bits(int(bool(val)))
+    def set(self, word, val):
+        return self.set_bits(word, int(bool(val)))
 
 
 class FlagUInt(FlagBase):
@@ -61,11 +90,7 @@ class FlagUInt(FlagBase):
     a larger bitfield
     """
 
-    def get(self):
-        return self.get_bits()
-
-    def set(self, val):
-        self.set_bits(val)
+    __slots__ = []
 
 
 class FlagEnum(FlagBase):
@@ -74,6 +99,8 @@ class FlagEnum(FlagBase):
     bitfield
     """
 
+    __slots__ = []
+
     def __init__(self, owner, offset, size, extra=None):
         if not isinstance(extra, Iterable):
             raise TypeError('{cls} needs an iterable of values'.format(cls=self.__class__.__name__))
@@ -83,18 +110,18 @@ class FlagEnum(FlagBase):
 
         super(FlagEnum, self).__init__(owner, offset, size, extra)
 
-    def get(self):
-        val = self.get_bits()
+    def get(self, word):
+        val = self.get_bits(word)
         try:
             return self.extra[val]
         except IndexError:
             return '[invalid value]'
 
-    def set(self, val):
+    def set(self, word, val):
         if val in self.extra:
-            self.set_bits(self.extra.index(val))
+            return self.set_bits(word, self.extra.index(val))
         elif isinstance(val, int):
-            self.set_bits(val)
+            return self.set_bits(word, val)
         else:
             raise TypeError('Invalid value {val} for {cls}'.format(val=val, cls=self.__class__.__name__))
 
@@ -104,75 +131,177 @@ class FlagEnum(FlagBase):
 FlagField = namedtuple('FlagField', ('name', 'ftype', 'nbits', 'extra'),
         defaults=(1, None))
 
+# Subclasses of FlagWord created for the schemas given along with values:
+# {(<class>, <nbits>, <schema>): <subclass>}
+_schema_classes = {}
+
 
 class FlagWord(object):
     """\
     Class to wrap an integer in bitwise flag/field accessors.
+
+    Subclasses describe their flags with the ``flag_schema`` and ``nbits``
+    class attributes, and are then created with just their initial value.
+    For one-off uses, the schema can also be given when creating a flag
+    word.
+
+    :cvar flag_schema:
+        A list of FlagField objects representing the values to be packed
+        into this object, in order from LSB to MSB of the underlying int
+
+    :cvar nbits:
+        An integer representing the total number of bits used for flags
     """
 
-    __slots__ = [
-            '_nbits',
-            '_value',
-            '_schema',
-    ]
+    __slots__ = [ '_value' ]
+
+    flag_schema = None
+    nbits = 32
+
+    def __new__(cls, *args, **kwargs):
+        if cls.flag_schema is None:
+            # The schema is given along with the value
+            schema = kwargs['schema'] if 'schema' in kwargs else args[0]
+            nbits = kwargs.get('nbits', args[1] if len(args) > 1 else 32)
+            cls = cls._with_schema(schema, nbits)
+        if '_layout' not in cls.__dict__:
+            cls._compile_layout()
+        return super(FlagWord, cls).__new__(cls)
 
-    def __init__(self, schema, nbits=32, initial=0):
+    def __init__(self, schema=None, nbits=32, initial=0):
         """
         :param schema:
-            A list of FlagField objects representing the values to be packed
-            into this object, in order from LSB to MSB of the underlying int
+            A list of FlagField objects, if the class doesn't define its
+            ``flag_schema``
 
         :param nbits:
-            An integer representing the total number of bits used for flags
+            The total number of bits used for flags, if the class doesn't
+            define its ``flag_schema``
 
         :param initial:
             The initial integer value of the flags field
         """
-
-        self._nbits = nbits
         self._value = initial
-        self._schema = OrderedDict()
-
-        tot_bits = sum([item.nbits for item in schema])
-        if tot_bits > nbits:
-            raise TypeError("Too many fields for {nbits}-bit field (schema defines {tot} bits)".format(nbits=nbits, tot=tot_bits))
 
-        bitn = 0
-        for item in schema:
+    @classmethod
+    def _with_schema(cls, schema, nbits):
+        """
+        Get a subclass with the given schema, reusing the one created for
+        the same layout, if any.
+        """
+        key = (cls, nbits, tuple(
+            item._replace(extra=tuple(item.extra))
+            if isinstance(item, FlagField) and isinstance(item.extra, list)
+            else item
+            for item in schema))
+        try:
+            return _schema_classes[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable schema: don't keep the class
+            key = None
+        subclass = type(cls.__name__, (cls,), {
+            '__slots__': [], 'flag_schema': schema, 'nbits': nbits})
+        subclass._compile_layout()
+        if key is not None:
+            _schema_classes[key] = subclass
+        return subclass
+
+    @classmethod
+    def _compile_layout(cls):
+        """Create the accessors of the flags, as class attributes"""
+        cls._nbits = cls.nbits
+        layout = OrderedDict()
+
+        for item in cls.flag_schema:
             if not isinstance(item, FlagField):
                 raise TypeError('Schema must be composed of FlagField objects')
+
+        tot_bits = sum([item.nbits for item in cls.flag_schema])
+        if tot_bits > cls.nbits:
+            raise TypeError(
+                "Too many fields for {nbits}-bit field (schema defines {tot} "
+                "bits)".format(nbits=cls.nbits, tot=tot_bits))
+
+        bitn = 0
+        for item in cls.flag_schema:
             if not issubclass(item.ftype, FlagBase):
                 raise TypeError('Expected FlagBase, got {}'.format(item.ftype))
-            self._schema[item.name] = item.ftype(self, bitn, item.nbits, item.extra)
+            layout[item.name] = item.ftype(cls, bitn, item.nbits, item.extra)
+            setattr(cls, item.name, layout[item.name])
             bitn += item.nbits
+        cls._layout = layout
+
+    @classmethod
+    def layout(cls):
+        """Get the accessors of the flags: ``{<name>: <FlagBase>}``"""
+        if '_layout' not in cls.__dict__:
+            cls._compile_layout()
+        return cls._layout
+
+    @classmethod
+    def selector(cls, **values):
+        """
+        Get a ``(mask, pattern)`` pair selecting the flag words whose flags
+        have the given values: ``word & mask == pattern``.
+
+        :param values: the wanted values, by flag name (eg.
+            ``err_crc=True``)
+        """
+        layout = cls.layout()
+        mask = pattern = 0
+        for name, val in values.items():
+            try:
+                flag = layout[name]
+            except KeyError:
+                raise AttributeError(name)
+            mask |= flag.mask
+            pattern = flag.set(pattern, val)
+        return mask, pattern
+
+    @classmethod
+    def count(cls, words, **values):
+        """
+        Count the raw flag words whose flags have the given values.
+
+        ``words`` can be any iterable of integers (eg. an
+        :py:class:`array.array`), or a NumPy array of integers, which is
+        then processed by vectorized operations.
+
+        :param words: the raw flag words
+        :param values: the wanted values, by flag name
+        """
+        mask, pattern = cls.selector(**values)
+        try:
+            # NumPy arrays compare element-wise
+            return int(((words & mask) == pattern).sum())
+        except (TypeError, AttributeError):
+            return sum(1 for word in words if word & mask == pattern)
+
+    @classmethod
+    def positions(cls, words, **values):
+        """
+        Get the positions of the raw flag words whose flags have the given
+        values.
+
+        :param words: an iterable of raw flag words
+        :param values: the wanted values, by flag name
+        :returns: a list of positions in ``words``
+        """
+        mask, pattern = cls.selector(**values)
+        return [num for num, word in enumerate(words)
+                if word & mask == pattern]
 
     def __int__(self):
         return self._value
 
     def __repr__(self):
         rv = '<{0} (value={1})'.format(self.__class__.__name__, self._value)
-        for k, v in self._schema.items():
-            rv += ' {0}={1}'.format(k, v.get())
+        for k, v in self._layout.items():
+            rv += ' {0}={1}'.format(k, v.get(self._value))
         return rv+'>'
 
-    def __getattr__(self, name):
-        try:
-            v = self._schema[name]
-        except KeyError:
-            raise AttributeError(name)
-        return v.get()
-
-    def __setattr__(self, name, val):
-        try:
-            return object.__setattr__(self, name, val)
-        except AttributeError:
-            pass
-        try:
-            v = self._schema[name]
-        except KeyError:
-            raise AttributeError(name)
-        return v.set(val)
-
 
 if __name__ == '__main__':
     f = FlagWord([
@@ -201,4 +330,3 @@ if __name__ == '__main__':
     f.fcslen = 12
     print(f)
     print(int(f))
-
@@ -0,0 +1,526 @@
+"""
+Module providing a persistent index of the blocks in a capture file.
+
+The index records where each block starts, so that blocks (and packets)
+can be accessed at random without scanning the whole file. It also records
+the timestamps of blocks, normalized to nanoseconds, so that blocks can be
+looked up by time. It can be saved as a compact binary "sidecar" file next
+to the capture, and reused as long as the capture isn't modified.
+
+Example usage:
+
+    .. code-block:: python
+
+        from pcapng.index import IndexedReader, load_index
+
+        # Load the index from /tmp/mycapture.pcapng.idx, or build it
+        index = load_index('/tmp/mycapture.pcapng')
+
+        with open('/tmp/mycapture.pcapng', 'rb') as fp:
+            reader = IndexedReader(fp, index)
+            packet = reader.packet(123456)
+
+            # Get the packets of the 30 seconds around an event
+            for block in reader.iter_range(event_time - 15, event_time + 15):
+                pass
+"""
+
+import array
+import os
+import struct
+import sys
+
+import six
+
+from pcapng.constants.block_types import (
+    BLK_SECTION_HEADER, BLK_INTERFACE, BLK_PACKET, BLK_PACKET_SIMPLE,
+    BLK_INTERFACE_STATS, BLK_ENHANCED_PACKET)
+from pcapng.exceptions import BadIndex, StreamEmpty
+from pcapng.ngsix import namedtuple
+from pcapng.readers import (
+    BufferedBlockReader, MmapBlockReader, DEFAULT_BUFFER_SIZE)
+from pcapng.scanner import make_block, load_section, peek_interface_id
+from pcapng.utils import timestamp_to_ns
+import pcapng.blocks as blocks
+
+
+INDEX_MAGIC = b'PCNGIDX\x00'
+INDEX_VERSION = 2
+
+# Suffix appended to the capture file name to get the sidecar file name
+INDEX_SUFFIX = '.idx'
+
+# Header: magic, version, capture size, capture mtime (ns), number of
+# blocks, number of blocks with a timestamp
+_HEADER = struct.Struct('<8sI4xQQQQ')
+
+# Interface id recorded for blocks not referring to an interface
+NO_INTERFACE = 0xffffffff
+
+# Timestamp recorded for blocks without a timestamp
+NO_TIMESTAMP = -2 ** 63
+
+PACKET_BLOCK_TYPES = (BLK_ENHANCED_PACKET, BLK_PACKET_SIMPLE, BLK_PACKET)
+
+
+# A single entry of the index, as returned by BlockIndex[n]
+IndexEntry = namedtuple(
+    'IndexEntry',
+    ('offset', 'block_type', 'section', 'interface_id', 'timestamp'))
+
+
+def _file_identity(stat):
+    """Get the (size, mtime) of a file, used to check for modifications"""
+    try:
+        mtime = stat.st_mtime_ns
+    except AttributeError:
+        mtime = int(stat.st_mtime * 10 ** 9)
+    return stat.st_size, mtime
+
+
+def _raw_timestamp_of(block_type, data, endianness):
+    """Get the raw timestamp of a block from its raw data, if it has one"""
+    if block_type not in (BLK_ENHANCED_PACKET, BLK_PACKET,
+                          BLK_INTERFACE_STATS) or len(data) < 12:
+        return None
+    # The timestamp follows the interface id (and drops count, in obsolete
+    # packet blocks) in all of these blocks
+    high, low = struct.unpack_from(endianness + 'II', data, 4)
+    return (high << 32) + low
+
+
+def _to_ns(seconds):
+    """Convert a time in seconds since the epoch to integer nanoseconds"""
+    if isinstance(seconds, six.integer_types):
+        return seconds * 10 ** 9
+    whole = int(seconds)
+    return whole * 10 ** 9 + int(round((seconds - whole) * 10 ** 9))
+
+
+class BlockIndex(object):
+    """
+    Index of the blocks in a capture file.
+
+    For each block, the index records its offset in the file, its block
+    type, the number of the section it belongs to (counting from zero) and
+    the id of the interface it refers to. Interface descriptions are
+    recorded with the id they assign to their interface, and blocks not
+    referring to any interface with :py:data:`NO_INTERFACE`.
+
+    For blocks with a timestamp (enhanced and obsolete packets, and
+    interface statistics) the index also records the timestamp, converted
+    to nanoseconds since the epoch using the resolution and offset of the
+    block's interface; other blocks are recorded with :py:data:`NO_TIMESTAMP`.
+    The ``time_order`` attribute lists the numbers of the blocks with a
+    timestamp, sorted by timestamp.
+
+    The columns are stored in :py:class:`array.array` objects, taking 36
+    bytes per block, and can be accessed directly as the ``offsets``,
+    ``block_types``, ``sections``, ``interfaces`` and ``timestamps``
+    attributes; indexing the object returns :py:class:`IndexEntry` tuples
+    instead.
+
+    :param file_size: size of the indexed capture file, if known
+    :param file_mtime: modification time of the indexed capture file,
+        in nanoseconds, if known
+    """
+    __slots__ = [
+            'offsets',
+            'block_types',
+            'sections',
+            'interfaces',
+            'timestamps',
+            'time_order',
+            'file_size',
+            'file_mtime',
+    ]
+
+    def __init__(self, file_size=None, file_mtime=None):
+        self.offsets = array.array('Q')
+        self.block_types = array.array('I')
+        self.sections = array.array('I')
+        self.interfaces = array.array('I')
+        self.timestamps = array.array('q')
+        self.time_order = array.array('Q')
+        self.file_size = file_size
+        self.file_mtime = file_mtime
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, num):
+        return IndexEntry(self.offsets[num], self.block_types[num],
+                          self.sections[num], self.interfaces[num],
+                          self.timestamps[num])
+
+    def __repr__(self):
+        return '<{0} blocks={1} size={2!r} mtime={3!r}>'.format(
+            self.__class__.__name__, len(self),
+            self.file_size, self.file_mtime)
+
+    def _columns(self):
+        return (self.offsets, self.block_types, self.sections,
+                self.interfaces, self.timestamps)
+
+    def append(self, offset, block_type, section, interface_id,
+               timestamp=NO_TIMESTAMP):
+        """
+        Add an entry at the end of the index.
+
+        Call :py:meth:`sort_times` once done adding entries, to update
+        the ``time_order``.
+        """
+        self.offsets.append(offset)
+        self.block_types.append(block_type)
+        self.sections.append(section)
+        self.interfaces.append(interface_id)
+        self.timestamps.append(timestamp)
+
+    def sort_times(self):
+        """Sort the blocks with a timestamp, by timestamp"""
+        timestamps = self.timestamps
+        self.time_order = array.array('Q', sorted(
+            (num for num, timestamp in enumerate(timestamps)
+             if timestamp != NO_TIMESTAMP),
+            key=timestamps.__getitem__))
+
+    def search_time(self, timestamp):
+        """
+        Find the position, in ``time_order``, of the first block with a
+        timestamp greater than or equal to the given one.
+
+        :param timestamp: a timestamp, in nanoseconds since the epoch
+        """
+        timestamps, order = self.timestamps, self.time_order
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if timestamps[order[middle]] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def positions(self, block_types):
+        """
+        Get the numbers of the blocks of the given types.
+
+        :param block_types: an iterable of block type codes
+        :returns: an :py:class:`array.array` of block numbers
+        """
+        block_types = frozenset(block_types)
+        return array.array('Q', (
+            num for num, block_type in enumerate(self.block_types)
+            if block_type in block_types))
+
+    @classmethod
+    def build(cls, stream):
+        """
+        Build the index of a capture, by scanning it from the current
+        position of the stream.
+
+        Only the framing of blocks is read, and blocks are not decoded.
+        If the stream is a regular file, it is memory-mapped for the
+        duration of the scan and its size and modification time are
+        recorded in the index.
+        """
+        try:
+            identity = _file_identity(os.fstat(stream.fileno()))
+            reader = MmapBlockReader(stream)
+        except (AttributeError, IOError, OSError, ValueError):
+            # Not a regular file: io.UnsupportedOperation is both an
+            # OSError and a ValueError
+            identity = (None, None)
+            reader = BufferedBlockReader(stream)
+
+        try:
+            return cls._build(reader, identity)
+        finally:
+            if isinstance(reader, MmapBlockReader):
+                reader.close()
+
+    @classmethod
+    def _build(cls, reader, identity):
+        index = cls(*identity)
+        endianness = '='
+        section = None
+        section_num = -1
+        while True:
+            offset = reader.offset
+            try:
+                block_type, endianness, data = reader.read_block(endianness)
+            except StreamEmpty:
+                break
+
+            timestamp = NO_TIMESTAMP
+            if block_type == BLK_SECTION_HEADER:
+                section_num += 1
+                # Copied, so as not to hold on to the mapping of the file
+                section = blocks.SectionHeader(raw=bytes(data),
+                                               endianness=endianness)
+                interface_id = NO_INTERFACE
+            elif section is None:
+                raise ValueError(
+                    'File not starting with a proper section header')
+            elif block_type == BLK_INTERFACE:
+                # Decode the interface, to get its timestamp resolution
+                interface_id = len(section.interfaces)
+                make_block(section, block_type, bytes(data))
+            else:
+                interface_id = peek_interface_id(block_type, data, endianness)
+                if interface_id is None:
+                    interface_id = NO_INTERFACE
+                raw_timestamp = _raw_timestamp_of(block_type, data, endianness)
+                if raw_timestamp is not None:
+                    interface = section.interfaces.get(interface_id)
+                    if interface is not None:
+                        timestamp = interface.timestamp_converter.to_ns(
+                            raw_timestamp)
+                    else:
+                        timestamp = timestamp_to_ns(raw_timestamp)
+
+            index.append(offset, block_type, section_num, interface_id,
+                         timestamp)
+
+        index.sort_times()
+        return index
+
+    def save(self, path):
+        """Save the index to a file"""
+        with open(path, 'wb') as fp:
+            fp.write(_HEADER.pack(
+                INDEX_MAGIC, INDEX_VERSION, self.file_size or 0,
+                self.file_mtime or 0, len(self), len(self.time_order)))
+            for column in self._columns() + (self.time_order,):
+                if sys.byteorder != 'little':
+                    column = array.array(column.typecode, column)
+                    column.byteswap()
+                # Python 2 arrays have tostring() instead of tobytes()
+                fp.write((getattr(column, 'tobytes', None) or
+                          column.tostring)())
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index from a file.
+
+        :raises: :py:exc:`~pcapng.exceptions.BadIndex` if the file isn't
+            a valid index
+        """
+        with open(path, 'rb') as fp:
+            header = fp.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise BadIndex('Truncated index file')
+            magic, version, file_size, file_mtime, count, timed_count = \
+                _HEADER.unpack(header)
+            if magic != INDEX_MAGIC:
+                raise BadIndex('Not a block index file')
+            if version != INDEX_VERSION:
+                raise BadIndex('Unsupported index version: {0}'
+                               .format(version))
+
+            index = cls(file_size, file_mtime)
+            columns = [(column, count) for column in index._columns()]
+            columns.append((index.time_order, timed_count))
+            for column, length in columns:
+                size = length * column.itemsize
+                data = fp.read(size)
+                if len(data) < size:
+                    raise BadIndex('Truncated index file')
+                (getattr(column, 'frombytes', None) or
+                 column.fromstring)(data)
+                if sys.byteorder != 'little':
+                    column.byteswap()
+        return index
+
+    def matches(self, path):
+        """
+        Check whether the index matches a capture file, by comparing the
+        file size and modification time with the recorded ones.
+        """
+        if self.file_size is None:
+            return False
+        return _file_identity(os.stat(path)) == (
+            self.file_size, self.file_mtime)
+
+
+def load_index(path, save=True):
+    """
+    Get the index of a capture file.
+
+    The index is loaded from the sidecar file (the capture file name
+    followed by :py:data:`INDEX_SUFFIX`) if it exists and matches the
+    capture. Otherwise, it is built by scanning the capture, then saved
+    to the sidecar file if ``save`` is true.
+
+    :param path: path to the capture file
+    :param save: whether to save newly built indexes
+    :returns: a :py:class:`BlockIndex`
+    """
+    sidecar = path + INDEX_SUFFIX
+    try:
+        index = BlockIndex.load(sidecar)
+    except (IOError, OSError, BadIndex):
+        pass
+    else:
+        if index.matches(path):
+            return index
+
+    with open(path, 'rb') as fp:
+        index = BlockIndex.build(fp)
+    if save:
+        index.save(sidecar)
+    return index
+
+
+class IndexedReader(object):
+    """
+    Random-access reader for a capture file, using its
+    :py:class:`BlockIndex` to seek directly to the requested blocks.
+
+    Blocks are decoded with the proper section and interfaces as context,
+    which are loaded the first time a section is accessed.
+
+    :param stream: a seekable file-like object for the capture file
+    :param index: the index of the capture file
+    """
+    __slots__ = [ 'stream', 'index', '_sections', '_positions' ]
+
+    def __init__(self, stream, index):
+        self.stream = stream
+        self.index = index
+        self._sections = {}
+        self._positions = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def packet_count(self):
+        """Number of packet blocks in the capture"""
+        return len(self._get_positions(PACKET_BLOCK_TYPES))
+
+    def block(self, num):
+        """Get a single block, by number"""
+        if num < 0:
+            num += len(self.index)
+        if not 0 <= num < len(self.index):
+            raise IndexError('Block number out of range')
+        return next(self.blocks(num, num + 1))
+
+    def blocks(self, start=0, stop=None):
+        """
+        Iterate over a range of blocks, with the same semantics as slicing
+        a list of all the blocks in the capture.
+        """
+        offsets = self.index.offsets
+        start, stop, _ = slice(start, stop).indices(len(offsets))
+        if start >= stop:
+            return
+
+        # Don't read (much) past the requested blocks
+        buffer_size = DEFAULT_BUFFER_SIZE
+        if stop < len(offsets):
+            buffer_size = min(buffer_size, offsets[stop] - offsets[start])
+
+        self.stream.seek(offsets[start])
+        reader = BufferedBlockReader(self.stream, buffer_size)
+        for num in range(start, stop):
+            yield self._read_block(reader, num)
+
+    def packet(self, num):
+        """Get a single packet block, by number (counting packets only)"""
+        return self.block(self._get_positions(PACKET_BLOCK_TYPES)[num])
+
+    def packets(self, start=0, stop=None):
+        """
+        Iterate over a range of packet blocks (counting packets only),
+        with the same semantics as slicing a list of all the packets.
+        """
+        positions = self._get_positions(PACKET_BLOCK_TYPES)[start:stop]
+        if not positions:
+            return
+        block_types = self.index.block_types
+        first, last = positions[0], positions[-1]
+        for num, block in enumerate(self.blocks(first, last + 1), first):
+            if block_types[num] in PACKET_BLOCK_TYPES:
+                yield block
+
+    def seek_time(self, t):
+        """
+        Find the first block with a timestamp at or after the given time.
+
+        :param t: the time, in seconds since the epoch
+        :returns: the number of the block, or ``None`` if no block has
+            such a timestamp
+        """
+        position = self.index.search_time(_to_ns(t))
+        if position < len(self.index.time_order):
+            return self.index.time_order[position]
+        return None
+
+    def iter_range(self, t0, t1):
+        """
+        Iterate over the blocks with a timestamp in the given time range,
+        in timestamp order.
+
+        :param t0: start of the range (inclusive), in seconds since the epoch
+        :param t1: end of the range (exclusive), in seconds since the epoch
+        """
+        order = self.index.time_order
+        nums = order[self.index.search_time(_to_ns(t0)):
+                     self.index.search_time(_to_ns(t1))]
+        if not nums:
+            return
+
+        if all(nums[i] < nums[i + 1] for i in range(len(nums) - 1)):
+            # Timestamps follow the file order (as they usually do):
+            # read the whole range in one go, skipping other blocks
+            wanted = set(nums)
+            first, last = nums[0], nums[-1]
+            for num, block in enumerate(self.blocks(first, last + 1), first):
+                if num in wanted:
+                    yield block
+        else:
+            for num in nums:
+                yield self.block(num)
+
+    def _read_block(self, reader, num):
+        entry = self.index[num]
+        section = self._get_section(entry.section)
+        block_type, endianness, data = reader.read_block(section.endianness)
+        if block_type != entry.block_type:
+            raise BadIndex('Index does not match the capture file')
+
+        if block_type == BLK_SECTION_HEADER:
+            return section
+        if block_type == BLK_INTERFACE:
+            # Already decoded, and registered with the section
+            return section.interfaces[entry.interface_id]
+        return make_block(section, block_type, data)
+
+    def _get_positions(self, block_types):
+        try:
+            return self._positions[block_types]
+        except KeyError:
+            positions = self.index.positions(block_types)
+            self._positions[block_types] = positions
+            return positions
+
+    def _get_section(self, section_num):
+        """
+        Get a section header, with all its interfaces registered.
+        The stream position is preserved.
+        """
+        try:
+            return self._sections[section_num]
+        except KeyError:
+            pass
+
+        offsets = self.index.offsets
+        start = self._get_positions((BLK_SECTION_HEADER,))[section_num]
+        section = load_section(self.stream, offsets[start], [
+            offsets[num] for num in self._get_positions((BLK_INTERFACE,))
+            if self.index.sections[num] == section_num])
+        self._sections[section_num] = section
+        return section
@@ -0,0 +1,297 @@
+"""
+Module providing bulk decoding of packet headers into NumPy arrays.
+
+The headers of all the packet blocks (enhanced, simple and obsolete
+packets) of a capture are decoded into a single structured array, with
+one record per packet (see :py:data:`PACKET_HEADER_DTYPE`), which can then
+be processed with vectorized operations:
+
+    .. code-block:: python
+
+        import numpy
+        from pcapng.npstructs import read_packet_headers
+
+        with open('/tmp/mycapture.pcapng', 'rb') as fp:
+            headers = read_packet_headers(fp)
+        counts, edges = numpy.histogram(headers['caplen'], bins=64)
+
+The blocks are first walked over to find the packet blocks (this only
+looks at the type and length of each block), then their headers are
+gathered out of the memory-mapped file, and decoded with the endianness of
+their section, by vectorized operations.
+
+Only the second step is vectorized. As each block starts where the
+previous one ends, the walk is a plain Python loop, unpacking the type and
+length of every block in turn: its cost grows with the number of blocks,
+and it makes up most of the run time on captures of many small packets.
+
+This requires NumPy, which is not a dependency of this library.
+"""
+
+import mmap
+import os
+import struct
+from array import array
+
+import numpy
+
+from pcapng.constants.block_types import (
+    BLK_INTERFACE, BLK_PACKET, BLK_PACKET_SIMPLE, BLK_ENHANCED_PACKET)
+from pcapng.exceptions import CorruptedFile, TruncatedFile
+from pcapng.scanner import make_block
+from pcapng.structs import SECTION_HEADER_MAGIC, unpack_block_from
+from pcapng.utils import TimestampConverter
+import pcapng.blocks as blocks
+
+
+# Record of a packet header. ``ts_raw`` is the raw 64-bit timestamp, and
+# ``ts_ns`` the timestamp in nanoseconds since the epoch, according to the
+# timestamp resolution and offset of the interface; simple packets have
+# neither (both are zero). ``offset`` is the file offset of the packet
+# block, and ``section`` the number of the section it belongs to.
+PACKET_HEADER_DTYPE = numpy.dtype([
+    ('interface_id', 'u4'),
+    ('ts_raw', 'u8'),
+    ('ts_ns', 'i8'),
+    ('caplen', 'u4'),
+    ('origlen', 'u4'),
+    ('offset', 'u8'),
+    ('section', 'u4'),
+])
+
+# Number of packets decoded at once, to bound the memory used by the
+# intermediate arrays
+CHUNK_SIZE = 1024 * 1024
+
+# Fixed-size part of the packet blocks, following the block type and
+# length, as 32-bit words: the word of each field, from the start of the
+# block. The interface id of obsolete packets is a 16-bit field, sharing
+# its word with the drops count.
+_HEADER_FIELDS = {
+    BLK_ENHANCED_PACKET: [('interface_id', 2), ('ts_high', 3),
+                          ('ts_low', 4), ('caplen', 5), ('origlen', 6)],
+    BLK_PACKET: [('interface_id', 2), ('ts_high', 3), ('ts_low', 4),
+                 ('caplen', 5), ('origlen', 6)],
+    BLK_PACKET_SIMPLE: [('origlen', 2)],
+}
+
+_BLOCK_HEADERS = dict(
+    (endianness, struct.Struct(endianness + 'II')) for endianness in '<>=')
+
+
+def read_packet_headers(stream):
+    """
+    Decode the headers of all the packets of a capture file.
+
+    :param stream: a file object, opened in binary mode; it must provide
+        a ``.fileno()`` method referring to a regular file.
+    :returns: a structured array of :py:data:`PACKET_HEADER_DTYPE`
+        records, in file order
+    """
+    fileno = stream.fileno()
+    if os.fstat(fileno).st_size == 0:
+        # mmap() refuses to map empty files
+        return numpy.zeros(0, dtype=PACKET_HEADER_DTYPE)
+    # The mapping is closed once no longer referenced (views of it may
+    # outlive this call, eg. in the traceback of an exception)
+    return unpack_packet_headers(
+        mmap.mmap(fileno, 0, access=mmap.ACCESS_READ))
+
+
+def unpack_packet_headers(buffer):
+    """
+    Decode the headers of all the packets in a buffer holding a whole
+    capture.
+
+    :param buffer: an object supporting the buffer protocol, eg. a
+        memory-mapped file
+    :returns: a structured array of :py:data:`PACKET_HEADER_DTYPE`
+        records, in file order
+    """
+    offsets, block_types, section_nums, sections = _walk_blocks(buffer)
+    count = len(offsets)
+    headers = numpy.zeros(count, dtype=PACKET_HEADER_DTYPE)
+    if not count:
+        return headers
+    # Blocks are aligned to 32-bit words: the header fields are gathered
+    # out of views of the capture as words, in either endianness
+    words = dict(
+        (endianness, numpy.frombuffer(
+            buffer, dtype=endianness + 'u4', count=len(buffer) // 4))
+        for endianness in '<>')
+    offsets = numpy.frombuffer(offsets, dtype=numpy.uint64)
+    block_types = numpy.frombuffer(block_types, dtype=numpy.uint32)
+    section_nums = numpy.frombuffer(section_nums, dtype=numpy.uint32)
+    headers['offset'] = offsets
+    headers['section'] = section_nums
+
+    for start in range(0, count, CHUNK_SIZE):
+        chunk = slice(start, start + CHUNK_SIZE)
+        for section_num in numpy.unique(section_nums[chunk]):
+            in_section = section_nums[chunk] == section_num
+            for block_type in numpy.unique(block_types[chunk][in_section]):
+                positions = start + numpy.nonzero(
+                    in_section & (block_types[chunk] == block_type))[0]
+                _decode_headers(
+                    words, headers, positions, int(block_type),
+                    sections[section_num])
+    return headers
+
+
+def _walk_blocks(buffer):
+    """
+    Find the packet blocks in a buffer, decoding the section headers and
+    interface descriptions along the way.
+
+    :returns: an ``(offsets, block_types, section_nums, sections)`` tuple,
+        with arrays of the offsets, types and section numbers of the packet
+        blocks, and the list of section headers
+    """
+    offsets = array('Q')
+    block_types = array('I')
+    section_nums = array('I')
+    sections = []
+    packet_types = frozenset(_HEADER_FIELDS)
+    view = memoryview(buffer)
+    size = len(view)
+    endianness = '='
+    unpack_header = _BLOCK_HEADERS[endianness].unpack_from
+    offset = 0
+    while offset < size:
+        if size - offset < 12:
+            raise TruncatedFile('Trying to read {0} bytes, only got {1}'
+                                .format(12, size - offset))
+        block_type, length = unpack_header(view, offset)
+
+        if block_type in (SECTION_HEADER_MAGIC, BLK_INTERFACE):
+            block_type, endianness, payload, next_offset = \
+                unpack_block_from(view, offset, endianness)
+            if block_type == SECTION_HEADER_MAGIC:
+                sections.append(blocks.SectionHeader(
+                    raw=payload.tobytes(), endianness=endianness))
+                unpack_header = _BLOCK_HEADERS[endianness].unpack_from
+            elif not sections:
+                raise ValueError(
+                    'File not starting with a proper section header')
+            else:
+                make_block(sections[-1], block_type, payload.tobytes())
+            offset = next_offset
+            continue
+
+        if not sections:
+            raise ValueError('File not starting with a proper section header')
+        if length < 12:
+            raise CorruptedFile(
+                'Invalid block length: {0}'.format(length))
+        # Some writers don't count the padding in the block length
+        length += -length % 4
+        if offset + length > size:
+            raise TruncatedFile('Trying to read {0} bytes, only got {1}'
+                                .format(length, size - offset))
+        if block_type in packet_types:
+            offsets.append(offset)
+            block_types.append(block_type)
+            section_nums.append(len(sections) - 1)
+        offset += length
+    return offsets, block_types, section_nums, sections
+
+
+def _decode_headers(words, headers, positions, block_type, section):
+    """
+    Decode the headers of packet blocks of the same type and section.
+
+    :param words: the capture, as arrays of 32-bit words, by endianness
+    :param headers: the array of headers to fill in
+    :param positions: positions, in ``headers``, of the packets to decode
+    :param block_type: the type of the packet blocks
+    :param section: the :py:class:`~pcapng.blocks.SectionHeader` of the
+        packets
+    """
+    section_words = words[section.endianness]
+    # Gather the fields one at a time, each needing a single array of
+    # indices, rather than all the bytes of the headers at once
+    starts = headers['offset'][positions].astype(numpy.int64) // 4
+    fields = {}
+    for name, word in _HEADER_FIELDS[block_type]:
+        fields[name] = section_words[starts + word]
+    if block_type == BLK_PACKET:
+        # The interface id comes first, then the drops count
+        if section.endianness == '<':
+            fields['interface_id'] &= numpy.uint32(0xffff)
+        else:
+            fields['interface_id'] >>= numpy.uint32(16)
+
+    headers['origlen'][positions] = fields['origlen']
+    if block_type == BLK_PACKET_SIMPLE:
+        caplen = fields['origlen']
+        snaplen = section.interfaces[0].snaplen if section.interfaces else 0
+        if snaplen:
+            caplen = numpy.minimum(caplen, snaplen)
+        headers['caplen'][positions] = caplen
+        return
+
+    headers['caplen'][positions] = fields['caplen']
+    interface_ids = fields['interface_id'].astype(numpy.uint32)
+    headers['interface_id'][positions] = interface_ids
+    ts_raw = ((fields['ts_high'].astype(numpy.uint64) << numpy.uint64(32)) |
+              fields['ts_low'].astype(numpy.uint64))
+    headers['ts_raw'][positions] = ts_raw
+
+    for interface_id in numpy.unique(interface_ids):
+        matching = interface_ids == interface_id
+        interface = section.interfaces.get(int(interface_id))
+        if interface is not None:
+            converter = interface.timestamp_converter
+        else:
+            converter = TimestampConverter()
+        headers['ts_ns'][positions[matching]] = \
+            _convert_timestamps(ts_raw[matching], converter)
+
+
+def timestamps_to_ns(timestamps, tsresol=None):
+    """
+    Convert an array of raw timestamps to integer nanoseconds.
+
+    This is the vectorized counterpart of
+    :py:func:`~pcapng.utils.timestamp_to_ns`.
+
+    :param timestamps: array of raw 64-bit timestamps
+    :param tsresol: the raw value of the ``if_tsresol`` option of the
+        interface, or ``None`` for the default resolution (microseconds)
+    :returns: an array of ``int64`` timestamps
+    """
+    return _convert_timestamps(timestamps, TimestampConverter(tsresol))
+
+
+def _convert_timestamps(timestamps, converter):
+    """
+    Convert an array of raw timestamps as the
+    :py:class:`~pcapng.utils.TimestampConverter` does, with unsigned 64-bit
+    arithmetic.
+    """
+    timestamps = numpy.asarray(timestamps, dtype=numpy.uint64)
+    multiplier, shift, divisor = converter.scale
+    if shift:
+        # Split the whole units from the fraction, to avoid overflowing
+        # while multiplying; the fraction loses the bits which would
+        # overflow, which are finer than nanoseconds anyway
+        if shift >= 64 + multiplier.bit_length():
+            # Even the largest timestamp is less than a nanosecond
+            result = numpy.zeros(len(timestamps), dtype=numpy.uint64)
+        else:
+            whole = numpy.zeros_like(timestamps)
+            fraction = timestamps
+            if shift < 64:
+                whole = timestamps >> numpy.uint64(shift)
+                fraction = timestamps & numpy.uint64((1 << shift) - 1)
+            dropped = max(0, shift - (64 - multiplier.bit_length()))
+            fraction = (((fraction >> numpy.uint64(dropped)) *
+                         numpy.uint64(multiplier)) >>
+                        numpy.uint64(shift - dropped))
+            result = whole * numpy.uint64(multiplier) + fraction
+    else:
+        result = timestamps * numpy.uint64(multiplier)
+    if divisor != 1:
+        result //= numpy.uint64(divisor)
+    return (result.astype(numpy.int64) +
+            numpy.int64(converter.tsoffset * 10 ** 9))
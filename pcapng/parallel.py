@@ -0,0 +1,247 @@
+"""
+Module providing parallel scanning of a single capture file, using
+several processes.
+
+The file is split into byte ranges aligned to block boundaries, which are
+scanned in worker processes, each with the section and interfaces in effect
+at the start of its range. Boundaries come from a
+:py:class:`~pcapng.index.BlockIndex` if one is given, or are otherwise
+found by walking over the headers of the blocks (their type and length
+only), from the start of the file.
+
+Example usage:
+
+    .. code-block:: python
+
+        from pcapng.parallel import ParallelScanner
+
+        def packet_length(block):
+            return getattr(block, 'packet_len', 0)
+
+        scanner = ParallelScanner('/tmp/mycapture.pcapng', workers=8)
+        total = sum(scanner.map(packet_length))
+
+Blocks are decoded in the worker processes, and only the results of the
+function get sent back: the function must be picklable (eg. defined at
+module level) and so must its results.
+
+On Python 2, :py:meth:`ParallelScanner.map` requires the ``futures``
+backport package.
+"""
+
+import bisect
+import mmap
+import multiprocessing
+import os
+from collections import namedtuple
+
+from pcapng.constants.block_types import BLK_SECTION_HEADER, BLK_INTERFACE
+from pcapng.exceptions import PcapngLoadError
+from pcapng.scanner import FileScanner, load_section
+from pcapng.structs import unpack_block_from
+
+
+# A byte range of a capture file, to be scanned on its own. ``end`` is
+# ``None`` for the last range of the file; ``section_offset`` and
+# ``interface_offsets`` are the offsets of the section header and interface
+# descriptions in effect at the start of the range.
+ScanRange = namedtuple(
+    'ScanRange', ('start', 'end', 'section_offset', 'interface_offsets'))
+
+
+def split_ranges(path, count, index=None):
+    """
+    Split a capture file into (at most) ``count`` ranges of similar sizes,
+    aligned to block boundaries.
+
+    Without an index, the blocks are walked over from the start of the
+    file, looking only at their type and length, to find the range
+    boundaries, section headers and interface descriptions. If the walk
+    stops on invalid data, the last range extends from there to the end
+    of the file.
+
+    :param path: path of the capture file
+    :param count: number of ranges wanted
+    :param index: a :py:class:`~pcapng.index.BlockIndex` of the file, if
+        available
+    :returns: a list of :py:class:`ScanRange`
+    """
+    file_size = os.path.getsize(path)
+    if index is not None:
+        return _split_with_index(index, file_size, count)
+    if file_size == 0:
+        return []
+    with open(path, 'rb') as fp:
+        mapping = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return _split_by_walking(mapping, count)
+        finally:
+            mapping.close()
+
+
+def _split_with_index(index, file_size, count):
+    offsets = index.offsets
+    section_offsets = []
+    interface_offsets = []
+    for num in index.positions((BLK_SECTION_HEADER, BLK_INTERFACE)):
+        if index.block_types[num] == BLK_SECTION_HEADER:
+            section_offsets.append(offsets[num])
+            interface_offsets.append([])
+        else:
+            interface_offsets[index.sections[num]].append(offsets[num])
+
+    starts = sorted(set(
+        bisect.bisect_left(offsets, file_size * part // count)
+        for part in range(count)))
+    starts = [num for num in starts if num < len(index)]
+
+    ranges = []
+    for position, num in enumerate(starts):
+        start = offsets[num]
+        end = None
+        if position + 1 < len(starts):
+            end = offsets[starts[position + 1]]
+        section = index.sections[num]
+        ranges.append(ScanRange(
+            start, end, section_offsets[section],
+            tuple(offset for offset in interface_offsets[section]
+                  if offset < start)))
+    return ranges
+
+
+def _split_by_walking(buffer, count):
+    """
+    Split a buffer holding a whole capture, by walking over its blocks.
+    """
+    view = memoryview(buffer)
+    try:
+        return _walk_ranges(view, count)
+    finally:
+        if hasattr(view, 'release'):  # Python 3
+            view.release()
+
+
+def _walk_ranges(view, count):
+    size = len(view)
+    # Wanted range starts; each range starts at the first block from there
+    targets = [size * part // count for part in range(1, count)]
+    starts = [0]
+    sections = []  # (offset, interface offsets) of each section
+    range_sections = []  # Section of each range
+    endianness = '='
+    offset = 0
+    while offset < size:
+        try:
+            block_type, endianness, data, next_offset = \
+                unpack_block_from(view, offset, endianness)
+        except PcapngLoadError:
+            # Leave the problem to the scanner of the last range
+            break
+        if hasattr(data, 'release'):  # Python 3
+            # Don't keep a view of the mapping
+            data.release()
+        if block_type == BLK_SECTION_HEADER:
+            sections.append((offset, []))
+        elif not sections:
+            raise ValueError('File not starting with a proper section header')
+        elif block_type == BLK_INTERFACE:
+            sections[-1][1].append(offset)
+        if offset == 0:
+            range_sections.append(sections[-1])
+        elif targets and offset >= targets[0]:
+            starts.append(offset)
+            range_sections.append(sections[-1])
+            while targets and targets[0] <= offset:
+                targets.pop(0)
+        offset = next_offset
+    if not sections:
+        raise ValueError('File not starting with a proper section header')
+
+    ranges = []
+    for position, start in enumerate(starts):
+        end = None
+        if position + 1 < len(starts):
+            end = starts[position + 1]
+        section_offset, interfaces = range_sections[position]
+        ranges.append(ScanRange(
+            start, end, section_offset,
+            tuple(interface for interface in interfaces if interface < start)))
+    return ranges
+
+
+def scan_range(path, byte_range, func, options=None):
+    """
+    Scan a range of a capture file, calling a function on each block.
+
+    This is what worker processes run, but it can be called directly too.
+
+    :param path: path of the capture file
+    :param byte_range: the :py:class:`ScanRange` to scan
+    :param func: the function to call on each block
+    :param options: extra keyword arguments for the
+        :py:class:`~pcapng.scanner.FileScanner`
+    :returns: the list of results of the function
+    """
+    with open(path, 'rb') as fp:
+        section = None
+        if byte_range.section_offset != byte_range.start:
+            section = load_section(fp, byte_range.section_offset,
+                                   byte_range.interface_offsets)
+        fp.seek(byte_range.start)
+        scanner = FileScanner(fp, use_mmap=True, section=section,
+                              end=byte_range.end, **(options or {}))
+        return [func(block) for block in scanner]
+
+
+class ParallelScanner(object):
+    """
+    Scanner decoding a capture file in several processes.
+
+    :param path: path of the capture file
+    :param workers: number of worker processes (defaults to the number
+        of processors)
+    :param index: a :py:class:`~pcapng.index.BlockIndex` of the file, used
+        to split it; if not given, block boundaries are found by walking
+        over the blocks of the file instead.
+    :param ranges_per_worker: number of ranges to split the file into,
+        per worker. Having more ranges than workers balances the load
+        better, when some parts of the file are slower to process.
+    :param options: extra keyword arguments passed to the
+        :py:class:`~pcapng.scanner.FileScanner` of each range, eg.
+        ``block_types`` or ``headers_only``.
+    """
+    __slots__ = [ 'path', 'workers', 'index', 'ranges_per_worker',
+                  'options' ]
+
+    def __init__(self, path, workers=None, index=None, ranges_per_worker=4,
+                 **options):
+        self.path = path
+        self.workers = workers or multiprocessing.cpu_count()
+        self.index = index
+        self.ranges_per_worker = ranges_per_worker
+        self.options = options
+
+    def ranges(self):
+        """Get the ranges the file is split into"""
+        return split_ranges(self.path, self.workers * self.ranges_per_worker,
+                            self.index)
+
+    def map(self, func):
+        """
+        Call a function on each block of the file, in worker processes.
+
+        :param func: a picklable function, taking a block as argument
+        :returns: an iterator over the results, in file order
+        """
+        # Only in the standard library of Python 3
+        from concurrent.futures import ProcessPoolExecutor
+
+        ranges = self.ranges()
+        with ProcessPoolExecutor(self.workers) as executor:
+            futures = [
+                executor.submit(scan_range, self.path, byte_range, func,
+                                self.options)
+                for byte_range in ranges]
+            for future in futures:
+                for result in future.result():
+                    yield result
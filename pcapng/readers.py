@@ -0,0 +1,421 @@
+"""
+Module providing the block readers used by
+:py:class:`~pcapng.scanner.FileScanner`.
+
+A block reader only deals with the "framing" of blocks (block type, block
+length, payload and trailing block length) and returns the raw payload of
+each block; decoding it is left to the classes in :py:mod:`pcapng.blocks`.
+"""
+
+import mmap
+import os
+import re
+import struct
+
+from pcapng.structs import (
+    unpack_block_from, SECTION_HEADER_MAGIC, BYTE_ORDER_MAGIC)
+from pcapng.exceptions import PcapngLoadError, StreamEmpty, TruncatedFile
+
+
+# Default amount of data pulled out of the stream at once
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+# Block types considered when looking for a block boundary: the standard
+# blocks, the experimental ones and custom blocks
+BOUNDARY_BLOCK_TYPES = (
+    0x00000001, 0x00000002, 0x00000003, 0x00000004, 0x00000005, 0x00000006,
+    0x00000007, 0x00000008, 0x00000BAD, 0x40000BAD, SECTION_HEADER_MAGIC)
+
+_boundary_patterns = {}
+
+
+def _tell(stream):
+    """Get the position of a stream, or zero if it cannot tell"""
+    try:
+        return stream.tell()
+    except (AttributeError, IOError, OSError, ValueError):
+        # io.UnsupportedOperation is both an OSError and a ValueError
+        return 0
+
+
+class BufferedBlockReader(object):
+    """
+    Block reader pulling large chunks of data out of a stream.
+
+    Whole blocks are then sliced out of the buffered data, so reading a
+    block costs (at most) one call to the stream's ``.read()`` method,
+    rather than one per field. Blocks larger than the buffer size are
+    handled by growing the buffer as needed.
+
+    The reader never seeks, and keeps track of the stream position
+    internally, so it works the same on non-seekable streams such as pipes,
+    FIFOs and sockets. When the stream provides a ``.read1()`` method (as
+    buffered streams from the :py:mod:`io` module do) it is used instead of
+    ``.read()``, so that blocks can be returned as soon as they are
+    available, rather than after a whole buffer worth of data arrived.
+
+    Without a stream, the reader only works on the data pushed into it with
+    :py:meth:`feed`.
+
+    Data read or fed in small chunks is held in a list of pending chunks,
+    which only get joined to the buffer once the block being read is
+    complete: a large block arriving in many small chunks is then copied
+    once, rather than once per chunk.
+
+    :param stream: a file-like object providing a ``.read()`` method, or
+        ``None``
+    :param buffer_size: maximum amount of bytes to read from the stream
+        at once
+    :param end: if given, stream offset at which to stop reading, as if the
+        stream ended there. It must be a block boundary.
+    """
+    __slots__ = [ 'stream', 'buffer_size', 'buffer', 'position', 'base',
+                  'end', '_read', '_view', '_pending', '_pending_size' ]
+
+    def __init__(self, stream, buffer_size=DEFAULT_BUFFER_SIZE, end=None):
+        if buffer_size < 1:
+            raise ValueError('Buffer size must be positive')
+        self.stream = stream
+        self.end = end
+        self._read = None
+        if stream is not None:
+            self._read = getattr(stream, 'read1', stream.read)
+        self.buffer_size = buffer_size
+        self.buffer = b''
+        self._view = None  # memoryview of the buffer, created on demand
+        self.position = 0  # Position of the next block in the buffer
+        self.base = 0  # Stream offset of the buffer start
+        self._pending = []  # Chunks of data following the buffer
+        self._pending_size = 0
+        if stream is not None:
+            self.base = _tell(stream)
+
+    @property
+    def offset(self):
+        """Stream offset of the next block to be read"""
+        return self.base + self.position
+
+    @property
+    def buffered(self):
+        """Amount of data held past the next block to be read"""
+        return len(self.buffer) - self.position + self._pending_size
+
+    def read_block(self, endianness, view_types=(), accept=None):
+        """
+        Read the next block.
+
+        :param endianness: endianness of the current section
+        :param view_types: block types whose payload should be returned as
+            a :py:class:`memoryview` slice of the buffer, rather than
+            copied out of it. This is useful when most of the payload is
+            going to be skipped anyway.
+        :param accept: if given, a function called as
+            ``accept(block_type, endianness, data)`` on each block, with
+            ``data`` being a :py:class:`memoryview` of its payload. Blocks
+            for which it returns a false value are skipped, without their
+            payload ever being copied.
+        :returns: a ``(block_type, endianness, data)`` tuple. The returned
+            endianness only differs from the one passed in for section
+            headers, as they start a new section.
+        :raises: :py:exc:`~pcapng.exceptions.StreamEmpty` if there are no
+            more blocks to read
+        """
+        while True:
+            buffer = self.buffer
+            if view_types or accept is not None:
+                buffer = self._get_view()
+            try:
+                block_type, endianness, data, self.position = \
+                    unpack_block_from(buffer, self.position, endianness)
+            except (StreamEmpty, TruncatedFile):
+                if not self._fill(self._missing(endianness)):
+                    raise
+                continue
+            if accept is not None and not accept(block_type, endianness, data):
+                continue
+            if buffer is not self.buffer and block_type not in view_types:
+                data = data.tobytes()
+            return block_type, endianness, data
+
+    def resync(self, endianness):
+        """
+        Skip forward to the next plausible block boundary (see
+        :py:func:`find_block_boundary`), after failing to read the block
+        at the current offset. If there is none, skip to the end of the
+        stream.
+
+        The search is done on the buffered data, reading more as needed;
+        skipped data is discarded as the search goes.
+
+        :param endianness: endianness of the current section
+        :returns: the offset of the next block
+        """
+        skip = 4  # Start of the search, relative to the current position
+        eof = False
+        while True:
+            candidate, conclusive = _search_boundary(
+                self.buffer, self.position + skip, endianness,
+                complete=eof)
+            if candidate is not None and conclusive:
+                self.position = candidate
+                return self.offset
+            if candidate is not None:
+                # More data is needed to check this candidate
+                self.position, skip = candidate, 0
+            elif eof:
+                self.position = len(self.buffer)
+                return self.offset
+            else:
+                # Nothing found: only keep the last, incomplete word
+                resume = len(self.buffer) - len(self.buffer) % 4
+                if resume > self.position + skip:
+                    self.position, skip = resume, 0
+            if not self._fill(1):
+                eof = True
+
+    def _get_view(self):
+        """Get a memoryview of the buffer"""
+        if self._view is None:
+            self._view = memoryview(self.buffer)
+        return self._view
+
+    def feed(self, data):
+        """
+        Append some data to the buffered data.
+
+        :param data: a bytes-like object
+        """
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        self._pending.append(data)
+        self._pending_size += len(data)
+
+    def _missing(self, endianness):
+        """
+        Get the amount of data missing from the buffer to complete the
+        block at the current position, as far as its header tells.
+        """
+        buffer = self.buffer
+        available = len(buffer) - self.position
+        if available < 12:
+            return 12 - available
+        block_type, = struct.unpack_from(endianness + 'I', buffer,
+                                         self.position)
+        if block_type == SECTION_HEADER_MAGIC:
+            endianness = '<'
+            magic, = struct.unpack_from('>I', buffer, self.position + 8)
+            if magic == BYTE_ORDER_MAGIC:
+                endianness = '>'
+        block_length, = struct.unpack_from(endianness + 'I', buffer,
+                                           self.position + 4)
+        return max(block_length - available, 1)
+
+    def _fill(self, needed):
+        """
+        Get more data into the buffer, discarding the blocks already read.
+
+        Data is read from the stream (if any) until at least ``needed``
+        more bytes are pending, or the stream ends. Up to as much data as
+        is missing is requested at once (if that's more than the buffer
+        size), so that large blocks take few reads; short reads (as
+        returned by pipes or sockets) simply cause more calls, their data
+        being joined to the buffer only once enough of it arrived.
+
+        :param needed: the amount of data missing from the buffer
+        :returns: ``False`` if no data could be added to the buffer
+        """
+        if self._read is not None:
+            while self._pending_size < needed:
+                size = max(self.buffer_size, needed - self._pending_size)
+                if self.end is not None:
+                    size = min(size, self.end - self.base - len(self.buffer)
+                               - self._pending_size)
+                    if size <= 0:
+                        break
+                chunk = self._read(size)
+                if not chunk:
+                    break
+                self._pending.append(chunk)
+                self._pending_size += len(chunk)
+        elif self._pending_size < needed:
+            # Wait for more data to be fed
+            return False
+        if not self._pending:
+            return False
+        remaining = self.buffer[self.position:]
+        if remaining:
+            self._pending.insert(0, remaining)
+        if len(self._pending) == 1:
+            self.buffer = self._pending[0]
+        else:
+            self.buffer = b''.join(self._pending)
+        self.base += self.position
+        self.position = 0
+        self._view = None
+        self._pending = []
+        self._pending_size = 0
+        return True
+
+
+class MmapBlockReader(BufferedBlockReader):
+    """
+    Block reader walking blocks by offset over a memory-mapped file.
+
+    Block payloads are returned as :py:class:`memoryview` slices of the
+    mapping, so reading a block doesn't copy any data: the operating system
+    pages the file in as blocks get accessed.
+
+    Reading starts at the current position of the stream. As all payloads
+    are returned as views, the ``view_types`` argument of
+    :py:meth:`~BufferedBlockReader.read_block` makes no difference.
+
+    :param stream: a file object; it must provide a ``.fileno()`` method
+        referring to a regular file.
+    :param end: if given, file offset at which to stop reading, as if the
+        file ended there. It must be a block boundary.
+    """
+    __slots__ = [ '_mmap' ]
+
+    def __init__(self, stream, end=None):
+        fileno = stream.fileno()
+        self.stream = stream
+        self.end = end
+        self._read = None
+        self.buffer_size = 0
+        self._mmap = None
+        if os.fstat(fileno).st_size == 0:
+            # mmap() refuses to map empty files
+            self.buffer = memoryview(b'')
+        else:
+            self._mmap = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+            self.buffer = memoryview(self._mmap)
+        if end is not None:
+            self.buffer = self.buffer[:end]
+        self._view = None
+        self.position = stream.tell()
+        self.base = 0
+        self._pending = []
+        self._pending_size = 0
+
+    def _get_view(self):
+        # The buffer already is a view of the mapping
+        return self.buffer
+
+    def _fill(self, needed):
+        # The whole file is already mapped
+        return False
+
+    def close(self):
+        """
+        Release the mapping of the file. If payloads returned by the reader
+        are still referenced, the file stays mapped until they are gone.
+        """
+        buffer, self.buffer = self.buffer, memoryview(b'')
+        self.position = 0
+        if hasattr(buffer, 'release'):  # Python 3
+            buffer.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass
+            self._mmap = None
+
+
+def _boundary_pattern(endianness):
+    """Get a regex matching the type code of any boundary block type"""
+    try:
+        return _boundary_patterns[endianness]
+    except KeyError:
+        pattern = re.compile(b'|'.join(
+            re.escape(struct.pack(endianness + 'I', block_type))
+            for block_type in BOUNDARY_BLOCK_TYPES))
+        _boundary_patterns[endianness] = pattern
+        return pattern
+
+
+def is_block_boundary(buffer, offset, endianness, confirm=2):
+    """
+    Check whether a block plausibly starts at the given offset of a buffer.
+
+    The block must have a known type code, matching leading and trailing
+    lengths, and be followed by ``confirm`` more such blocks (or by the
+    end of the buffer).
+
+    :param buffer: the buffer containing the blocks
+    :param offset: offset of the candidate block
+    :param endianness: endianness of the section the block belongs to
+    :param confirm: number of following blocks to check
+    """
+    return _check_boundary(buffer, offset, endianness, confirm)
+
+
+def _check_boundary(buffer, offset, endianness, confirm, complete=True):
+    """
+    Implementation of :py:func:`is_block_boundary`. If the buffer is not
+    ``complete`` (ie. more data may follow), ``None`` is returned when
+    reaching its end before the check is over.
+    """
+    for _ in range(confirm + 1):
+        if offset == len(buffer):
+            return True if complete else None
+        try:
+            block_type, endianness, data, offset = \
+                unpack_block_from(buffer, offset, endianness)
+        except TruncatedFile:
+            return False if complete else None
+        except PcapngLoadError:
+            return False
+        if block_type not in BOUNDARY_BLOCK_TYPES:
+            return False
+    return True
+
+
+def find_block_boundary(buffer, start, endianness, end=None, confirm=2):
+    """
+    Find the first offset, at or after ``start``, where a block plausibly
+    starts (see :py:func:`is_block_boundary`).
+
+    Candidates are found by searching the buffer for the type codes of
+    known blocks, rather than trying every offset in turn, and must be
+    aligned to 32 bits (as all blocks are).
+
+    :param buffer: the buffer to search, usually a memory-mapped file
+    :param start: offset at which to start looking
+    :param endianness: endianness of the section being searched
+    :param end: offset at which to stop looking (defaults to the end of
+        the buffer)
+    :param confirm: number of blocks following a candidate to check before
+        accepting it
+    :returns: the offset of the block, or ``None`` if none was found
+    """
+    return _search_boundary(buffer, start, endianness, end, confirm)[0]
+
+
+def _search_boundary(buffer, start, endianness, end=None, confirm=2,
+                     complete=True):
+    """
+    Implementation of :py:func:`find_block_boundary`.
+
+    :returns: an ``(offset, conclusive)`` tuple. If the buffer is not
+        ``complete``, the search can stop on a candidate whose check
+        needs more data, which is then not ``conclusive``.
+    """
+    pattern = _boundary_pattern(endianness)
+    if end is None:
+        end = len(buffer)
+    position = start + (-start % 4)
+    while position < end:
+        match = pattern.search(buffer, position, end)
+        if match is None:
+            break
+        candidate = match.start()
+        if candidate % 4 == 0:
+            valid = _check_boundary(
+                buffer, candidate, endianness, confirm, complete)
+            if valid is None:
+                return candidate, False
+            if valid:
+                return candidate, True
+        position = candidate + 1 + (-(candidate + 1) % 4)
+    return None, True
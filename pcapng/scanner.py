@@ -1,16 +1,253 @@
-from pcapng.structs import (
-    read_int, read_block_data, read_section_header, SECTION_HEADER_MAGIC)
-from pcapng.constants.block_types import BLK_RESERVED, BLK_RESERVED_CORRUPTED
-from pcapng.exceptions import StreamEmpty, CorruptedFile
+import os
+import struct
+import time
+
+import six
+
+from pcapng.structs import SECTION_HEADER_MAGIC
+from pcapng.constants.block_types import (
+    BLK_RESERVED, BLK_RESERVED_CORRUPTED, BLK_INTERFACE, BLK_PACKET,
+    BLK_PACKET_SIMPLE, BLK_INTERFACE_STATS, BLK_ENHANCED_PACKET)
+from pcapng.exceptions import (
+    StreamEmpty, CorruptedFile, TruncatedFile, BadMagic)
+from pcapng.compression import open_decompressed
+from pcapng.batch import PacketBatch, BATCH_BLOCK_TYPES, DEFAULT_BATCH_SIZE
+from pcapng.views import PacketView, VIEW_BLOCK_TYPES
+from pcapng.readers import (
+    BufferedBlockReader, MmapBlockReader, DEFAULT_BUFFER_SIZE)
 import pcapng.blocks as blocks
 
 
-class FileScanner(object):
+# Clock used to time out following files (Python 2 has no monotonic clock)
+_monotonic = getattr(time, 'monotonic', time.time)
+
+
+class BlockParser(object):
+    """
+    Sans-IO pcap-ng parser.
+
+    Raw data is pushed into the parser in chunks of any size, as it becomes
+    available (eg. from a socket or a message queue), and the parser returns
+    the blocks completed by each chunk. No I/O happens in the parser itself.
+
+    Example usage:
+
+        .. code-block:: python
+
+            from pcapng import BlockParser
+
+            parser = BlockParser()
+            for chunk in chunks:
+                for block in parser.feed(chunk):
+                    pass  # do something with the block...
+            parser.close()
+
+    :param headers_only:
+        if ``True``, the packet data of packet blocks is skipped rather than
+        copied and decoded: their ``packet_data`` is a
+        :py:class:`~pcapng.structs.SkippedData` placeholder telling its
+        length, while their other fields and options are decoded as usual.
+        This is a lot cheaper for jobs only looking at packet metadata (eg.
+        counting packets, or looking at their timestamps).
+
+    :param block_types:
+        if given, a collection of block type codes (see
+        :py:mod:`pcapng.constants.block_types`): blocks of other types are
+        skipped, without being copied nor decoded. Section headers and
+        interface descriptions are always read, so that the sections and
+        their interfaces are known, but they are only returned if
+        their type is part of the collection.
+
+    :param interfaces:
+        if given, a collection of interface ids: blocks referring to other
+        interfaces (packets, interface descriptions and interface
+        statistics) are skipped, without being copied nor decoded. Note
+        that interface ids are numbered independently in each section.
+
+    :param section:
+        if given, the :py:class:`~pcapng.blocks.SectionHeader` (with its
+        interfaces registered) of the section the data starts in.
+        This allows to start parsing in the middle of a section, from a
+        block boundary.
+
+    :param zero_copy:
+        if ``True``, the ``packet_data`` of packet blocks (and the ``data``
+        of unknown blocks) is a :py:class:`memoryview` slice of the data
+        the parser was given (or read) rather than a copy. The data is
+        never modified, so the views remain valid for as long as they are
+        referenced; but each of them keeps alive the whole chunk of data it
+        was sliced from (typically a read buffer, see ``buffer_size``): use
+        ``bytes(...)`` or ``.tobytes()`` on the packets to be kept for long.
+    """
+    __slots__ = [ 'current_section', 'endianness', 'headers_only',
+                  'zero_copy', 'block_types', 'interfaces', '_reader',
+                  '_view_types', '_accept' ]
+
+    def __init__(self, headers_only=False, block_types=None, interfaces=None,
+                 section=None, zero_copy=False):
+        self.current_section = section
+        self.endianness = '='
+        if section is not None:
+            self.endianness = section.endianness
+        self.headers_only = headers_only
+        self.zero_copy = zero_copy
+        self.block_types = None
+        if block_types is not None:
+            self.block_types = frozenset(block_types)
+        self.interfaces = None
+        if interfaces is not None:
+            self.interfaces = frozenset(interfaces)
+        self._accept = None
+        if self.block_types is not None or self.interfaces is not None:
+            self._accept = self._filter_block
+        self._view_types = ()
+        if zero_copy:
+            self._view_types = _ZeroCopyTypes()
+        elif headers_only:
+            # Leave packet data in the read buffer, as it will be skipped
+            self._view_types = tuple(
+                block_type for block_type, cls in blocks.KNOWN_BLOCKS.items()
+                if issubclass(cls, blocks.BasePacketBlock))
+        self._reader = BufferedBlockReader(None)
+
+    @property
+    def offset(self):
+        """Offset, in the data, of the next block to be parsed"""
+        return self._reader.offset
+
+    def feed(self, data):
+        """
+        Push some more data into the parser.
+
+        :param data: a bytes-like object
+        :returns: a list of the blocks completed by this data
+        :raises: :py:exc:`~pcapng.exceptions.CorruptedFile` if the data
+            is not valid
+        """
+        self._reader.feed(data)
+        parsed = []
+        while True:
+            try:
+                block = self._read_block()
+            except (StreamEmpty, TruncatedFile):
+                # Waiting for more data
+                return parsed
+            if block is not None:
+                parsed.append(block)
+
+    def close(self):
+        """
+        Signal the end of the data.
+
+        :raises: :py:exc:`~pcapng.exceptions.TruncatedFile` if the data
+            ended in the middle of a block
+        """
+        pending = self._reader.buffered
+        if pending:
+            raise TruncatedFile(
+                'Data ended in the middle of a block ({0} bytes pending)'
+                .format(pending))
+
+    def _read_block(self, batch=None, views=None):
+        """
+        Read a block, returning ``None`` if it is filtered out.
+
+        If a :py:class:`~pcapng.batch.PacketBatch` is given, packet blocks
+        are appended to it rather than decoded, and the batch is returned
+        in their place.
+
+        If a dictionary of :py:class:`~pcapng.views.PacketView` (by block
+        type) is given, packet blocks are not decoded either: the view for
+        their type is pointed at them, and returned in their place.
+        """
+        view_types = self._view_types
+        if batch is not None:
+            view_types = BATCH_BLOCK_TYPES
+        elif views is not None and not self.zero_copy:
+            view_types = VIEW_BLOCK_TYPES
+        block_type, endianness, data = self._reader.read_block(
+            self.endianness, view_types, self._accept)
+
+        if block_type == SECTION_HEADER_MAGIC:
+            # Section information headers are special blocks in that they
+            # modify the state of the parser (to change current section /
+            # endianness)
+            self.endianness = endianness
+            # todo: make this use the standard schema facilities as well!
+            block = blocks.SectionHeader(raw=data, endianness=endianness)
+            self.current_section = block
+            if self._wants(block_type):
+                return block
+            return None
+
+        if self.current_section is None:
+            raise ValueError(
+                'File not starting with a proper section header')
+
+        if batch is not None and block_type != BLK_INTERFACE:
+            if block_type not in BATCH_BLOCK_TYPES:
+                return None
+            batch.append(block_type, data, self.current_section,
+                         not self.headers_only)
+            return batch
+
+        if views is not None and block_type in views:
+            return views[block_type].point_to(data, self.current_section)
+
+        block = make_block(self.current_section, block_type, data,
+                           self.headers_only)
+        if block_type != BLK_INTERFACE:
+            return block
+        # Interface descriptions are always read, to register them
+        # within their section, but may still be filtered out
+        if (self._wants(block_type) and
+                (self.interfaces is None or
+                 block.interface_id in self.interfaces)):
+            return block
+        return None
+
+    def _wants(self, block_type):
+        return self.block_types is None or block_type in self.block_types
+
+    def _filter_block(self, block_type, endianness, data):
+        """Decide whether to read a block, by peeking at its raw data"""
+        if block_type in (SECTION_HEADER_MAGIC, BLK_INTERFACE):
+            return True
+        if not self._wants(block_type):
+            return False
+        if self.interfaces is not None:
+            interface_id = peek_interface_id(block_type, data, endianness)
+            if interface_id is not None:
+                return interface_id in self.interfaces
+        return True
+
+
+class _ZeroCopyTypes(object):
+    """
+    Collection of the block types whose payload is returned as a view in
+    zero-copy mode: packet blocks, and unknown blocks. The other blocks
+    (section headers, interface descriptions, ...) are usually kept for
+    long, along with their section, so they don't hold on to read buffers.
+    """
+    __slots__ = [ '_copied' ]
+
+    def __init__(self):
+        self._copied = frozenset(
+            block_type for block_type, cls in blocks.KNOWN_BLOCKS.items()
+            if not issubclass(cls, blocks.BasePacketBlock))
+
+    def __contains__(self, block_type):
+        return block_type not in self._copied
+
+
+class FileScanner(BlockParser):
     """
     pcap-ng file scanner.
 
     This object can be iterated to get blocks out of a pcap-ng
     stream (a file or file-like object providing a .read() method).
+    It reads the data from the stream, and parses it the same way as
+    a :py:class:`BlockParser`.
 
     Example usage:
 
@@ -27,13 +264,97 @@ class FileScanner(object):
         a file-like object from which to read the data.
         If you need to parse data from some string you have entirely in-memory,
         just wrap it in a :py:class:`io.BytesIO` object.
+
+    :param use_mmap:
+        if ``True``, map the file in memory and walk its blocks by offset
+        instead of reading them from the stream (see
+        :py:class:`~pcapng.readers.MmapBlockReader`). ``stream`` must then be
+        a regular file, opened in binary mode.
+
+        In this mode, the ``packet_data`` of packet blocks (and the ``data``
+        of unknown blocks) is a :py:class:`memoryview` slice of the mapped
+        file rather than a copy: use ``bytes(...)`` or ``.tobytes()`` on it
+        if you need a real bytes object.
+
+    :param buffer_size:
+        amount of data read from the stream at once. Blocks are sliced out
+        of the buffered data (see
+        :py:class:`~pcapng.readers.BufferedBlockReader`), so the scanner
+        will usually have read past the last block it returned.
+
+    :param end:
+        if given, the stream offset (a block boundary) at which to stop
+        scanning.
+
+    :param recover:
+        if ``True``, don't stop on corrupted or truncated data: skip forward
+        to the next plausible block instead (see
+        :py:func:`~pcapng.readers.find_block_boundary`), and return a
+        :py:class:`SkippedRange` in place of the skipped data. This is meant
+        to salvage what can be out of damaged files.
+
+    :param follow:
+        if ``True``, keep following the file as it grows (eg. while it is
+        being written by a capture program), like ``tail -f`` does: at the
+        end of the file (or in the middle of a block being written), wait
+        for more data rather than stopping. If the file gets rotated
+        (replaced by a new file with the same name, or truncated), the
+        scanner switches to the new file. This cannot be used with
+        ``use_mmap``.
+
+    :param poll_interval:
+        in follow mode, the number of seconds to wait before checking
+        again for new data.
+
+    :param follow_timeout:
+        in follow mode, the number of seconds without new data after
+        which to stop following the file (by default, never stop).
+
+    :param decompress:
+        if ``True`` (the default), recognize captures compressed with gzip,
+        bzip2 or xz by their first bytes, and transparently decompress them
+        (see :py:func:`~pcapng.compression.open_decompressed`). The
+        decompression runs in a background thread, overlapping with the
+        decoding of blocks. Offsets are then offsets in the decompressed
+        data, and ``use_mmap`` is ignored. Compressed files cannot be
+        followed.
+
+    The ``headers_only``, ``block_types``, ``interfaces``, ``section`` and
+    ``zero_copy`` arguments are the same as for :py:class:`BlockParser`.
     """
-    __slots__ = [ 'stream', 'current_section', 'endianness' ]
+    __slots__ = [ 'stream', 'recover', 'follow', 'poll_interval',
+                  'follow_timeout', '_buffer_size', '_idle_since',
+                  '_rotated', '_opened', '_decompressed' ]
 
-    def __init__(self, stream):
+    def __init__(self, stream, use_mmap=False,
+                 buffer_size=DEFAULT_BUFFER_SIZE, headers_only=False,
+                 block_types=None, interfaces=None, section=None, end=None,
+                 recover=False, follow=False, poll_interval=1.0,
+                 follow_timeout=None, decompress=True, zero_copy=False):
+        super(FileScanner, self).__init__(
+            headers_only=headers_only, block_types=block_types,
+            interfaces=interfaces, section=section, zero_copy=zero_copy)
+        if follow and use_mmap:
+            raise ValueError('Cannot follow a memory-mapped file')
         self.stream = stream
-        self.current_section = None
-        self.endianness = '='
+        self.recover = recover
+        self.follow = follow
+        self.poll_interval = poll_interval
+        self.follow_timeout = follow_timeout
+        self._buffer_size = buffer_size
+        self._idle_since = None
+        self._rotated = False
+        self._opened = None  # File opened by the scanner, after a rotation
+        self._decompressed = None  # Decompressing stream, with its thread
+        if decompress and not follow:
+            decompressed = open_decompressed(stream, chunk_size=buffer_size)
+            if decompressed is not stream:
+                stream, use_mmap = decompressed, False
+                self._decompressed = decompressed
+        if use_mmap:
+            self._reader = MmapBlockReader(stream, end)
+        else:
+            self._reader = BufferedBlockReader(stream, buffer_size, end)
 
     def __iter__(self):
         while True:
@@ -42,62 +363,274 @@ class FileScanner(object):
             except StreamEmpty:
                 return
 
-    def _read_next_block(self):
-        block_type = self._read_int(32, False)
+    def feed(self, data):
+        raise TypeError('FileScanner reads its data from its stream')
 
-        if block_type == SECTION_HEADER_MAGIC:
-            block = self._read_section_header()
-            self.current_section = block
-            self.endianness = block.endianness
-            return block
+    def close(self):
+        """
+        Release what the scanner opened by itself: stop the decompression
+        thread of a compressed capture, and close the file opened after a
+        rotation. The stream the scanner was given is left open.
 
-        if self.current_section is None:
-            raise ValueError('File not starting with a proper section header')
+        The scanner can also be used as a context manager, which closes it
+        on exit.
+        """
+        if self._decompressed is not None:
+            self._decompressed.close()
+            self._decompressed = None
+        if self._opened is not None:
+            self._opened.close()
+            self._opened = None
 
-        block = self._read_block(block_type)
+    def __enter__(self):
+        return self
 
-        return block
+    def __exit__(self, *exc_info):
+        self.close()
 
-    def _read_section_header(self):
-        """
-        Section information headers are special blocks in that they
-        modify the state of the FileScanner instance (to change current
-        section / endianness)
+    def iter_batches(self, size=DEFAULT_BATCH_SIZE):
         """
+        Iterate over the packets in batches, rather than one block at a time.
 
-        section_info = read_section_header(self.stream)
-        self.endianness = section_info['endianness']  # todo: use property?
+        Packet headers are decoded straight into the columns of each
+        :py:class:`~pcapng.batch.PacketBatch`, and their data copied into a
+        single buffer, without building any block object; other blocks
+        (besides section headers and interface descriptions, which are
+        still decoded to know the sections' interfaces) are skipped.
+        Filters apply the same as when iterating over blocks.
 
-        # todo: make this use the standard schema facilities as well!
-        return blocks.SectionHeader(
-            raw=section_info['data'],
-            endianness=section_info['endianness'])
-
-    def _read_block(self, block_type):
+        :param size: number of packets per batch; the last batch may
+            be smaller
+        :returns: an iterator over :py:class:`~pcapng.batch.PacketBatch`
         """
-        Read the block payload and pass to the appropriate block constructor
+        if size < 1:
+            raise ValueError('Batch size must be positive')
+        batch = PacketBatch()
+        while True:
+            try:
+                block = self._read_next_block(batch)
+            except StreamEmpty:
+                break
+            if block is batch and len(batch) >= size:
+                yield batch
+                batch = PacketBatch()
+        if batch:
+            yield batch
+
+    def iter_views(self):
         """
-        data = read_block_data(self.stream, endianness=self.endianness)
+        Iterate over the blocks, seeing packet blocks through reused views.
 
-        if block_type in blocks.KNOWN_BLOCKS:
-            # This is a known block -- instantiate it
-            return self.current_section.new_member(blocks.KNOWN_BLOCKS[block_type], raw=data)
+        Rather than a new block object, each packet block is returned as a
+        :py:class:`~pcapng.views.PacketView`: the same view object for all
+        the packets of a given block type, pointed at each new packet in
+        turn. Other blocks are returned as usual. Filters apply the same as
+        when iterating over blocks.
 
-        if block_type in BLK_RESERVED_CORRUPTED:
-            raise CorruptedFile(
-                'Block type 0x{0:08X} is reserved to detect a corrupted file'
-                .format(block_type))
+        A view only shows the last packet it was pointed at: use its
+        :py:meth:`~pcapng.views.PacketView.freeze` method to keep a packet.
 
-        if block_type == BLK_RESERVED:
-            raise CorruptedFile(
-                'Block type 0x00000000 is reserved and should not be used '
-                'in capture files!')
+        :returns: an iterator over blocks and
+            :py:class:`~pcapng.views.PacketView`
+        """
+        views = dict((block_type, PacketView(block_type))
+                     for block_type in VIEW_BLOCK_TYPES)
+        while True:
+            try:
+                yield self._read_next_block(views=views)
+            except StreamEmpty:
+                return
 
-        return blocks.UnknownBlock(block_type, data)
+    def _read_next_block(self, batch=None, views=None):
+        while True:
+            start = self._reader.offset
+            try:
+                block = self._read_block(batch, views)
+            except (StreamEmpty, TruncatedFile) as error:
+                if self.follow and self._wait_for_data():
+                    continue
+                if isinstance(error, StreamEmpty) or not self.recover:
+                    raise
+                return self._skip(start, error)
+            except (CorruptedFile, BadMagic) as error:
+                if not self.recover:
+                    raise
+                return self._skip(start, error)
+            self._idle_since = None
+            if block is not None:
+                return block
 
-    def _read_int(self, size, signed=False):
+    def _skip(self, start, error):
+        if self._reader.offset == start:
+            # The block couldn't even be read
+            self._reader.resync(self.endianness)
+        return SkippedRange(start, self._reader.offset, error)
+
+    def _wait_for_data(self):
         """
-        Read an integer from the stream, using current endianness
+        Wait for more data to be written to the followed file, switching
+        to a new file if it got rotated.
+
+        :returns: ``False`` if the follow timeout expired
         """
-        return read_int(self.stream, size, signed=signed,
-                        endianness=self.endianness)
+        now = _monotonic()
+        if self._idle_since is None:
+            self._idle_since = now
+        elif (self.follow_timeout is not None and
+              now - self._idle_since >= self.follow_timeout):
+            return False
+
+        if self._rotated:
+            # Everything written to the old file was read: switch files
+            self._rotated = False
+            self._reopen()
+            return True
+
+        rotation = self._check_rotation()
+        if rotation == 'replaced':
+            # Read anything written to the old file before its rotation
+            self._rotated = True
+            return True
+        if rotation == 'truncated':
+            self.stream.seek(0)
+            self._reader = BufferedBlockReader(self.stream, self._buffer_size)
+            return True
+
+        time.sleep(self.poll_interval)
+        return True
+
+    def _check_rotation(self):
+        """Check whether the followed file was replaced or truncated"""
+        name = getattr(self.stream, 'name', None)
+        if not isinstance(name, six.string_types):
+            return None
+        try:
+            current = os.stat(name)
+            followed = os.fstat(self.stream.fileno())
+        except (AttributeError, IOError, OSError, ValueError):
+            # The new file might not have been created yet
+            return None
+        if (current.st_dev, current.st_ino) != \
+                (followed.st_dev, followed.st_ino):
+            return 'replaced'
+        if current.st_size < self._reader.offset:
+            return 'truncated'
+        return None
+
+    def _reopen(self):
+        """Switch to the new file, after a rotation"""
+        stream = open(self.stream.name, 'rb')
+        if self._opened is not None:
+            self._opened.close()
+        self.stream = self._opened = stream
+        self._reader = BufferedBlockReader(stream, self._buffer_size)
+
+
+def load_section(stream, section_offset, interface_offsets=()):
+    """
+    Load a section header, and register its interfaces, out of a seekable
+    stream. The stream position is preserved.
+
+    :param stream: the stream to read blocks from
+    :param section_offset: offset of the section header
+    :param interface_offsets: offsets of the section's interface
+        descriptions, in order
+    :returns: the :py:class:`~pcapng.blocks.SectionHeader`
+    """
+    position = stream.tell()
+    stream.seek(section_offset)
+    block_type, endianness, data = \
+        BufferedBlockReader(stream, 4096).read_block('=')
+    if block_type != SECTION_HEADER_MAGIC:
+        raise ValueError(
+            'No section header at offset {0}'.format(section_offset))
+    section = blocks.SectionHeader(raw=data, endianness=endianness)
+
+    for offset in interface_offsets:
+        stream.seek(offset)
+        block_type, endianness, data = \
+            BufferedBlockReader(stream, 4096).read_block(endianness)
+        if block_type != BLK_INTERFACE:
+            raise ValueError(
+                'No interface description at offset {0}'.format(offset))
+        make_block(section, block_type, data)
+
+    stream.seek(position)
+    return section
+
+
+def peek_interface_id(block_type, data, endianness):
+    """
+    Get the id of the interface a block refers to, straight from its raw
+    data (ie. without decoding the block).
+
+    :param block_type: the block type code
+    :param data: the raw block payload
+    :param endianness: endianness of the block's section
+    :returns: the interface id, or ``None`` for blocks not referring
+        to an interface (interface descriptions included)
+    """
+    if block_type in (BLK_ENHANCED_PACKET, BLK_INTERFACE_STATS):
+        if len(data) >= 4:
+            return struct.unpack_from(endianness + 'I', data)[0]
+    elif block_type == BLK_PACKET:
+        if len(data) >= 2:
+            return struct.unpack_from(endianness + 'H', data)[0]
+    elif block_type == BLK_PACKET_SIMPLE:
+        return 0
+    return None
+
+
+class SkippedRange(object):
+    """
+    Range of bytes skipped by a :py:class:`FileScanner` in recovery mode,
+    because they couldn't be read as blocks. It is returned by the scanner
+    in place of the skipped data.
+
+    :ivar start: offset of the first skipped byte
+    :ivar end: offset following the last skipped byte
+    :ivar error: the exception raised while reading the data
+    """
+    __slots__ = [ 'start', 'end', 'error' ]
+
+    def __init__(self, start, end, error):
+        self.start = start
+        self.end = end
+        self.error = error
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return '<SkippedRange start={0} end={1} error={2!r}>'.format(
+            self.start, self.end, self.error)
+
+
+def make_block(section, block_type, data, headers_only=False):
+    """
+    Pass the payload of a block to the appropriate block constructor.
+
+    :param section: the :py:class:`~pcapng.blocks.SectionHeader` the block
+        belongs to
+    :param block_type: the block type code
+    :param data: the raw block payload
+    :param headers_only: whether packet blocks should skip their packet data
+    """
+    if block_type in blocks.KNOWN_BLOCKS:
+        # This is a known block -- instantiate it
+        cls = blocks.KNOWN_BLOCKS[block_type]
+        if headers_only and issubclass(cls, blocks.BasePacketBlock):
+            return section.new_member(cls, raw=data, headers_only=True)
+        return section.new_member(cls, raw=data)
+
+    if block_type in BLK_RESERVED_CORRUPTED:
+        raise CorruptedFile(
+            'Block type 0x{0:08X} is reserved to detect a corrupted file'
+            .format(block_type))
+
+    if block_type == BLK_RESERVED:
+        raise CorruptedFile(
+            'Block type 0x00000000 is reserved and should not be used '
+            'in capture files!')
+
+    return blocks.UnknownBlock(block_type, data)
@@ -53,11 +53,12 @@ TYPE_I16 = 'i16'
 TYPE_I32 = 'i32'
 TYPE_I64 = 'i64'
 
+# Size (in bits) and signedness of the numeric types
 _numeric_types = {
-        TYPE_U8: 'B', TYPE_I8: 'b',
-        TYPE_U16: 'H', TYPE_I16: 'h',
-        TYPE_U32: 'I', TYPE_I32: 'i',
-        TYPE_U64: 'Q', TYPE_I64: 'q',
+        TYPE_U8: (8, False), TYPE_I8: (8, True),
+        TYPE_U16: (16, False), TYPE_I16: (16, True),
+        TYPE_U32: (32, False), TYPE_I32: (32, True),
+        TYPE_U64: (64, False), TYPE_I64: (64, True),
 }
 
 NRB_RECORD_END = 0
@@ -65,6 +66,39 @@ NRB_RECORD_IPv4 = 1
 NRB_RECORD_IPv6 = 2
 
 
+# Precompiled structs of integers, by (size, signed, endianness)
+_int_structs = {}
+
+# Headers of options and name resolution records: code (or type) and length
+_RECORD_HEADERS = dict(
+    (endianness, struct.Struct(endianness + 'HH')) for endianness in '<>!=')
+
+
+def int_struct(size, signed=False, endianness='='):
+    """
+    Get a precompiled :py:class:`struct.Struct` for an integer number.
+
+    Structs are created once and cached, so that reading or writing a
+    number doesn't need to build a format string nor to parse it.
+
+    :param size: the size, in bits, of the number.
+        Supported sizes are: 8, 16, 32 and 64 bits.
+    :param signed: Whether the number is signed.
+    :param endianness: the endianness, in the same format used by Python
+        :py:mod:`struct` module.
+    """
+    try:
+        return _int_structs[size, signed, endianness]
+    except KeyError:
+        pass
+    assert endianness in '<>!='
+    fmt = INT_FORMATS[size]
+    fmt = fmt.lower() if signed else fmt.upper()
+    compiled = struct.Struct(endianness + fmt)
+    _int_structs[size, signed, endianness] = compiled
+    return compiled
+
+
 def read_int(stream, size, signed=False, endianness='='):
     """
     Read (and decode) an integer number from a binary stream.
@@ -80,13 +114,8 @@ def read_int(stream, size, signed=False, endianness='='):
         (big endian), '<' little endian, '>' big endian.
     :return: the read integer number
     """
-    fmt = INT_FORMATS.get(size)
-    fmt = fmt.lower() if signed else fmt.upper()
-    assert endianness in '<>!='
-    fmt = endianness + fmt
-    size_bytes = size // 8
-    data = read_bytes(stream, size_bytes)
-    return struct.unpack(fmt, data)[0]
+    compiled = int_struct(size, signed, endianness)
+    return compiled.unpack(read_bytes(stream, compiled.size))[0]
 
 def write_int(number, stream, size, signed=False, endianness='='):
     """
@@ -104,12 +133,7 @@ def write_int(number, stream, size, signed=False, endianness='='):
         (big endian), '<' little endian, '>' big endian.
 
     """
-    fmt = INT_FORMATS.get(size)
-    fmt = fmt.lower() if signed else fmt.upper()
-    assert endianness in '<>!='
-    fmt = endianness + fmt
-    size_bytes = size // 8
-    write_bytes(stream, struct.pack(fmt, number))
+    write_bytes(stream, int_struct(size, signed, endianness).pack(number))
 
 def read_section_header(stream):
     """
@@ -187,6 +211,136 @@ def read_block_data(stream, endianness):
     return block_data
 
 
+def unpack_block_from(buffer, offset, endianness):
+    """
+    Unpack a whole block from a buffer, starting at the given offset.
+
+    This is the buffer-based counterpart of :py:func:`read_section_header`
+    and :py:func:`read_block_data`: instead of pulling fields out of a
+    stream, it works on offsets into an object supporting the buffer
+    protocol. If ``buffer`` is a :py:class:`memoryview`, the returned
+    payload is a slice of it, so no data is copied.
+
+    :param buffer: the buffer containing the block
+    :param offset: offset of the block start (ie. of its block type)
+    :param endianness: endianness of the current section. It is ignored for
+        section headers, whose endianness is detected from the byte order
+        magic instead.
+    :returns: a ``(block_type, endianness, data, next_offset)`` tuple.
+        As with :py:func:`read_section_header`, the byte order magic is
+        not included in the data of section headers.
+    :raises: :py:exc:`~pcapng.exceptions.StreamEmpty` if ``offset`` is at
+        the end of the buffer
+    :raises: :py:exc:`~pcapng.exceptions.TruncatedFile` if the buffer ends
+        before the end of the block
+    :raises: :py:exc:`~pcapng.exceptions.CorruptedFile` if the block lengths
+        are invalid or don't match
+    """
+
+    available = len(buffer) - offset
+    if available <= 0:
+        raise StreamEmpty('Zero bytes read from stream')
+
+    if available < 12:
+        raise TruncatedFile('Trying to read {0} bytes, only got {1}'
+                            .format(12, available))
+
+    block_type = struct.unpack_from(endianness + 'I', buffer, offset)[0]
+
+    if block_type == SECTION_HEADER_MAGIC:
+        byte_order_magic = struct.unpack_from('>I', buffer, offset + 8)[0]
+        if byte_order_magic == BYTE_ORDER_MAGIC:
+            endianness = '>'
+        elif byte_order_magic == BYTE_ORDER_MAGIC_INVERSE:
+            endianness = '<'
+        else:
+            raise BadMagic('Wrong byte order magic: got 0x{0:08X}, expected '
+                           '0x{1:08X} or 0x{2:08X}'
+                           .format(byte_order_magic, BYTE_ORDER_MAGIC,
+                                   BYTE_ORDER_MAGIC_INVERSE))
+        header_size = 12
+    else:
+        header_size = 8
+
+    block_length = struct.unpack_from(endianness + 'I', buffer, offset + 4)[0]
+    payload_length = block_length - header_size - 4
+    if payload_length < 0:
+        raise CorruptedFile('Invalid block length: {0}'.format(block_length))
+
+    start = offset + header_size
+    end = start + payload_length + (-payload_length % 4)
+    if end + 4 > len(buffer):
+        raise TruncatedFile('Trying to read {0} bytes, only got {1}'
+                            .format(end + 4 - offset, available))
+
+    block_length2 = struct.unpack_from(endianness + 'I', buffer, end)[0]
+    if block_length != block_length2:
+        raise CorruptedFile('Mismatching block lengths: {0} and {1}'
+                            .format(block_length, block_length2))
+
+    return (block_type, endianness, buffer[start:start + payload_length],
+            end + 4)
+
+
+class BufferStream(object):
+    """
+    Minimal read-only file-like object over a buffer.
+
+    Unlike :py:class:`io.BytesIO`, reading from a :py:class:`memoryview`
+    returns slices of it rather than copies, which allows decoding blocks
+    without copying their packet data.
+
+    :param buffer: the buffer to read from
+    """
+    __slots__ = [ 'buffer', 'position' ]
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.position = 0
+
+    def read(self, size=-1):
+        start = self.position
+        if size is None or size < 0:
+            self.position = len(self.buffer)
+        else:
+            self.position = min(start + size, len(self.buffer))
+        return self.buffer[start:self.position]
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self.position
+        elif whence == 2:
+            offset += len(self.buffer)
+        if offset < 0:
+            raise ValueError('Negative seek position {0}'.format(offset))
+        self.position = offset
+        return offset
+
+
+def stream_from_buffer(data):
+    """
+    Wrap some raw block data in a file-like object, suitable for
+    :py:func:`struct_decode`.
+
+    Memory views are wrapped in a :py:class:`BufferStream`, so that
+    slices read from it still refer to the original buffer; anything
+    else is wrapped in a :py:class:`io.BytesIO`.
+    """
+    if isinstance(data, memoryview):
+        return BufferStream(data)
+    return six.BytesIO(data)
+
+
+def _as_bytes(data):
+    """Make sure data read from a stream is a bytes object, not a view"""
+    if isinstance(data, memoryview):
+        return data.tobytes()
+    return data
+
+
 def read_bytes(stream, size):
     """
     Read the given amount of raw bytes from a stream.
@@ -205,11 +359,48 @@ def read_bytes(stream, size):
     data = stream.read(size)
     if len(data) == 0:
         raise StreamEmpty('Zero bytes read from stream')
-    if len(data) < size:
-        raise TruncatedFile('Trying to read {0} bytes, only got {1}'
-                            .format(size, len(data)))
+    while len(data) < size:
+        # Pipes, sockets and unbuffered streams may return less data
+        # than requested: only an empty read means we reached the end
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            raise TruncatedFile('Trying to read {0} bytes, only got {1}'
+                                .format(size, len(data)))
+        data += chunk
     return data
 
+
+def read_record_header(stream, endianness):
+    """
+    Read the header of an option or of a name resolution record: its code
+    (or type) and the length of its value, both uint16.
+
+    The header is read at once; the fields are only read one after the
+    other when the data ends early, so that a trailing end marker missing
+    its length still ends the options (or records).
+
+    :returns: a ``(code, length)`` tuple
+    :raises: :py:exc:`~pcapng.exceptions.StreamEmpty` if the data ends
+        before the length (even if after the code)
+    :raises: :py:exc:`~pcapng.exceptions.TruncatedFile` if the data ends
+        in the middle of the code
+    """
+    header = stream.read(4)
+    if len(header) == 4:
+        return _RECORD_HEADERS[endianness].unpack(header)
+    while 0 < len(header) < 4:
+        chunk = stream.read(4 - len(header))
+        if not chunk:
+            break
+        header += chunk
+    if len(header) == 4:
+        return _RECORD_HEADERS[endianness].unpack(header)
+    if len(header) % 2:
+        # Ended in the middle of the code, or of the length
+        raise TruncatedFile('Trying to read 2 bytes, only got 1')
+    raise StreamEmpty('Zero bytes read from stream')
+
+
 def write_bytes(stream, data):
     """
     Write the given amount of raw bytes to a stream.
@@ -234,7 +425,12 @@ def read_bytes_padded(stream, size, pad_block_size=4):
         were read
     """
 
-    if stream.tell() % pad_block_size != 0:
+    try:
+        position = stream.tell()
+    except (IOError, OSError, ValueError):
+        # Non-seekable streams (eg. pipes) cannot tell their position
+        position = 0
+    if position % pad_block_size != 0:
         raise RuntimeError('Stream is misaligned!')
 
     data = read_bytes(stream, size)
@@ -243,6 +439,22 @@ def read_bytes_padded(stream, size, pad_block_size=4):
         read_bytes(stream, padding)
     return data
 
+
+def skip_bytes_padded(stream, size, pad_block_size=4):
+    """
+    Skip the given amount of bytes in a stream, plus any necessary extra
+    byte to align up to the pad_block_size-sized next block, without
+    reading them.
+
+    :param stream: a seekable stream
+    :param size: the size to skip, in bytes
+    :returns: a :py:class:`SkippedData` placeholder for the skipped bytes
+    """
+
+    padding = (pad_block_size - (size % pad_block_size)) % pad_block_size
+    stream.seek(size + padding, 1)
+    return SkippedData(size)
+
 def write_bytes_padded(stream, data, pad_block_size=4):
     """
     Read the given amount of bytes from a stream, plus read and discard
@@ -260,7 +472,7 @@ def write_bytes_padded(stream, data, pad_block_size=4):
     write_bytes(stream, data)
     padding = (pad_block_size - (len(data) % pad_block_size)) % pad_block_size
     if padding > 0:
-        write_bytes(stream, bytes([0] * padding))
+        write_bytes(stream, b'\x00' * padding)
 
 class StructField(object):
     """Abstract base class for struct fields"""
@@ -340,16 +552,19 @@ class OptionsField(StructField):
 
     :param options_schema:
         Same as the ``schema`` parameter to :py:class:`Options` class
-        constructor.
+        constructor. It is compiled once, into :py:attr:`compiled_schema`
+        (see :py:class:`OptionsSchema`), which is shared by all the options
+        loaded by this field.
     """
-    __slots__ = [ 'options_schema' ]
+    __slots__ = [ 'options_schema', 'compiled_schema' ]
 
     def __init__(self, options_schema):
         self.options_schema = options_schema
+        self.compiled_schema = OptionsSchema.compile(options_schema)
 
     def load(self, stream, endianness, seen=None):
         options = read_options(stream, endianness)
-        return Options(schema=self.options_schema, data=options,
+        return Options(schema=self.compiled_schema, data=options,
                        endianness=endianness)
 
     def encode(self, options, stream, endianness):
@@ -380,11 +595,49 @@ class PacketBytes(StructField):
         return read_bytes_padded(stream, length)
 
     def encode(self, packet, stream, endianness=None):
+        if isinstance(packet, SkippedData):
+            raise ValueError("Packet data was skipped while reading")
         if not packet:
             raise ValueError("Packet invalid")
         write_bytes_padded(stream, packet)
 
 
+class SkippedPacketBytes(PacketBytes):
+    """
+    Packet data field which is skipped rather than read, used to decode
+    only the headers of packet blocks. It loads as a :py:class:`SkippedData`
+    placeholder.
+    """
+    __slots__ = []
+
+    def load(self, stream, endianness, seen=None):
+        try:
+            length = seen[self.dependency]
+        except (TypeError, KeyError):
+            raise PcapngLoadError(
+                "SkippedPacketBytes dependent on field '{0}' which was never "
+                "found".format(self.dependency))
+        return skip_bytes_padded(stream, length)
+
+
+class SkippedData(object):
+    """
+    Placeholder for some data which was skipped rather than read.
+
+    It only knows the size of the data, which is returned by ``len()``.
+    """
+    __slots__ = [ 'size' ]
+
+    def __init__(self, size):
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return '<SkippedData ({0} bytes)>'.format(self.size)
+
+
 class ListField(StructField):
     """
     A list field is a variable amount of fields of some other type.
@@ -448,13 +701,12 @@ class NameResolutionRecordField(StructField):
     __slots__ = []
 
     def load(self, stream, endianness, seen=None):
-        record_type = read_int(stream, 16, False, endianness)
-        record_length = read_int(stream, 16, False, endianness)
+        record_type, record_length = read_record_header(stream, endianness)
 
         if record_type == NRB_RECORD_END:
             raise StreamEmpty('End marker reached')
 
-        data = read_bytes_padded(stream, record_length)
+        data = _as_bytes(read_bytes_padded(stream, record_length))
 
         if record_type == NRB_RECORD_IPv4:
             return {
@@ -512,14 +764,14 @@ def read_options(stream, endianness):
     def _iter_read_options(stream, endianness):
         while True:
             try:
-                option_code = read_int(stream, 16, False, endianness)
-                option_length = read_int(stream, 16, False, endianness)
+                option_code, option_length = \
+                    read_record_header(stream, endianness)
 
                 if option_code == 0:  # End of options
                     return
 
                 payload = read_bytes_padded(stream, option_length)
-                yield option_code, payload
+                yield option_code, _as_bytes(payload)
 
             except StreamEmpty:
                 return
@@ -543,9 +795,9 @@ def write_options(stream, options):
         return
 
     for key in options:
-        code = options._field_names[key]
+        code = options._schema.codes[key]
         values = options.get_all_raw(key)
-        if len(values) > 1 and not options.schema[code].multiple:
+        if len(values) > 1 and not options._schema.options[code].multiple:
             strictness.problem("writing repeated option {} '{}' not permitted by pcapng spec".format(code, options._get_name_alias(code)))
             if strictness.should_fix():
                 values = values[:1]
@@ -558,32 +810,42 @@ def write_options(stream, options):
 
 
 class EPBFlags(FlagWord):
-    """Class representing the epb_flags option on an EPB"""
+    """
+    Class representing the epb_flags option on an EPB.
+
+    Its layout is shared by all instances, which only hold the flag word;
+    the class methods of :py:class:`~pcapng.flags.FlagWord` query many raw
+    flag words at once, eg. ``EPBFlags.count(words, err_crc=True)``.
+    """
     __slots__ = []
 
+    flag_schema = [
+        FlagField('inout', FlagEnum, 2, ('NA', 'inbound', 'outbound')),
+        FlagField('casttype', FlagEnum, 3,
+                  ('NA', 'unicast', 'multicast', 'broadcast', 'promiscuous')),
+        FlagField('fcslen', FlagUInt, 4),
+        FlagField('reserved', FlagUInt, 7),
+        FlagField('err_16', FlagBool),
+        FlagField('err_17', FlagBool),
+        FlagField('err_18', FlagBool),
+        FlagField('err_19', FlagBool),
+        FlagField('err_20', FlagBool),
+        FlagField('err_21', FlagBool),
+        FlagField('err_22', FlagBool),
+        FlagField('err_23', FlagBool),
+        FlagField('err_crc', FlagBool),
+        FlagField('err_long', FlagBool),
+        FlagField('err_short', FlagBool),
+        FlagField('err_frame_gap', FlagBool),
+        FlagField('err_frame_align', FlagBool),
+        FlagField('err_frame_delim', FlagBool),
+        FlagField('err_preamble', FlagBool),
+        FlagField('err_symbol', FlagBool),
+    ]
+    nbits = 32
+
     def __init__(self, val=0):
-        super(EPBFlags, self).__init__([
-                FlagField('inout', FlagEnum, 2, ('NA', 'inbound', 'outbound')),
-                FlagField('casttype', FlagEnum, 3, ('NA', 'unicast', 'multicast', 'broadcast', 'promiscuous')),
-                FlagField('fcslen', FlagUInt, 4),
-                FlagField('reserved', FlagUInt, 7),
-                FlagField('err_16', FlagBool),
-                FlagField('err_17', FlagBool),
-                FlagField('err_18', FlagBool),
-                FlagField('err_19', FlagBool),
-                FlagField('err_20', FlagBool),
-                FlagField('err_21', FlagBool),
-                FlagField('err_22', FlagBool),
-                FlagField('err_23', FlagBool),
-                FlagField('err_crc', FlagBool),
-                FlagField('err_long', FlagBool),
-                FlagField('err_short', FlagBool),
-                FlagField('err_frame_gap', FlagBool),
-                FlagField('err_frame_align', FlagBool),
-                FlagField('err_frame_delim', FlagBool),
-                FlagField('err_preamble', FlagBool),
-                FlagField('err_symbol', FlagBool),
-            ], nbits=32, initial=val)
+        self._value = val
 
 
 # Class representing a single option schema for Options.
@@ -591,6 +853,59 @@ class EPBFlags(FlagWord):
 Option = namedtuple('Option', ('code', 'name', 'ftype', 'multiple'),
         defaults=(None, False))
 
+# This is the default schema, common to all objects
+DEFAULT_OPTIONS = (
+    Option(0, 'opt_endofopt'),
+    Option(1, 'opt_comment', TYPE_STRING, multiple=True),
+    # The spec calls all these next options ``opt_custom`` --
+    # I've renamed them here so they can be told apart
+    Option(2988, 'custom_str_safe', TYPE_OPT_CUSTOM_STR, multiple=True),
+    Option(2989, 'custom_bytes_safe', TYPE_OPT_CUSTOM_BYTES, multiple=True),
+    Option(19372, 'custom_str', TYPE_OPT_CUSTOM_STR, multiple=True),
+    Option(19373, 'custom_bytes', TYPE_OPT_CUSTOM_BYTES, multiple=True),
+)
+
+
+class OptionsSchema(object):
+    """
+    Compiled schema of options: the known options (the default ones
+    included), indexed by code and by name.
+
+    It is computed once per options field (see :py:class:`OptionsField`),
+    and shared (read-only) by all the :py:class:`Options` objects using
+    that field, so that these only hold their own data. Use
+    :py:meth:`compile` to get one.
+
+    :ivar options: the known options: ``{<code>: Option(...)}``
+    :ivar codes: the codes of the known options: ``{<name>: <code>}``
+    """
+    __slots__ = [ 'options', 'codes' ]
+
+    def __init__(self, schema):
+        self.options = {}
+        for item in DEFAULT_OPTIONS + tuple(schema):
+            if not isinstance(item, Option):
+                raise TypeError("expected option, got '{}'".format(item))
+            self.options[item.code] = item
+        self.codes = dict(
+            (item.name, item.code) for item in self.options.values())
+
+    @classmethod
+    def compile(cls, schema):
+        """
+        Get the compiled form of a schema.
+
+        :param schema: a list of :py:class:`Option` objects, which gets
+            compiled, or an already compiled schema, returned as is
+        """
+        if isinstance(schema, cls):
+            return schema
+        return cls(schema)
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(
+            self.__class__.__name__, list(self.options.values()))
+
 class Options(Mapping):
     """
     Wrapper object used to easily access the contents of an "options"
@@ -608,7 +923,8 @@ class Options(Mapping):
         to a dictionary).
 
     :param schema:
-        Definition of the known options: a list of Option objects.
+        Definition of the known options: a list of Option objects (or an
+        :py:class:`OptionsSchema`).
 
         The following value types are currently supported:
 
@@ -636,50 +952,67 @@ class Options(Mapping):
     :param endianness:
         The current endianness of the section these options came from.
         Required in order to load numeric fields.
+
+    Values are kept in their raw form until first accessed, then decoded
+    (all the values of an option at once) and memoized, so that options
+    never looked at are never decoded.
     """
     __slots__ = [
-            'schema',
-            '_field_names',
-            'data',
+            '_schema',
+            '_data',
             'endianness',
+            '_pending',
     ]
 
     def __init__(self, schema, data, endianness):
-        self.schema = {}  # Schema of option fields: {<code>: Option(...)}
-        self._field_names = {}  # Map names to codes
-        self.data = {}  # List of (code, value) tuples
+        self._schema = OptionsSchema.compile(schema)  # Shared, read-only
+        # Values of the options, raw for codes in _pending:
+        # {<code>: [<value>, ...]}
+        self._data = {}
         self.endianness = endianness  # one of '<>!='
-
-        # This is the default schema, common to all objects
-        for item in [
-            Option(0, 'opt_endofopt'),
-            Option(1, 'opt_comment', TYPE_STRING, multiple=True),
-            # The spec calls all these next options ``opt_custom`` --
-            # I've renamed them here so they can be told apart
-            Option(2988, 'custom_str_safe', TYPE_OPT_CUSTOM_STR, multiple=True),
-            Option(2989, 'custom_bytes_safe', TYPE_OPT_CUSTOM_BYTES, multiple=True),
-            Option(19372, 'custom_str', TYPE_OPT_CUSTOM_STR, multiple=True),
-            Option(19373, 'custom_bytes', TYPE_OPT_CUSTOM_BYTES, multiple=True),
-            ] + list(schema):
-            if not isinstance(item, Option):
-                raise TypeError("expected option, got '{}'".format(item))
-            self.schema[item.code] = item
-        self._field_names = { x.name : x.code for x in self.schema.values() }
+        self._pending = set()  # Codes whose values are still raw
 
         # Update raw data with current values
         self._update_data(data)
 
+    @property
+    def data(self):
+        """
+        Values of the options: ``{<code>: [<value>, ...]}``. Accessing it
+        decodes the values of all the options.
+        """
+        for code in list(self._pending):
+            self._values(code)
+        return self._data
+
+    @property
+    def schema(self):
+        """Schema of option fields: ``{<code>: Option(...)}``"""
+        return self._schema.options
+
+    @property
+    def _field_names(self):
+        """Map names to codes"""
+        return self._schema.codes
+
     # -------------------- Nice interface :) --------------------
 
     def __getitem__(self, name):
         code = self._resolve_name(name)
-        return self.data[code][0]
+        return self._values(code)[0]
 
     def __len__(self):
-        return len(self.data)
+        return len(self._data)
+
+    def __contains__(self, name):
+        # Don't decode the values (as looking them up would)
+        try:
+            return self._resolve_name(name) in self._data
+        except KeyError:
+            return False
 
     def __iter__(self):
-        for key in self.data:
+        for key in self._data:
             yield self._get_name_alias(key)
 
     def __setitem__(self, name, value):
@@ -690,30 +1023,39 @@ class Options(Mapping):
         code = self._resolve_name(name)
         if isinstance(value, Iterable) and not isinstance(value, six.string_types+(six.binary_type,)):
             # We're being assigned a list/iterable, use its values for our list
-            self.data[code] = list(value)
+            self._data[code] = list(value)
+            self._pending.discard(code)
             self._check_multiples(code)
         else:
             # We're being assigned a single value, store as a one-item list
-            self.data[code] = [ value ]
+            self._data[code] = [ value ]
+            self._pending.discard(code)
 
     def __delitem__(self, name):
         code = self._resolve_name(name)
-        del self.data[code]
+        del self._data[code]
+        self._pending.discard(code)
 
     def get_all(self, name):
         """Get all values for the given option"""
         code = self._resolve_name(name)
-        return self.data[code]
+        return self._values(code)
 
     def get_raw(self, name):
         """Get raw value for the given option"""
         code = self._resolve_name(name)
-        return self._encode_value(self.data[code][0], self.schema[code].ftype)
+        if code in self._pending:
+            return self._data[code][0]
+        return self._encode_value(
+            self._data[code][0], self._schema.options[code].ftype)
 
     def get_all_raw(self, name):
         """Get all raw values for the given option"""
         code = self._resolve_name(name)
-        return [self._encode_value(x, self.schema[code].ftype) for x in self.data[code]]
+        if code in self._pending:
+            return list(self._data[code])
+        ftype = self._schema.options[code].ftype
+        return [self._encode_value(x, ftype) for x in self._data[code]]
 
     def iter_all_items(self):
         """
@@ -726,9 +1068,9 @@ class Options(Mapping):
     def add(self, name, value):
         """Add a value to the given-named option"""
         code = self._resolve_name(name)
-        if code not in self.data:
-            self.data[code] = []
-        self.data[code].append(value)
+        if code not in self._data:
+            self._data[code] = []
+        self._values(code).append(value)
         self._check_multiples(code)
 
     def __repr__(self):
@@ -743,47 +1085,66 @@ class Options(Mapping):
             return
 
         for code, value in data:
-            if code not in self.data:
-                self.data[code] = []
-            self.data[code].append(self._decode(code, value))
-            if len(self.data[code]) > 1 and not self.schema[code].multiple:
+            if code not in self._data:
+                self._data[code] = []
+                self._pending.add(code)
+            if code in self._pending:
+                # Decoded when first accessed
+                self._data[code].append(value)
+            else:
+                self._data[code].append(self._decode(code, value))
+            if (len(self._data[code]) > 1 and
+                    not self._schema.options[code].multiple):
                 try:
-                    name = "{} '{}'".format(code, self.schema[code].name)
+                    name = "{} '{}'".format(
+                        code, self._schema.options[code].name)
                 except KeyError:
                     name = "{} (unknown)".format(code)
                 # This code gets called when reading a file. We don't want
                 # to potentially abort in this case, just warn
                 strictness.warn("repeated option {} not permitted by pcapng spec".format(name))
 
+    def _values(self, code):
+        """Get the list of values of an option, decoding them if needed"""
+        values = self._data[code]
+        if code in self._pending:
+            if code in self._schema.options:
+                ftype = self._schema.options[code].ftype
+                values[:] = [self._decode_value(value, ftype)
+                             for value in values]
+            self._pending.discard(code)
+        return values
+
     def _check_multiples(self, code):
         """Check if a non-repeatable option is repeated"""
-        if len(self.data[code]) > 1 and not self.schema[code].multiple:
+        if (len(self._data[code]) > 1 and
+                not self._schema.options[code].multiple):
             strictness.problem("repeated option {} '{}' not permitted by pcapng spec".format(code, self._get_name_alias(code)))
             if strictness.should_fix():
-                self.data[code] = self.data[code][:1]
+                self._data[code] = self._data[code][:1]
 
     def _resolve_name(self, name):
-        code = self._field_names.get(name, name)
+        code = self._schema.codes.get(name, name)
         if code == 0:
             # opt_endofopt is special and should never be touched by the user
             raise KeyError(name)
         return code
 
     def _get_name_alias(self, code):
-        if code in self.schema:
-            return self.schema[code].name
+        if code in self._schema.options:
+            return self._schema.options[code].name
         return code
 
     def _decode(self, code, value):
         code = self._resolve_name(code)
-        if code in self.schema:
-            return self._decode_value(value, self.schema[code].ftype)
+        if code in self._schema.options:
+            return self._decode_value(value, self._schema.options[code].ftype)
         return value
 
     def _decode_all(self, code, values):
         code = self._resolve_name(code)
-        if code in self.schema:
-            return [self._decode_value(value, self.schema[code].ftype)
+        if code in self._schema.options:
+            return [self._decode_value(value, self._schema.options[code].ftype)
                     for value in values]
         return values
 
@@ -813,8 +1174,8 @@ class Options(Mapping):
             return six.u(value)
 
         if ftype in _numeric_types:
-            fmt = self.endianness + _numeric_types[ftype]
-            return struct.unpack(fmt, value)[0]
+            size, signed = _numeric_types[ftype]
+            return int_struct(size, signed, self.endianness).unpack(value)[0]
 
         if ftype == TYPE_IPV4:
             return unpack_ipv4(value)
@@ -839,17 +1200,16 @@ class Options(Mapping):
             return (value[0], value[1:])
 
         if ftype == TYPE_EPBFLAGS:
-            fmt = self.endianness + _numeric_types[TYPE_U32]
-            flg = struct.unpack(fmt, value)[0]
+            flg = int_struct(32, False, self.endianness).unpack(value)[0]
             return EPBFlags(flg)
 
         if ftype == TYPE_OPT_CUSTOM_STR:
-            fmt = self.endianness + _numeric_types[TYPE_U32]
-            return (struct.unpack(fmt, value[0:4]), value[4:].decode('utf-8'))
+            compiled = int_struct(32, False, self.endianness)
+            return (compiled.unpack(value[0:4]), value[4:].decode('utf-8'))
 
         if ftype == TYPE_OPT_CUSTOM_BYTES:
-            fmt = self.endianness + _numeric_types[TYPE_U32]
-            return (struct.unpack(fmt, value[0:4]), value[4:])
+            compiled = int_struct(32, False, self.endianness)
+            return (compiled.unpack(value[0:4]), value[4:])
 
         raise ValueError('Unsupported field type: {0}'.format(ftype))
 
@@ -881,8 +1241,8 @@ class Options(Mapping):
             return value.encode('utf-8')
 
         if ftype in _numeric_types:
-            fmt = self.endianness + _numeric_types[ftype]
-            return struct.pack(fmt, value)
+            size, signed = _numeric_types[ftype]
+            return int_struct(size, signed, self.endianness).pack(value)
 
         if ftype == TYPE_IPV4:
             return pack_ipv4(value)
@@ -906,16 +1266,15 @@ class Options(Mapping):
             return value[0]+value[1]
 
         if ftype == TYPE_EPBFLAGS:
-            fmt = self.endianness + _numeric_types[TYPE_U32]
-            return struct.pack(fmt, int(value))
+            return int_struct(32, False, self.endianness).pack(int(value))
 
         if ftype == TYPE_OPT_CUSTOM_STR:
-            fmt = self.endianness + _numeric_types[TYPE_U32]
-            return struct.pack(fmt, value[0]) + value[1].encode('utf-8')
+            compiled = int_struct(32, False, self.endianness)
+            return compiled.pack(value[0]) + value[1].encode('utf-8')
 
         if ftype == TYPE_OPT_CUSTOM_BYTES:
-            fmt = self.endianness + _numeric_types[TYPE_U32]
-            return struct.pack(fmt, value[0]) + value[1]
+            compiled = int_struct(32, False, self.endianness)
+            return compiled.pack(value[0]) + value[1]
 
         raise ValueError('Unsupported field type: {0}'.format(ftype))
 
@@ -949,8 +1308,72 @@ def struct_decode(schema, stream, endianness='='):
     return decoded
 
 
+def compile_schema(schema, headers_only=False):
+    """
+    Compile a schema into a decoder function, equivalent to (but faster
+    than) calling :py:func:`struct_decode` with it.
+
+    Each run of consecutive :py:class:`IntField` is fused into a single
+    :py:class:`struct.Struct` (precompiled for each endianness), unpacked
+    out of one read; the code of the decoder is then generated, so that
+    it doesn't loop over the schema either.
+
+    Compiling is not cheap: the decoders of the blocks are compiled once,
+    along with their class (see :py:class:`~pcapng.blocks.BlockMeta`).
+
+    :param schema: a schema, as accepted by :py:func:`struct_decode`
+    :param headers_only: if ``True``, :py:class:`PacketBytes` fields are
+        skipped rather than read (see :py:class:`SkippedPacketBytes`)
+    :returns: a function called as ``decode(stream, endianness)``, and
+        returning a dictionary mapping the field names to decoded data
+    """
+    return _generate_decoder(schema, headers_only)
+
+
+def _generate_decoder(schema, headers_only):
+    namespace = {'read_bytes': read_bytes}
+    lines = ['def decode(stream, endianness):', '    decoded = {}']
+    position = 0
+    while position < len(schema):
+        run = []
+        while (position + len(run) < len(schema) and
+               type(schema[position + len(run)][1]) is IntField):
+            run.append(schema[position + len(run)])
+        if run:
+            fmt = ''.join(
+                INT_FORMATS[field.size].lower() if field.signed
+                else INT_FORMATS[field.size].upper()
+                for name, field, default in run)
+            structs = dict((endianness, struct.Struct(endianness + fmt))
+                           for endianness in '<>!=')
+            namespace['run_{0}'.format(position)] = structs
+            lines.append(
+                '    ({0},) = run_{1}[endianness].unpack('
+                'read_bytes(stream, {2}))'.format(
+                    ', '.join('decoded[{0!r}]'.format(name)
+                              for name, field, default in run),
+                    position, structs['='].size))
+            position += len(run)
+            continue
+        name, field, default = schema[position]
+        if headers_only and isinstance(field, PacketBytes):
+            field = SkippedPacketBytes(field.dependency)
+        namespace['field_{0}'.format(position)] = field
+        lines.append(
+            '    decoded[{0!r}] = field_{1}.load('
+            'stream, endianness=endianness, seen=decoded)'
+            .format(name, position))
+        position += 1
+    lines.append('    return decoded')
+    six.exec_('\n'.join(lines), namespace)
+    return namespace['decode']
+
+
 def block_decode(block, stream):
-    return struct_decode(block.schema, stream, block.section.endianness)
+    decoder = getattr(block, '_decoder', None)
+    if decoder is None:
+        decoder = compile_schema(block.schema)
+    return decoder(stream, block.section.endianness)
 
 
 def struct_encode(schema, obj, outstream, endianness='='):
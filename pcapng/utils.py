@@ -1,5 +1,6 @@
 import socket
 import struct
+from array import array
 
 import six
 from six import byte2int
@@ -64,6 +65,128 @@ def unpack_timestamp_resolution(data):
     return base ** (-exponent)
 
 
+def timestamp_to_ns(timestamp, tsresol=None):
+    """
+    Convert a raw timestamp to an integer number of nanoseconds.
+
+    Unlike multiplying by the result of :py:func:`unpack_timestamp_resolution`,
+    this doesn't lose precision to floating point arithmetic (timestamps
+    finer than nanoseconds are truncated, though).
+
+    This is a shortcut for :py:meth:`TimestampConverter.to_ns`, which
+    should be used to convert many timestamps of the same interface.
+
+    :param timestamp: the raw 64-bit timestamp
+    :param tsresol: the raw value of the ``if_tsresol`` option of the
+        interface, or ``None`` for the default resolution (microseconds)
+    """
+    return TimestampConverter(tsresol).to_ns(timestamp)
+
+
+class TimestampConverter(object):
+    """
+    Convert the raw timestamps of an interface to integer nanoseconds.
+
+    The timestamp resolution and offset of the interface are only parsed
+    once, when creating the converter; the conversions are then exact
+    integer arithmetic, applying the offset (timestamps finer than
+    nanoseconds are truncated).
+
+    :ivar scale: the conversion of the resolution, as a ``(multiplier,
+        shift, divisor)`` tuple: a raw timestamp ``ts`` is
+        ``((ts * multiplier) >> shift) // divisor`` nanoseconds (before
+        the offset is applied)
+
+    :param tsresol: the raw value of the ``if_tsresol`` option of the
+        interface, or ``None`` for the default resolution (microseconds)
+    :param tsoffset: the value of the ``if_tsoffset`` option of the
+        interface, in seconds
+    """
+
+    __slots__ = [
+            'tsresol',
+            'tsoffset',
+            'resolution',
+            '_multiplier',
+            '_shift',
+            '_divisor',
+            '_offset',
+    ]
+
+    def __init__(self, tsresol=None, tsoffset=0):
+        self.tsresol = tsresol
+        self.tsoffset = tsoffset
+        self._multiplier, self._shift, self._divisor = 1000, 0, 1
+        self.resolution = 1e-6
+        if tsresol is not None:
+            self.resolution = unpack_timestamp_resolution(tsresol)
+            num = byte2int(tsresol)
+            exponent = num & 0b01111111
+            if num >> 7 & 1:
+                self._multiplier, self._shift = 10 ** 9, exponent
+            elif exponent <= 9:
+                self._multiplier = 10 ** (9 - exponent)
+            else:
+                self._multiplier, self._divisor = 1, 10 ** (exponent - 9)
+        self._offset = tsoffset * 10 ** 9
+
+    @property
+    def scale(self):
+        return self._multiplier, self._shift, self._divisor
+
+    def to_ns(self, timestamp):
+        """
+        Convert a raw timestamp to nanoseconds since the epoch.
+
+        :param timestamp: the raw 64-bit timestamp
+        """
+        return (((timestamp * self._multiplier) >> self._shift)
+                // self._divisor + self._offset)
+
+    def split_to_ns(self, high, low):
+        """
+        Convert a raw timestamp, as found in the blocks, to nanoseconds
+        since the epoch.
+
+        :param high: the upper 32 bits of the timestamp
+        :param low: the lower 32 bits of the timestamp
+        """
+        return self.to_ns((high << 32) + low)
+
+    def many_to_ns(self, highs, lows):
+        """
+        Convert raw timestamps, as found in the blocks, to nanoseconds
+        since the epoch.
+
+        :param highs: iterable of the upper 32 bits of the timestamps
+        :param lows: iterable of the lower 32 bits of the timestamps
+        :returns: an ``array('q')`` of the timestamps
+        """
+        multiplier, shift = self._multiplier, self._shift
+        divisor, offset = self._divisor, self._offset
+        return array('q', [
+            ((((high << 32) + low) * multiplier) >> shift) // divisor + offset
+            for high, low in zip(highs, lows)])
+
+
+def split_timestamps_to_ns(highs, lows, tsresol=None, tsoffset=0):
+    """
+    Convert arrays of raw timestamps, split as found in the blocks, to
+    integer nanoseconds since the epoch.
+
+    See :py:mod:`pcapng.npstructs` for the conversion of NumPy arrays.
+
+    :param highs: iterable of the upper 32 bits of the timestamps
+    :param lows: iterable of the lower 32 bits of the timestamps
+    :param tsresol: the raw value of the ``if_tsresol`` option of the
+        interface, or ``None`` for the default resolution (microseconds)
+    :param tsoffset: the value of the ``if_tsoffset`` option of the
+        interface, in seconds
+    :returns: an ``array('q')`` of the timestamps
+    """
+    return TimestampConverter(tsresol, tsoffset).many_to_ns(highs, lows)
+
+
 def pack_timestamp_resolution(base, exponent):
     """
     Pack a timestamp resolution.
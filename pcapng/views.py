@@ -0,0 +1,175 @@
+"""
+Module providing reusable views of packet blocks, as returned by
+:py:meth:`~pcapng.scanner.FileScanner.iter_views`.
+
+A :py:class:`PacketView` gives access to the fields of a packet block
+straight out of its raw data. Rather than building a new block object
+(with its fields and options) for each packet, the scanner keeps one view
+per packet block type, and points it at each new packet of that type: going
+over a capture then allocates next to nothing per packet.
+
+A view only shows the last packet it was pointed at: to keep a packet
+around, get a real block out of the view with :py:meth:`PacketView.freeze`.
+"""
+
+import struct
+
+from pcapng.constants.block_types import (
+    BLK_PACKET, BLK_PACKET_SIMPLE, BLK_ENHANCED_PACKET)
+from pcapng.structs import stream_from_buffer
+import pcapng.blocks as blocks
+
+
+# Block types seen through views
+VIEW_BLOCK_TYPES = (BLK_ENHANCED_PACKET, BLK_PACKET, BLK_PACKET_SIMPLE)
+
+# Fixed-size headers of the packet blocks, by endianness
+_HEADERS = {
+    BLK_ENHANCED_PACKET: dict(
+        (endianness, struct.Struct(endianness + 'IIIII'))
+        for endianness in '<>'),
+    BLK_PACKET: dict(
+        (endianness, struct.Struct(endianness + 'HHIIII'))
+        for endianness in '<>'),
+    BLK_PACKET_SIMPLE: dict(
+        (endianness, struct.Struct(endianness + 'I'))
+        for endianness in '<>'),
+}
+
+
+class PacketView(object):
+    """
+    Reusable view of packet blocks of a given type.
+
+    The fields of the block header are decoded when the view is pointed at
+    a packet; the packet data (a :py:class:`memoryview` slice of the raw
+    block, not a copy) and options are only looked at when accessed.
+
+    Simple packets have no timestamp: their ``timestamp_high`` and
+    ``timestamp_low`` are ``None``, as are their ``timestamp`` and
+    ``timestamp_ns``.
+
+    :param block_type: the type of the packet blocks, one of
+        :py:data:`VIEW_BLOCK_TYPES`
+
+    :ivar block_type: the type of the packet blocks
+    :ivar section: the :py:class:`~pcapng.blocks.SectionHeader` of the
+        current packet
+    :ivar raw: the raw payload of the current packet block
+    :ivar interface_id: the interface id of the current packet
+    :ivar timestamp_high: the upper 32 bits of its raw timestamp
+    :ivar timestamp_low: the lower 32 bits of its raw timestamp
+    :ivar captured_len: the length of its captured data
+    :ivar packet_len: its original length
+    """
+
+    __slots__ = [ 'block_type', 'section', 'raw', 'interface_id',
+                  'timestamp_high', 'timestamp_low', 'captured_len',
+                  'packet_len', '_headers', '_data_start', '_options_field' ]
+
+    def __init__(self, block_type):
+        if block_type not in VIEW_BLOCK_TYPES:
+            raise ValueError(
+                'Not a packet block type: 0x{0:08x}'.format(block_type))
+        self.block_type = block_type
+        self.section = self.raw = None
+        self.interface_id = self.timestamp_high = self.timestamp_low = None
+        self.captured_len = self.packet_len = None
+        self._headers = _HEADERS[block_type]
+        self._data_start = self._headers['<'].size
+        self._options_field = None
+        for name, field, default in blocks.KNOWN_BLOCKS[block_type].schema:
+            if name == 'options':
+                self._options_field = field
+
+    def point_to(self, data, section):
+        """
+        Point the view at a new packet.
+
+        :param data: the raw payload of the packet block
+        :param section: the :py:class:`~pcapng.blocks.SectionHeader` the
+            block belongs to, with its interfaces registered
+        :returns: the view itself
+        """
+        headers = self._headers[section.endianness].unpack_from(data)
+        if self.block_type == BLK_ENHANCED_PACKET:
+            (self.interface_id, self.timestamp_high, self.timestamp_low,
+             captured_len, packet_len) = headers
+        elif self.block_type == BLK_PACKET:
+            (self.interface_id, _, self.timestamp_high, self.timestamp_low,
+             captured_len, packet_len) = headers
+        else:
+            packet_len, = headers
+            captured_len = packet_len
+            snaplen = section.interfaces[0].snaplen
+            if snaplen:
+                captured_len = min(captured_len, snaplen)
+            self.interface_id = 0
+        # As for blocks, the original length is at least the captured one
+        if packet_len < captured_len:
+            packet_len = captured_len
+        self.captured_len = captured_len
+        self.packet_len = packet_len
+        self.section = section
+        self.raw = data
+        return self
+
+    @property
+    def packet_data(self):
+        """The data of the packet, as a slice of :py:attr:`raw`"""
+        start = self._data_start
+        return self.raw[start:start + self.captured_len]
+
+    @property
+    def options(self):
+        """The options of the packet, decoded on each access"""
+        if self._options_field is None:
+            raise AttributeError('options')
+        start = self._data_start + self.captured_len
+        start += -start % 4
+        return self._options_field.load(
+            stream_from_buffer(self.raw[start:]), self.section.endianness)
+
+    @property
+    def interface(self):
+        return self.section.interfaces[self.interface_id]
+
+    @property
+    def timestamp(self):
+        if self.timestamp_high is None:
+            return None
+        return (((self.timestamp_high << 32) + self.timestamp_low)
+                * self.interface.timestamp_resolution)
+
+    @property
+    def timestamp_ns(self):
+        """
+        The timestamp, as an integer number of nanoseconds since the epoch
+        (see :py:attr:`~pcapng.blocks.BlockWithTimestampMixin.timestamp_ns`)
+        """
+        if self.timestamp_high is None:
+            return None
+        return self.interface.timestamp_converter.split_to_ns(
+            self.timestamp_high, self.timestamp_low)
+
+    def freeze(self):
+        """
+        Get a block object for the current packet, holding a copy of its
+        data, which stays valid once the view moves on.
+
+        :returns: an :py:class:`~pcapng.blocks.EnhancedPacket`,
+            :py:class:`~pcapng.blocks.ObsoletePacket` or
+            :py:class:`~pcapng.blocks.SimplePacket`
+        """
+        if self.raw is None:
+            raise ValueError('The view was not pointed at a packet yet')
+        return self.section.new_member(
+            blocks.KNOWN_BLOCKS[self.block_type], raw=bytes(self.raw))
+
+    def __repr__(self):
+        if self.raw is None:
+            return '<PacketView 0x{0:08x} (unset)>'.format(self.block_type)
+        return ('<PacketView 0x{0:08x} interface_id={1} timestamp_high={2} '
+                'timestamp_low={3} captured_len={4} packet_len={5}>'.format(
+                    self.block_type, self.interface_id, self.timestamp_high,
+                    self.timestamp_low, self.captured_len, self.packet_len))
@@ -0,0 +1,176 @@
+"""
+Module providing a buffered writer of pcap-ng blocks.
+
+Rather than each block being written to the stream by many small writes
+(see :py:meth:`~pcapng.blocks.Block.write`), the :py:class:`FileWriter`
+encodes the blocks into a single reusable buffer, which is written to the
+stream once it is large enough:
+
+    .. code-block:: python
+
+        from pcapng import FileScanner, FileWriter
+
+        with open('/tmp/in.pcapng', 'rb') as fp_in, \\
+                open('/tmp/out.pcapng', 'wb') as fp_out:
+            with FileWriter(fp_out) as writer:
+                for block in FileScanner(fp_in):
+                    if getattr(block, 'captured_len', 0) < 128:
+                        writer.write_block(block)
+"""
+
+import struct
+
+from pcapng.blocks import Block, EnhancedPacket, SectionHeader, UnknownBlock
+from pcapng.structs import SkippedData, write_options
+
+
+# Default amount of encoded data held before writing it to the stream
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+# Header of the blocks: block type and length
+_BLOCK_HEADERS = dict(
+    (endianness, struct.Struct(endianness + 'II')) for endianness in '<>=!')
+
+# Header of enhanced packets: block type and length, interface id,
+# timestamp (high and low), captured length, packet length
+_ENHANCED_HEADERS = dict(
+    (endianness, struct.Struct(endianness + 'IIIIIII'))
+    for endianness in '<>=!')
+
+# Trailing block length
+_BLOCK_TRAILERS = dict(
+    (endianness, struct.Struct(endianness + 'I')) for endianness in '<>=!')
+
+# Padding of data of any length to a multiple of 4 bytes
+_PADDING = (b'', b'\x00\x00\x00', b'\x00\x00', b'\x00')
+
+
+class _BufferStream(object):
+    """Write-only file-like object appending to a bytearray"""
+    __slots__ = [ 'write' ]
+
+    def __init__(self, buffer):
+        self.write = buffer.extend
+
+
+class FileWriter(object):
+    """
+    Buffered pcap-ng writer.
+
+    Blocks are encoded into a buffer, which is written to the stream
+    whenever it holds at least ``buffer_size`` bytes, and when the writer
+    is flushed or closed. Enhanced packets, which make up most of the
+    captures, are encoded by precompiled structs straight into the buffer;
+    other blocks are encoded by their own fields, as
+    :py:meth:`~pcapng.blocks.Block.write` does.
+
+    The writer can be used as a context manager, which closes it (but not
+    the stream) on exit.
+
+    :param stream: a file-like object, opened in binary mode, into which
+        to write the blocks
+    :param buffer_size: amount of encoded data held before writing it to
+        the stream
+    """
+    __slots__ = [ 'stream', 'buffer_size', '_buffer', '_writer',
+                  '_endianness' ]
+
+    def __init__(self, stream, buffer_size=DEFAULT_BUFFER_SIZE):
+        if buffer_size < 1:
+            raise ValueError('Buffer size must be positive')
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+        self._writer = _BufferStream(self._buffer)
+        # Endianness of the last section written, for unknown blocks
+        self._endianness = '='
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_block(self, block):
+        """
+        Write a block.
+
+        :param block: a :py:class:`~pcapng.blocks.Block`, or an
+            :py:class:`~pcapng.blocks.UnknownBlock`, written in the
+            endianness of the last section header written
+        """
+        cls = type(block)
+        if cls is EnhancedPacket:
+            self._write_enhanced_packet(block)
+        elif cls is UnknownBlock:
+            self._write_raw(block.block_type, block.data, self._endianness)
+        elif cls.write is Block.write:
+            if isinstance(block, SectionHeader):
+                self._endianness = block.endianness
+            self._write_encoded(block)
+        else:
+            # The block checks what it writes (see strictness)
+            block.write(self._writer)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_blocks(self, blocks):
+        """
+        Write some blocks.
+
+        :param blocks: an iterable of blocks, as accepted by
+            :py:meth:`write_block`
+        """
+        for block in blocks:
+            self.write_block(block)
+
+    def flush(self):
+        """Write the buffered data to the stream"""
+        if self._buffer:
+            self.stream.write(self._buffer)
+            del self._buffer[:]
+
+    def close(self):
+        """Flush the writer. The stream is left open."""
+        self.flush()
+
+    def _write_enhanced_packet(self, block):
+        data = block.packet_data
+        endianness = block.section.endianness
+        if not data or isinstance(data, SkippedData):
+            # Let the block report the problem
+            return block.write(self._writer)
+        buffer = self._buffer
+        start = len(buffer)
+        captured_len = len(data)
+        buffer += _ENHANCED_HEADERS[endianness].pack(
+            block.magic_number, 0, block.interface_id, block.timestamp_high,
+            block.timestamp_low, captured_len, block.packet_len)
+        buffer += data
+        buffer += _PADDING[captured_len % 4]
+        write_options(self._writer, block.options)
+        self._end_block(start, endianness)
+
+    def _write_encoded(self, block):
+        endianness = block.section.endianness
+        buffer = self._buffer
+        start = len(buffer)
+        buffer += _BLOCK_HEADERS[endianness].pack(block.magic_number, 0)
+        block._encode(self._writer)
+        buffer += _PADDING[(len(buffer) - start) % 4]
+        self._end_block(start, endianness)
+
+    def _write_raw(self, block_type, data, endianness):
+        buffer = self._buffer
+        start = len(buffer)
+        buffer += _BLOCK_HEADERS[endianness].pack(block_type, 0)
+        buffer += data
+        buffer += _PADDING[len(data) % 4]
+        self._end_block(start, endianness)
+
+    def _end_block(self, start, endianness):
+        """Fill in the length of the block being written"""
+        length = len(self._buffer) - start + 4
+        trailer = _BLOCK_TRAILERS[endianness]
+        trailer.pack_into(self._buffer, start + 4, length)
+        self._buffer += trailer.pack(length)
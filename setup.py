@@ -23,6 +23,7 @@ setup(
     'used by various packet sniffers',
     long_description=longdesc,
     install_requires=['six'],
+    extras_require={'numpy': ['numpy']},
     classifiers=[
         "License :: OSI Approved :: Apache Software License",
 
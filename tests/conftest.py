@@ -0,0 +1,60 @@
+import sys
+
+import pytest
+
+from pcapng.blocks import SectionHeader, InterfaceDescription, EnhancedPacket
+
+
+# The asyncio tests use syntax and functions of recent Python versions
+collect_ignore = []
+if sys.version_info < (3, 7):
+    collect_ignore.append('test_aio.py')
+
+# The parallel scanner needs the futures backport on Python 2
+try:
+    import concurrent.futures
+except ImportError:
+    collect_ignore.append('test_parallel.py')
+
+
+def write_capture(outstream, sections=1, interfaces=2, packets=20):
+    """
+    Write a synthetic capture, with ``packets`` enhanced packet blocks
+    per section, captured on each of the section's interfaces in turn
+    one millisecond apart.
+
+    :returns: a list of ``(section, interface_id, timestamp, data)``
+        tuples, one per packet, with timestamps in microseconds.
+    """
+    written = []
+    timestamp = 1420070400 * 10 ** 6  # 2015-01-01 00:00 UTC
+    for section in range(sections):
+        shb = SectionHeader(options={'shb_userappl': 'python-pcapng'})
+        shb.write(outstream)
+        for interface_id in range(interfaces):
+            shb.new_member(
+                InterfaceDescription, link_type=1,
+                options={'if_name': 'eth{0}'.format(interface_id)},
+            ).write(outstream)
+        for num in range(packets):
+            interface_id = num % interfaces
+            data = 'section {0} packet {1}'.format(section, num).encode()
+            data *= num % 3 + 1
+            timestamp += 1000
+            shb.new_member(
+                EnhancedPacket, interface_id=interface_id,
+                timestamp_high=timestamp >> 32,
+                timestamp_low=timestamp & 0xffffffff,
+                packet_data=data,
+            ).write(outstream)
+            written.append((section, interface_id, timestamp, data))
+    return written
+
+
+@pytest.fixture
+def capture(tmpdir):
+    """Path to a synthetic capture, with two sections of two interfaces"""
+    path = tmpdir.join('capture.pcapng')
+    with path.open('wb') as fp:
+        write_capture(fp, sections=2)
+    return str(path)
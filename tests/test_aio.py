@@ -0,0 +1,77 @@
+import asyncio
+import io
+
+import pytest
+
+from pcapng.aio import AsyncFileScanner
+from pcapng.blocks import EnhancedPacket
+from pcapng.constants.block_types import BLK_ENHANCED_PACKET
+from pcapng.exceptions import TruncatedFile
+from pcapng.scanner import FileScanner
+
+
+def _packets(blocks):
+    return [block.packet_data for block in blocks
+            if isinstance(block, EnhancedPacket)]
+
+
+class AsyncFile(object):
+    """Minimal asynchronous file, returning short reads"""
+
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+    async def read(self, size=-1):
+        await asyncio.sleep(0)
+        return self.stream.read(min(size, 37))
+
+
+async def _scan(scanner):
+    return [block async for block in scanner]
+
+
+def test_async_scanner_stream_reader(capture):
+    with open(capture, 'rb') as fp:
+        data = fp.read()
+        fp.seek(0)
+        expected = list(FileScanner(fp))
+
+    async def main():
+        reader = asyncio.StreamReader()
+
+        async def produce():
+            for pos in range(0, len(data), 100):
+                reader.feed_data(data[pos:pos + 100])
+                await asyncio.sleep(0)
+            reader.feed_eof()
+
+        producer = asyncio.ensure_future(produce())
+        blocks = await _scan(AsyncFileScanner(reader))
+        await producer
+        return blocks
+
+    blocks = asyncio.run(main())
+    assert [type(block) for block in blocks] == \
+        [type(block) for block in expected]
+    assert _packets(blocks) == _packets(expected)
+    assert blocks[-1].interface.options['if_name'] == 'eth1'
+
+
+def test_async_scanner_async_file(capture):
+    with open(capture, 'rb') as fp:
+        data = fp.read()
+        fp.seek(0)
+        expected = _packets(FileScanner(fp))
+
+    scanner = AsyncFileScanner(AsyncFile(data), buffer_size=1000,
+                               block_types=[BLK_ENHANCED_PACKET])
+    blocks = asyncio.run(_scan(scanner))
+    assert _packets(blocks) == expected
+    assert len(blocks) == 40
+
+
+def test_async_scanner_truncated(capture):
+    with open(capture, 'rb') as fp:
+        data = fp.read()
+    with pytest.raises(TruncatedFile):
+        asyncio.run(_scan(AsyncFileScanner(AsyncFile(data[:-1]))))
@@ -0,0 +1,117 @@
+import glob
+import io
+
+import pytest
+
+from pcapng import FileScanner
+from pcapng.batch import PacketBatch
+from pcapng.blocks import (
+    BasePacketBlock, EnhancedPacket, InterfaceDescription, SectionHeader,
+    SimplePacket)
+from pcapng.constants.block_types import BLK_ENHANCED_PACKET
+from pcapng.utils import timestamp_to_ns
+
+from conftest import write_capture
+
+
+def _expected(blocks):
+    expected = []
+    for block in blocks:
+        if not isinstance(block, BasePacketBlock):
+            continue
+        timestamp = 0
+        if not isinstance(block, SimplePacket):
+            timestamp = timestamp_to_ns(
+                (block.timestamp_high << 32) + block.timestamp_low,
+                block.interface.options.get('if_tsresol'))
+        expected.append((timestamp, block.captured_len, block.packet_len,
+                         block.interface_id, bytes(block.packet_data)))
+    return expected
+
+
+def _columns(batches):
+    found = []
+    for batch in batches:
+        for num in range(len(batch)):
+            found.append((batch.timestamps[num], batch.captured_lens[num],
+                          batch.packet_lens[num], batch.interface_ids[num],
+                          batch.packet_data(num)))
+    return found
+
+
+SAMPLE_FILES = sorted(
+    name for name in glob.glob('test_data/*.ntar')
+    if name != 'test_data/test006.ntar')
+
+
+@pytest.mark.parametrize('filename', SAMPLE_FILES)
+def test_batches_match_blocks(filename):
+    with open(filename, 'rb') as fp:
+        expected = _expected(FileScanner(fp))
+    with open(filename, 'rb') as fp:
+        assert _columns(FileScanner(fp).iter_batches(3)) == expected
+
+
+def test_batch_sizes():
+    stream = io.BytesIO()
+    write_capture(stream, sections=2, packets=10)
+    stream.seek(0)
+    batches = list(FileScanner(stream).iter_batches(7))
+    assert [len(batch) for batch in batches] == [7, 7, 6]
+    assert all(isinstance(batch, PacketBatch) for batch in batches)
+    assert batches[0].offsets[1] == batches[0].captured_lens[0]
+    assert len(batches[0].data) == sum(batches[0].captured_lens)
+
+
+def test_batch_columns():
+    stream = io.BytesIO()
+    written = write_capture(stream, packets=5)
+    stream.seek(0)
+    batch, = FileScanner(stream).iter_batches()
+    assert batch.timestamps.typecode == 'Q'
+    assert batch.captured_lens.typecode == 'I'
+    assert list(batch.timestamps) == [ts * 1000 for _, _, ts, _ in written]
+    assert list(batch.interface_ids) == [iid for _, iid, _, _ in written]
+    assert [batch.packet_data(num) for num in range(5)] == \
+        [data for _, _, _, data in written]
+
+
+def test_batch_headers_only():
+    stream = io.BytesIO()
+    written = write_capture(stream, packets=5)
+    stream.seek(0)
+    batch, = FileScanner(stream, headers_only=True).iter_batches()
+    assert len(batch) == 5
+    assert len(batch.data) == 0
+    assert list(batch.captured_lens) == [
+        len(data) for _, _, _, data in written]
+
+
+def test_batch_filters():
+    stream = io.BytesIO()
+    write_capture(stream, packets=10)
+    stream.seek(0)
+    batch, = FileScanner(stream, interfaces=[1]).iter_batches()
+    assert list(batch.interface_ids) == [1] * 5
+
+    stream.seek(0)
+    scanner = FileScanner(stream, block_types=[BLK_ENHANCED_PACKET - 1])
+    assert list(scanner.iter_batches()) == []
+
+
+def test_batch_tsresol():
+    stream = io.BytesIO()
+    shb = SectionHeader()
+    shb.write(stream)
+    shb.new_member(InterfaceDescription, link_type=1,
+                   options={'if_tsresol': b'\x09'}).write(stream)
+    shb.new_member(EnhancedPacket, interface_id=0, timestamp_high=1,
+                   timestamp_low=2, packet_data=b'abcd').write(stream)
+    stream.seek(0)
+    batch, = FileScanner(stream).iter_batches()
+    assert list(batch.timestamps) == [(1 << 32) + 2]
+
+
+def test_batch_size_must_be_positive():
+    with pytest.raises(ValueError):
+        next(FileScanner(io.BytesIO()).iter_batches(0))
@@ -0,0 +1,103 @@
+import io
+
+import pytest
+
+from pcapng import FileScanner
+from pcapng.blocks import (
+    EnhancedPacket, InterfaceDescription, SectionHeader, SimplePacket)
+
+
+def _read_packets():
+    stream = io.BytesIO()
+    shb = SectionHeader()
+    shb.write(stream)
+    shb.new_member(InterfaceDescription, link_type=1, snaplen=3).write(stream)
+    shb.new_member(EnhancedPacket, interface_id=0, timestamp_high=1,
+                   timestamp_low=2, packet_len=10,
+                   packet_data=b'abc').write(stream)
+    shb.new_member(SimplePacket, packet_data=b'abcdef').write(stream)
+    return list(FileScanner(io.BytesIO(stream.getvalue())))[2:]
+
+
+def test_fields_in_slots():
+    assert EnhancedPacket._field_slots['interface_id'] == 'interface_id'
+    # Fields hidden by properties are kept under another name
+    assert EnhancedPacket._field_slots['packet_len'] == '_packet_len'
+    assert SimplePacket._field_slots['packet_len'] == '_packet_len'
+
+    epb, spb = _read_packets()
+    assert not hasattr(epb, '__dict__')
+    assert epb.timestamp_low == 2
+    assert epb.packet_len == 10
+    assert epb.captured_len == 3
+    assert epb.packet_data == b'abc'
+    assert spb.packet_len == 6
+    assert spb.captured_len == 3
+    assert spb.packet_data == b'abc'
+
+
+def test_set_field_before_decoding():
+    epb, spb = _read_packets()
+    epb.timestamp_low = 5
+    assert epb.timestamp_high == 1
+    assert epb.timestamp_low == 5
+    assert epb.packet_data == b'abc'
+    with pytest.raises(AttributeError):
+        epb.captured_len = 1
+
+
+def test_extra_attributes():
+    epb, spb = _read_packets()
+    with pytest.raises(AttributeError):
+        epb.comment
+    epb.comment = 'hello'
+    assert epb.comment == 'hello'
+    assert epb.interface_id == 0
+    assert spb.section.interfaces[0].interface_id == 0
+
+
+def test_block_subclass_without_slots():
+    class TaggedPacket(EnhancedPacket):
+        schema = EnhancedPacket.schema + [
+            ('tag', EnhancedPacket.schema[0][1], 7)]
+
+    packet = TaggedPacket(section=SectionHeader())
+    assert packet.tag == 7
+    assert packet.interface_id == 0
+    packet.note = 'note'
+    assert packet.__dict__ == {'note': 'note'}
+
+
+def test_block_subclass_of_custom_block():
+    class TaggedPacket(EnhancedPacket):
+        schema = EnhancedPacket.schema + [
+            ('tag', EnhancedPacket.schema[0][1], 7)]
+
+    class LabelledPacket(TaggedPacket):
+        schema = TaggedPacket.schema + [
+            ('label', EnhancedPacket.schema[0][1], 3)]
+
+    class PlainPacket(LabelledPacket):
+        pass
+
+    packet = PlainPacket(section=SectionHeader())
+    assert PlainPacket._field_slots['label'] == 'label'
+    assert packet.tag == 7
+    assert packet.label == 3
+    packet.note = 'note'
+    assert packet.__dict__ == {'note': 'note'}
+
+
+def test_decoders_compiled_per_class():
+    class TaggedPacket(EnhancedPacket):
+        schema = EnhancedPacket.schema + [
+            ('tag', EnhancedPacket.schema[0][1], 7)]
+
+    class PlainPacket(EnhancedPacket):
+        pass
+
+    assert EnhancedPacket._decoder is not EnhancedPacket._headers_decoder
+    assert InterfaceDescription._decoder is \
+        InterfaceDescription._headers_decoder
+    assert TaggedPacket._decoder is not EnhancedPacket._decoder
+    assert PlainPacket._decoder is EnhancedPacket._decoder
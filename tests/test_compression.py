@@ -0,0 +1,182 @@
+import bz2
+import gc
+import gzip
+import io
+import threading
+
+import pytest
+
+from pcapng import FileScanner
+from pcapng.blocks import EnhancedPacket
+from pcapng.compression import (
+    sniff_compression, open_decompressed, ThreadedReader, PrefixedReader)
+from pcapng.exceptions import PcapngLoadError, TruncatedFile
+
+from conftest import write_capture
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+
+def _capture():
+    stream = io.BytesIO()
+    written = write_capture(stream, sections=2)
+    return stream.getvalue(), written
+
+
+def _packets(scanner):
+    return [(block.interface_id, block.packet_data) for block in scanner
+            if isinstance(block, EnhancedPacket)]
+
+
+def _gzip(data):
+    stream = io.BytesIO()
+    with gzip.GzipFile(fileobj=stream, mode='wb') as fp:
+        fp.write(data)
+    return stream.getvalue()
+
+
+COMPRESSORS = [('gzip', _gzip), ('bz2', bz2.compress)]
+if lzma is not None:
+    COMPRESSORS.append(('xz', lzma.compress))
+
+
+@pytest.mark.parametrize('name,compress', COMPRESSORS)
+def test_sniff_compression(name, compress):
+    assert sniff_compression(compress(b'some data')) == name
+
+
+def test_sniff_uncompressed():
+    data, _ = _capture()
+    assert sniff_compression(data) is None
+
+
+@pytest.mark.parametrize('name,compress', COMPRESSORS)
+def test_scan_compressed(name, compress):
+    data, written = _capture()
+    expected = _packets(FileScanner(io.BytesIO(data)))
+    assert len(expected) == len(written)
+    scanner = FileScanner(io.BytesIO(compress(data)), buffer_size=64)
+    assert _packets(scanner) == expected
+
+
+def test_scan_multi_member_gzip():
+    data, _ = _capture()
+    expected = _packets(FileScanner(io.BytesIO(data)))
+    # Split in the middle of blocks, as parallel compressors do
+    members = b''.join(_gzip(data[start:start + 100])
+                       for start in range(0, len(data), 100))
+    assert _packets(FileScanner(io.BytesIO(members))) == expected
+
+
+def test_scan_compressed_file_with_mmap(tmpdir):
+    data, _ = _capture()
+    path = str(tmpdir.join('capture.pcapng.gz'))
+    with open(path, 'wb') as fp:
+        fp.write(_gzip(data))
+    with open(path, 'rb') as fp:
+        blocks = _packets(FileScanner(fp, use_mmap=True))
+    assert blocks == _packets(FileScanner(io.BytesIO(data)))
+
+
+def test_decompress_disabled():
+    data, _ = _capture()
+    stream = io.BytesIO(_gzip(data))
+    assert open_decompressed(stream, threaded=False) is not stream
+    with pytest.raises(PcapngLoadError):
+        list(FileScanner(io.BytesIO(_gzip(data)), decompress=False))
+
+
+def test_truncated_compressed():
+    data, _ = _capture()
+    compressed = _gzip(data)
+    with pytest.raises((TruncatedFile, EOFError)):
+        list(FileScanner(io.BytesIO(compressed[:len(compressed) // 2])))
+
+
+def test_open_uncompressed_keeps_stream():
+    stream = io.BytesIO(b'\x0a\x0d\x0d\x0a')
+    assert open_decompressed(stream) is stream
+    assert stream.tell() == 0
+
+
+class _Unseekable(object):
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+
+def test_open_unseekable():
+    data, _ = _capture()
+    stream = open_decompressed(_Unseekable(data))
+    assert isinstance(stream, PrefixedReader)
+    assert stream.read() == data
+    stream = open_decompressed(_Unseekable(bz2.compress(data)))
+    assert stream.read() == data
+
+
+def test_threaded_reader():
+    data = bytes(bytearray(range(256))) * 100
+    reader = ThreadedReader(io.BytesIO(data), chunk_size=1000, queue_size=2)
+    assert reader.read1(10) == data[:10]
+    assert reader.read1() == data[10:1000]
+    assert reader.read(2000) == data[1000:3000]
+    assert reader.tell() == 3000
+    assert reader.read() == data[3000:]
+    assert reader.read() == b''
+    reader.close()
+
+
+def test_threaded_reader_error():
+    class Failing(object):
+        def read(self, size):
+            raise IOError('disk on fire')
+
+        def close(self):
+            pass
+
+    with ThreadedReader(Failing()) as reader:
+        with pytest.raises(IOError):
+            reader.read(10)
+        assert reader.read(10) == b''
+
+
+def test_threaded_reader_close_early():
+    data = b'x' * 100000
+    reader = ThreadedReader(io.BytesIO(data), chunk_size=10, queue_size=1)
+    assert reader.read(5) == b'xxxxx'
+    reader.close()
+
+
+def _reader_threads():
+    return [thread for thread in threading.enumerate()
+            if thread.daemon and thread.is_alive()]
+
+
+def test_scanner_close_stops_thread():
+    data, written = _capture()
+    before = len(_reader_threads())
+    with FileScanner(io.BytesIO(_gzip(data)), buffer_size=64) as scanner:
+        next(iter(scanner))
+        assert len(_reader_threads()) == before + 1
+    assert len(_reader_threads()) == before
+
+
+def test_dropped_scanners_stop_threads():
+    data, written = _capture()
+    before = len(_reader_threads())
+    for _ in range(5):
+        # Abandoned after the first block
+        scanner = FileScanner(io.BytesIO(_gzip(data * 20)), buffer_size=64)
+        next(iter(scanner))
+    del scanner
+    gc.collect()
+    for _ in range(50):
+        if len(_reader_threads()) == before:
+            break
+        threading.Event().wait(0.1)
+    assert len(_reader_threads()) == before
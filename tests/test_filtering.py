@@ -0,0 +1,65 @@
+import io
+
+from pcapng.blocks import (
+    EnhancedPacket, InterfaceDescription, InterfaceStatistics, SectionHeader)
+from pcapng.constants.block_types import (
+    BLK_ENHANCED_PACKET, BLK_INTERFACE, BLK_INTERFACE_STATS)
+from pcapng.scanner import FileScanner
+
+from conftest import write_capture
+
+
+def _scan(path, **kwargs):
+    with open(path, 'rb') as fp:
+        return list(FileScanner(fp, **kwargs))
+
+
+def test_filter_block_types(capture):
+    blocks = _scan(capture, block_types=[BLK_ENHANCED_PACKET])
+    assert len(blocks) == 40
+    assert all(isinstance(block, EnhancedPacket) for block in blocks)
+    # Sections and interfaces are still tracked
+    assert blocks[0].interface.options['if_name'] == 'eth0'
+    assert blocks[0].section is not blocks[-1].section
+    assert blocks[-1].section.options['shb_userappl'] == 'python-pcapng'
+
+
+def test_filter_interfaces(capture):
+    blocks = _scan(capture, interfaces=[1])
+    assert [type(block) for block in blocks[:4]] == [
+        SectionHeader, InterfaceDescription, EnhancedPacket, EnhancedPacket]
+    assert blocks[1].interface_id == 1
+    packets = [block for block in blocks if isinstance(block, EnhancedPacket)]
+    assert len(packets) == 20
+    assert all(packet.interface_id == 1 for packet in packets)
+    assert all(packet.interface.options['if_name'] == 'eth1'
+               for packet in packets)
+
+
+def test_filter_block_types_and_interfaces(capture):
+    for use_mmap in (False, True):
+        blocks = _scan(capture, use_mmap=use_mmap, interfaces=[0],
+                       block_types=[BLK_ENHANCED_PACKET, BLK_INTERFACE])
+        assert [type(block) for block in blocks] == (
+            [InterfaceDescription] + [EnhancedPacket] * 10) * 2
+        assert [packet.packet_data for packet in blocks[1:11]] == [
+            'section 0 packet {0}'.format(num).encode() * (num % 3 + 1)
+            for num in range(0, 20, 2)]
+
+
+def test_filter_interface_statistics():
+    fp = io.BytesIO()
+    write_capture(fp, packets=4)
+    section = SectionHeader()
+    section.new_member(InterfaceDescription)
+    section.new_member(InterfaceDescription)
+    for interface_id in (0, 1):
+        section.new_member(InterfaceStatistics, interface_id=interface_id,
+                           options={'isb_ifrecv': 2}).write(fp)
+    fp.seek(0)
+
+    blocks = list(FileScanner(fp, block_types=[BLK_INTERFACE_STATS],
+                              interfaces=[1]))
+    assert len(blocks) == 1
+    assert blocks[0].interface_id == 1
+    assert blocks[0].options['isb_ifrecv'] == 2
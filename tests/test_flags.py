@@ -0,0 +1,93 @@
+from array import array
+
+import pytest
+
+from pcapng.flags import FlagWord, FlagField, FlagBool, FlagUInt, FlagEnum
+from pcapng.structs import EPBFlags
+
+
+def test_epb_flags():
+    flags = EPBFlags(0x01000000 | (4 << 5) | 0b10)
+    assert flags.inout == 'outbound'
+    assert flags.casttype == 'NA'
+    assert flags.fcslen == 4
+    assert flags.err_crc
+    assert not flags.err_long
+
+    flags.casttype = 'broadcast'
+    flags.err_crc = False
+    flags.fcslen = 2
+    assert int(flags) == (2 << 5) | (3 << 2) | 0b10
+    with pytest.raises(TypeError):
+        flags.inout = 'sideways'
+    with pytest.raises(AttributeError):
+        flags.err_unknown
+    with pytest.raises(AttributeError):
+        flags.err_unknown = True
+
+
+def test_layout_shared():
+    first, second = EPBFlags(1), EPBFlags(2)
+    assert not hasattr(first, '__dict__')
+    assert EPBFlags.layout() is EPBFlags.layout()
+    assert isinstance(EPBFlags.layout()['err_crc'], FlagBool)
+    assert first.inout == 'inbound'
+    assert second.inout == 'outbound'
+
+
+def test_bulk_queries():
+    words = [0, 1 << 24, (1 << 24) | 1, 2, (1 << 24) | 2]
+    assert EPBFlags.count(words, err_crc=True) == 3
+    assert EPBFlags.count(
+        array('I', words), err_crc=True, inout='inbound') == 1
+    assert EPBFlags.count(iter(words), err_crc=False) == 2
+    assert EPBFlags.positions(words, inout='outbound') == [3, 4]
+    assert EPBFlags.selector(err_crc=True) == (1 << 24, 1 << 24)
+    with pytest.raises(AttributeError):
+        EPBFlags.selector(err_unknown=True)
+
+
+def test_bulk_queries_numpy():
+    numpy = pytest.importorskip('numpy')
+    words = numpy.array([0, 1 << 24, (1 << 24) | 1, 2], dtype='u4')
+    assert EPBFlags.count(words, err_crc=True) == 2
+    assert EPBFlags.count(words, err_crc=True, inout='inbound') == 1
+
+
+def test_flag_word_with_schema():
+    schema = [
+        FlagField('low', FlagUInt, 3),
+        FlagField('kind', FlagEnum, 1, ('a', 'b')),
+        FlagField('high', FlagBool),
+    ]
+    word = FlagWord(schema, nbits=8, initial=0b11010)
+    assert isinstance(word, FlagWord)
+    assert word.low == 2
+    assert word.kind == 'b'
+    assert word.high
+    word.low = 7
+    assert int(word) == 0b11111
+    assert 'low=7' in repr(word)
+
+
+def test_flag_word_with_schema_reuses_class():
+    def make_schema():
+        return [FlagField('low', FlagUInt, 3),
+                FlagField('kind', FlagEnum, 1, ['a', 'b'])]
+
+    first = FlagWord(make_schema(), nbits=8, initial=1)
+    second = FlagWord(make_schema(), nbits=8, initial=2)
+    assert type(first) is type(second)
+    assert (first.low, second.low) == (1, 2)
+    assert type(FlagWord(make_schema(), nbits=16)) is not type(first)
+
+
+def test_flag_word_errors():
+    with pytest.raises(TypeError):
+        FlagWord([FlagField('big', FlagUInt, 9)], nbits=8)
+    with pytest.raises(TypeError):
+        FlagWord([FlagField('bool', FlagBool, 2)], nbits=8)
+    with pytest.raises(TypeError):
+        FlagWord([FlagField('enum', FlagEnum, 1, ('a', 'b', 'c'))], nbits=8)
+    with pytest.raises(TypeError):
+        FlagWord([('not', 'a', 'field')], nbits=8)
@@ -0,0 +1,108 @@
+import io
+import os
+import threading
+import time
+
+import pytest
+
+from pcapng.blocks import EnhancedPacket
+from pcapng.exceptions import TruncatedFile
+from pcapng.scanner import FileScanner
+
+from conftest import write_capture
+
+
+def _capture(**kwargs):
+    fp = io.BytesIO()
+    written = write_capture(fp, **kwargs)
+    return fp.getvalue(), [item[3] for item in written]
+
+
+def _packets(blocks):
+    return [block.packet_data for block in blocks
+            if isinstance(block, EnhancedPacket)]
+
+
+def _write_slowly(path, data, mode='ab', chunk_size=50):
+    with open(path, mode) as fp:
+        for pos in range(0, len(data), chunk_size):
+            fp.write(data[pos:pos + chunk_size])
+            fp.flush()
+            time.sleep(0.002)
+
+
+def test_follow_growing_file(tmpdir):
+    data, packets = _capture(packets=30)
+    path = str(tmpdir.join('capture.pcapng'))
+    with open(path, 'wb') as fp:
+        fp.write(data[:70])  # In the middle of a block
+
+    writer = threading.Thread(target=_write_slowly, args=(path, data[70:]))
+    with open(path, 'rb') as fp:
+        scanner = FileScanner(fp, follow=True, poll_interval=0.001,
+                              follow_timeout=0.5)
+        writer.start()
+        blocks = list(scanner)
+    writer.join()
+    assert _packets(blocks) == packets
+
+
+def test_follow_timeout_in_middle_of_block(tmpdir):
+    data, packets = _capture(packets=3)
+    path = tmpdir.join('capture.pcapng')
+    path.write_binary(data[:-5])
+    with path.open('rb') as fp:
+        scanner = FileScanner(fp, follow=True, poll_interval=0.001,
+                              follow_timeout=0.05)
+        with pytest.raises(TruncatedFile):
+            list(scanner)
+
+
+def test_follow_rotation(tmpdir):
+    first, first_packets = _capture(packets=10)
+    second, second_packets = _capture(packets=15)
+    path = str(tmpdir.join('capture.pcapng'))
+    with open(path, 'wb') as fp:
+        fp.write(first[:-20])
+
+    def rotate():
+        _write_slowly(path, first[-20:])
+        os.rename(path, path + '.1')
+        _write_slowly(path, second, mode='wb')
+
+    writer = threading.Thread(target=rotate)
+    with open(path, 'rb') as fp:
+        scanner = FileScanner(fp, follow=True, poll_interval=0.001,
+                              follow_timeout=0.5)
+        writer.start()
+        blocks = list(scanner)
+    writer.join()
+    assert _packets(blocks) == first_packets + second_packets
+    assert blocks[-1].section is not blocks[0].section
+
+
+def test_follow_truncation(tmpdir):
+    first, first_packets = _capture(packets=10)
+    second, second_packets = _capture(packets=5)
+    path = str(tmpdir.join('capture.pcapng'))
+    with open(path, 'wb') as fp:
+        fp.write(first)
+
+    def truncate():
+        time.sleep(0.05)
+        _write_slowly(path, second, mode='wb')
+
+    writer = threading.Thread(target=truncate)
+    with open(path, 'rb') as fp:
+        scanner = FileScanner(fp, follow=True, poll_interval=0.001,
+                              follow_timeout=0.5)
+        writer.start()
+        blocks = list(scanner)
+    writer.join()
+    assert _packets(blocks) == first_packets + second_packets
+
+
+def test_follow_mmap():
+    with open('test_data/test001.ntar', 'rb') as fp:
+        with pytest.raises(ValueError):
+            FileScanner(fp, use_mmap=True, follow=True)
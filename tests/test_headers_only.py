@@ -0,0 +1,75 @@
+import glob
+import io
+
+import pytest
+
+from pcapng.blocks import BasePacketBlock, EnhancedPacket, SimplePacket
+from pcapng.scanner import FileScanner
+from pcapng.structs import SkippedData
+
+
+SAMPLE_FILES = sorted(
+    name for name in glob.glob('test_data/*.ntar')
+    if name != 'test_data/test006.ntar')
+
+
+def _summarize(block):
+    values = []
+    for name, field, default in getattr(block, 'schema', []):
+        value = getattr(block, name)
+        if name == 'packet_data':
+            value = len(value)
+        elif isinstance(value, memoryview):
+            value = value.tobytes()
+        elif name == 'options':
+            value = repr(value)
+        values.append((name, value))
+    return type(block), values
+
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+@pytest.mark.parametrize('filename', SAMPLE_FILES)
+def test_headers_only_matches_full_scan(filename, use_mmap):
+    with open(filename, 'rb') as fp:
+        expected = [_summarize(block) for block in FileScanner(fp)]
+
+    with open(filename, 'rb') as fp:
+        scanner = FileScanner(fp, use_mmap=use_mmap, headers_only=True)
+        blocks = list(scanner)
+        assert [_summarize(block) for block in blocks] == expected
+
+    for block in blocks:
+        if isinstance(block, BasePacketBlock):
+            assert isinstance(block.packet_data, SkippedData)
+
+
+def test_headers_only_capture(capture):
+    with open(capture, 'rb') as fp:
+        expected = list(FileScanner(fp))
+
+    with open(capture, 'rb') as fp:
+        blocks = list(FileScanner(fp, headers_only=True, buffer_size=100))
+
+    packets = [block for block in blocks if isinstance(block, EnhancedPacket)]
+    assert len(packets) == 40
+    for packet, full in zip(packets, [block for block in expected
+                                      if isinstance(block, EnhancedPacket)]):
+        assert packet.captured_len == full.captured_len
+        assert packet.packet_len == full.packet_len
+        assert packet.timestamp == full.timestamp
+        assert packet.interface.options['if_name'] == \
+            full.interface.options['if_name']
+        assert repr(packet.packet_data) == \
+            '<SkippedData ({0} bytes)>'.format(full.captured_len)
+
+    # The packet data isn't there to be written back
+    with pytest.raises(ValueError):
+        packets[0].write(io.BytesIO())
+
+
+def test_headers_only_simple_packet():
+    with open('test_data/test007.ntar', 'rb') as fp:
+        packet = list(FileScanner(fp, headers_only=True))[2]
+    assert isinstance(packet, SimplePacket)
+    assert isinstance(packet.packet_data, SkippedData)
+    assert packet.captured_len == len(packet.packet_data) > 0
@@ -0,0 +1,248 @@
+import io
+import os
+
+import pytest
+
+from pcapng.blocks import (
+    EnhancedPacket, InterfaceDescription, ObsoletePacket, SectionHeader,
+    SimplePacket)
+from pcapng.exceptions import BadIndex
+from pcapng.index import (
+    BlockIndex, IndexedReader, IndexEntry, NO_INTERFACE, NO_TIMESTAMP,
+    INDEX_SUFFIX, load_index)
+from pcapng.readers import MmapBlockReader
+from pcapng.scanner import FileScanner
+
+from conftest import write_capture
+
+
+def _packets(path):
+    with open(path, 'rb') as fp:
+        return [(block.section, block.interface_id, block.packet_data)
+                for block in FileScanner(fp)
+                if isinstance(block, EnhancedPacket)]
+
+
+def test_build_index(capture):
+    with open(capture, 'rb') as fp:
+        index = BlockIndex.build(fp)
+        blocks = list(FileScanner(fp))
+
+    assert len(index) == len(blocks) == 46
+    assert index.file_size == os.path.getsize(capture)
+
+    assert index[0] == IndexEntry(
+        0, 0x0a0d0d0a, 0, NO_INTERFACE, NO_TIMESTAMP)
+    assert index[1][1:] == (1, 0, 0, NO_TIMESTAMP)
+    assert index[2][1:] == (1, 0, 1, NO_TIMESTAMP)
+    assert [tuple(entry)[1:4] for entry in (index[3], index[4], index[26])] \
+        == [(6, 0, 0), (6, 0, 1), (6, 1, 0)]
+    assert index.sections[22] == 0
+    assert index.sections[23] == 1
+
+    with open(capture, 'rb') as fp:
+        fp.seek(index.offsets[23])
+        assert fp.read(4) == b'\x0a\x0d\x0d\x0a'
+
+
+def test_build_index_sample_files():
+    with open('test_data/test006-fixed.ntar', 'rb') as fp:
+        index = BlockIndex.build(fp)
+    assert [tuple(entry) for entry in index] == [
+        (0, 0x0a0d0d0a, 0, NO_INTERFACE, NO_TIMESTAMP),
+        (28, 1, 0, 0, NO_TIMESTAMP),
+        (96, 2, 0, 0, 0),
+    ]
+    assert list(index.time_order) == [2]
+
+    with open('test_data/test008.ntar', 'rb') as fp:
+        index = BlockIndex.build(fp)
+    assert list(index.sections) == [0, 0, 1, 1]
+    assert list(index.interfaces) == [NO_INTERFACE, 0, NO_INTERFACE, 0]
+
+
+def test_build_index_releases_mapping(capture, monkeypatch):
+    readers = []
+    original_close = MmapBlockReader.close
+
+    def close(reader):
+        mapping = reader._mmap
+        original_close(reader)
+        readers.append((reader, mapping))
+
+    monkeypatch.setattr(MmapBlockReader, 'close', close)
+    with open(capture, 'rb') as fp:
+        BlockIndex.build(fp)
+    assert len(readers) == 1
+    reader, mapping = readers[0]
+    assert len(reader.buffer) == 0
+    assert mapping.closed
+
+
+def test_mmap_reader_close_with_payloads(capture):
+    with open(capture, 'rb') as fp:
+        reader = MmapBlockReader(fp)
+        block_type, endianness, data = reader.read_block('=')
+        reader.close()
+        # The mapping outlives the close while payloads refer to it
+        assert data[:4] == b'\x01\x00\x00\x00'
+
+
+def test_save_and_load_index(capture, tmpdir):
+    with open(capture, 'rb') as fp:
+        index = BlockIndex.build(fp)
+
+    path = str(tmpdir.join('index'))
+    index.save(path)
+    loaded = BlockIndex.load(path)
+
+    assert list(loaded) == list(index)
+    assert loaded.time_order == index.time_order
+    assert loaded.file_size == index.file_size
+    assert loaded.file_mtime == index.file_mtime
+    assert loaded.matches(capture)
+
+
+def test_load_bad_index(tmpdir):
+    path = tmpdir.join('index')
+    path.write_binary(b'Not an index at all, really not')
+    with pytest.raises(BadIndex):
+        BlockIndex.load(str(path))
+
+
+def test_load_index_sidecar(capture):
+    index = load_index(capture)
+    assert os.path.exists(capture + INDEX_SUFFIX)
+    assert list(load_index(capture)) == list(index)
+
+    # Modifying the capture file invalidates the sidecar
+    stat = os.stat(capture)
+    os.utime(capture, (stat.st_atime, stat.st_mtime + 10))
+    assert not BlockIndex.load(capture + INDEX_SUFFIX).matches(capture)
+    assert load_index(capture).matches(capture)
+    assert BlockIndex.load(capture + INDEX_SUFFIX).matches(capture)
+
+
+def test_indexed_reader_packets(capture):
+    expected = _packets(capture)
+    index = load_index(capture)
+
+    with open(capture, 'rb') as fp:
+        reader = IndexedReader(fp, index)
+        assert reader.packet_count == len(expected) == 40
+
+        for num in (39, 0, 25, 20, 19, -1):
+            packet = reader.packet(num)
+            assert isinstance(packet, EnhancedPacket)
+            section, interface_id, data = expected[num]
+            assert packet.interface_id == interface_id
+            assert packet.packet_data == data
+            assert packet.interface.options['if_name'] == \
+                'eth{0}'.format(interface_id)
+            assert packet.section.version == (1, 0)
+
+        packets = list(reader.packets(15, 25))
+        assert [p.packet_data for p in packets] == \
+            [data for _, _, data in expected[15:25]]
+        # Sections are only loaded once
+        assert packets[0].section is reader.packet(0).section
+        assert packets[-1].section is reader.packet(-1).section
+        assert packets[0].section is not packets[-1].section
+
+
+def test_indexed_reader_blocks(capture):
+    with open(capture, 'rb') as fp:
+        reader = IndexedReader(fp, load_index(capture))
+        assert len(reader) == 46
+
+        shb = reader.block(23)
+        assert isinstance(shb, SectionHeader)
+        idb = reader.block(24)
+        assert isinstance(idb, InterfaceDescription)
+        assert idb is shb.interfaces[0]
+        assert reader.block(-1).section is shb
+
+        blocks = list(reader.blocks(21, 27))
+        assert [type(block) for block in blocks] == [
+            EnhancedPacket, EnhancedPacket, SectionHeader,
+            InterfaceDescription, InterfaceDescription, EnhancedPacket]
+
+        with pytest.raises(IndexError):
+            reader.block(46)
+
+
+@pytest.mark.parametrize('filename,packet_type', [
+    ('test_data/test006-fixed.ntar', ObsoletePacket),
+    ('test_data/test007.ntar', SimplePacket)])
+def test_indexed_reader_sample_files(filename, packet_type):
+    with open(filename, 'rb') as fp:
+        reader = IndexedReader(fp, BlockIndex.build(fp))
+        assert reader.packet_count == 1
+        assert isinstance(reader.packet(0), packet_type)
+        assert reader.packet(0).interface is reader.block(1)
+
+
+def test_timestamp_index(tmpdir):
+    path = str(tmpdir.join('capture.pcapng'))
+    with open(path, 'wb') as fp:
+        written = write_capture(fp, sections=2)
+
+    with open(path, 'rb') as fp:
+        index = BlockIndex.build(fp)
+
+    timestamps = [timestamp * 1000 for _, _, timestamp, _ in written]
+    assert [ts for ts in index.timestamps if ts != NO_TIMESTAMP] == timestamps
+    assert [index.timestamps[num] for num in index.time_order] == timestamps
+    assert index.search_time(0) == 0
+    assert index.search_time(timestamps[10]) == 10
+    assert index.search_time(timestamps[10] - 1) == 10
+    assert index.search_time(timestamps[10] + 1) == 11
+    assert index.search_time(timestamps[-1] + 1) == 40
+
+
+def test_indexed_reader_time_range(capture):
+    expected = _packets(capture)
+    start = 1420070400
+
+    with open(capture, 'rb') as fp:
+        reader = IndexedReader(fp, load_index(capture))
+        assert reader.seek_time(start) == 3
+        assert reader.seek_time(start + 0.0015) == 4
+        assert reader.seek_time(start + 0.021) == 26
+        assert reader.seek_time(start + 1) is None
+
+        packets = list(reader.iter_range(start + 0.0105, start + 0.0245))
+        assert [p.packet_data for p in packets] == \
+            [data for _, _, data in expected[10:24]]
+        assert packets[0].timestamp == pytest.approx(start + 0.011)
+        assert list(reader.iter_range(start + 1, start + 2)) == []
+
+
+def test_indexed_reader_time_range_out_of_order():
+    # Two interfaces with different resolutions, captured out of order
+    shb = SectionHeader()
+    micro = shb.new_member(InterfaceDescription, link_type=1)
+    nano = shb.new_member(InterfaceDescription, link_type=1,
+                          options={'if_tsresol': b'\x09'})
+    packets = [(0, 3000000, b'third'), (1, 1000000000, b'first'),
+               (0, 4000000, b'fourth'), (1, 2000000000, b'second')]
+
+    fp = io.BytesIO()
+    shb.write(fp)
+    micro.write(fp)
+    nano.write(fp)
+    for interface_id, timestamp, data in packets:
+        shb.new_member(
+            EnhancedPacket, interface_id=interface_id,
+            timestamp_high=timestamp >> 32,
+            timestamp_low=timestamp & 0xffffffff,
+            packet_data=data,
+        ).write(fp)
+    fp.seek(0)
+
+    reader = IndexedReader(fp, BlockIndex.build(fp))
+    assert list(reader.index.time_order) == [4, 6, 3, 5]
+    assert reader.seek_time(2) == 6
+    assert reader.seek_time(2.5) == 3
+    assert [p.packet_data for p in reader.iter_range(1, 4)] == \
+        [b'first', b'second', b'third']
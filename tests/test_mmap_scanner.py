@@ -0,0 +1,60 @@
+import glob
+
+import pytest
+
+from pcapng.blocks import EnhancedPacket, SectionHeader
+from pcapng.scanner import FileScanner
+
+
+SAMPLE_FILES = sorted(
+    name for name in glob.glob('test_data/*.ntar')
+    if name != 'test_data/test006.ntar')
+
+
+def _summarize(block):
+    values = []
+    for name, field, default in getattr(block, 'schema', []):
+        value = getattr(block, name)
+        if isinstance(value, memoryview):
+            value = value.tobytes()
+        elif name == 'options':
+            value = repr(value)
+        values.append((name, value))
+    return type(block), values
+
+
+@pytest.mark.parametrize('filename', SAMPLE_FILES)
+def test_mmap_scanner_matches_stream_scanner(filename):
+    with open(filename, 'rb') as fp:
+        expected = [_summarize(block) for block in FileScanner(fp)]
+
+    with open(filename, 'rb') as fp:
+        scanner = FileScanner(fp, use_mmap=True)
+        assert [_summarize(block) for block in scanner] == expected
+
+
+def test_mmap_scanner_packet_data_is_a_view(tmpdir):
+    with open('test_data/test006-fixed.ntar', 'rb') as fp:
+        packet = list(FileScanner(fp))[2]
+
+    out = tmpdir.join('capture.pcapng')
+    with out.open('wb') as fp:
+        packet.section.write(fp)
+        packet.interface.write(fp)
+        packet.enhanced().write(fp)
+
+    with out.open('rb') as fp:
+        blocks = list(FileScanner(fp, use_mmap=True))
+
+    assert isinstance(blocks[0], SectionHeader)
+    assert isinstance(blocks[2], EnhancedPacket)
+    assert isinstance(blocks[2].packet_data, memoryview)
+    assert blocks[2].packet_data == packet.packet_data
+    assert blocks[2].captured_len == packet.captured_len
+
+
+def test_mmap_scanner_empty_file(tmpdir):
+    out = tmpdir.join('empty.pcapng')
+    out.write_binary(b'')
+    with out.open('rb') as fp:
+        assert list(FileScanner(fp, use_mmap=True)) == []
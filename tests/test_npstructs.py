@@ -0,0 +1,159 @@
+import glob
+import io
+import struct
+
+import pytest
+
+import pcapng.strictness as strictness
+from pcapng import FileScanner
+from pcapng.blocks import (
+    BasePacketBlock, EnhancedPacket, InterfaceDescription, ObsoletePacket,
+    SectionHeader, SimplePacket)
+from pcapng.utils import timestamp_to_ns
+
+from conftest import write_capture
+
+numpy = pytest.importorskip('numpy')
+npstructs = pytest.importorskip('pcapng.npstructs')
+
+
+SAMPLE_FILES = sorted(
+    name for name in glob.glob('test_data/*.ntar')
+    if name != 'test_data/test006.ntar')
+
+
+def _expected(fp):
+    expected = []
+    section = -1
+    for block in FileScanner(fp):
+        if isinstance(block, SectionHeader):
+            section += 1
+        if not isinstance(block, BasePacketBlock):
+            continue
+        ts_raw = ts_ns = 0
+        if not isinstance(block, SimplePacket):
+            ts_raw = (block.timestamp_high << 32) + block.timestamp_low
+            ts_ns = timestamp_to_ns(
+                ts_raw, block.interface.options.get('if_tsresol'))
+        expected.append((block.interface_id, ts_raw, ts_ns,
+                         block.captured_len, block.packet_len, section))
+    return expected
+
+
+def _found(headers):
+    return [(int(h['interface_id']), int(h['ts_raw']), int(h['ts_ns']),
+             int(h['caplen']), int(h['origlen']), int(h['section']))
+            for h in headers]
+
+
+@pytest.mark.parametrize('filename', SAMPLE_FILES)
+def test_headers_match_blocks(filename):
+    with open(filename, 'rb') as fp:
+        expected = _expected(fp)
+    with open(filename, 'rb') as fp:
+        headers = npstructs.read_packet_headers(fp)
+    assert headers.dtype == npstructs.PACKET_HEADER_DTYPE
+    assert _found(headers) == expected
+
+
+def test_offsets(capture):
+    with open(capture, 'rb') as fp:
+        headers = npstructs.read_packet_headers(fp)
+        for offset in headers['offset'][:5]:
+            fp.seek(int(offset))
+            block = next(iter(FileScanner(fp, section=_section(capture))))
+            assert isinstance(block, EnhancedPacket)
+
+
+def _section(path):
+    with open(path, 'rb') as fp:
+        return next(iter(FileScanner(fp)))
+
+
+def test_multiple_sections_and_chunks(monkeypatch):
+    monkeypatch.setattr(npstructs, 'CHUNK_SIZE', 7)
+    stream = io.BytesIO()
+    written = write_capture(stream, sections=3, packets=10)
+    headers = npstructs.unpack_packet_headers(stream.getvalue())
+    assert len(headers) == 30
+    assert list(headers['section']) == [0] * 10 + [1] * 10 + [2] * 10
+    assert list(headers['ts_ns']) == [ts * 1000 for _, _, ts, _ in written]
+    assert list(headers['caplen']) == [len(data) for _, _, _, data in written]
+    assert numpy.all(numpy.diff(headers['offset'].astype('i8')) > 0)
+
+
+def test_empty_file(tmpdir):
+    path = tmpdir.join('empty.pcapng')
+    path.write(b'')
+    with path.open('rb') as fp:
+        assert len(npstructs.read_packet_headers(fp)) == 0
+
+
+@pytest.mark.parametrize('tsresol', [b'\x03', b'\x06', b'\x09', b'\x0c',
+                                     b'\x8a', b'\x9e', b'\xa8', b'\xc8',
+                                     b'\xff', None])
+def test_timestamps_to_ns(tsresol):
+    raw = [0, 1, 12345678901234, 2 ** 63 + 2 ** 40 + 7, 2 ** 64 - 1]
+    found = npstructs.timestamps_to_ns(numpy.array(raw, dtype='u8'), tsresol)
+    for timestamp, result in zip(raw, found):
+        expected = timestamp_to_ns(timestamp, tsresol)
+        if expected < 2 ** 63:
+            # Truncating the fraction may round down one nanosecond
+            assert expected - int(result) in (0, 1)
+
+
+def test_tsresol():
+    stream = io.BytesIO()
+    shb = SectionHeader()
+    shb.write(stream)
+    shb.new_member(InterfaceDescription, link_type=1, snaplen=3,
+                   options={'if_tsresol': b'\x09'}).write(stream)
+    shb.new_member(EnhancedPacket, interface_id=0, timestamp_high=1,
+                   timestamp_low=2, packet_data=b'abc').write(stream)
+    headers = npstructs.unpack_packet_headers(stream.getvalue())
+    assert _found(headers) == [(0, (1 << 32) + 2, (1 << 32) + 2, 3, 3, 0)]
+
+
+def _raw_block(endianness, block_type, payload):
+    payload += b'\x00' * (-len(payload) % 4)
+    length = len(payload) + 12
+    return (struct.pack(endianness + 'II', block_type, length) + payload +
+            struct.pack(endianness + 'I', length))
+
+
+def _raw_section(endianness, timestamp):
+    return b''.join([
+        _raw_block(endianness, 0x0A0D0D0A, struct.pack(
+            endianness + 'IHHq', 0x1A2B3C4D, 1, 0, -1)),
+        _raw_block(endianness, 1, struct.pack(endianness + 'HHI', 1, 0, 0)),
+        _raw_block(endianness, 6, struct.pack(
+            endianness + 'IIIII', 0, timestamp >> 32, timestamp & 0xffffffff,
+            5, 60) + b'hello'),
+        _raw_block(endianness, 3, struct.pack(endianness + 'I', 4) + b'abcd'),
+    ])
+
+
+def test_mixed_endianness():
+    data = _raw_section('<', 123456789012) + _raw_section('>', 987654321098)
+    expected = _expected(io.BytesIO(data))
+    assert len(expected) == 4
+    assert _found(npstructs.unpack_packet_headers(data)) == expected
+
+
+@pytest.mark.parametrize('endianness', ['<', '>'])
+def test_obsolete_packets(endianness, monkeypatch):
+    # Allow writing obsolete packets
+    monkeypatch.setattr(strictness, 'strictness', strictness.STRICTNESS_NONE)
+    stream = io.BytesIO()
+    shb = SectionHeader(endianness=endianness)
+    shb.write(stream)
+    for _ in range(2):
+        shb.new_member(InterfaceDescription, link_type=1).write(stream)
+    shb.new_member(ObsoletePacket, interface_id=1, drops_count=7,
+                   timestamp_high=1, timestamp_low=5,
+                   packet_data=b'abc').write(stream)
+    headers = npstructs.unpack_packet_headers(stream.getvalue())
+    assert len(headers) == 1
+    assert headers['interface_id'][0] == 1
+    assert headers['ts_raw'][0] == (1 << 32) + 5
+    assert headers['caplen'][0] == headers['origlen'][0] == 3
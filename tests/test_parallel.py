@@ -0,0 +1,113 @@
+import io
+
+import pytest
+
+from pcapng.blocks import EnhancedPacket, InterfaceDescription, SectionHeader
+from pcapng.index import BlockIndex
+from pcapng.parallel import ParallelScanner, scan_range, split_ranges
+from pcapng.scanner import FileScanner
+
+from conftest import write_capture
+
+
+def _describe(block):
+    data = getattr(block, 'packet_data', None)
+    if data is not None:
+        data = bytes(data)
+        return (type(block).__name__, block.interface.options['if_name'],
+                block.timestamp, data)
+    return (type(block).__name__,)
+
+
+@pytest.fixture
+def big_capture(tmpdir):
+    path = tmpdir.join('capture.pcapng')
+    with path.open('wb') as fp:
+        write_capture(fp, sections=3, interfaces=3, packets=200)
+    return str(path)
+
+
+def _expected(path):
+    with open(path, 'rb') as fp:
+        return [_describe(block) for block in FileScanner(fp)]
+
+
+@pytest.mark.parametrize('use_index', [False, True])
+def test_split_ranges(big_capture, use_index):
+    with open(big_capture, 'rb') as fp:
+        index = BlockIndex.build(fp)
+
+    ranges = split_ranges(big_capture, 16, index if use_index else None)
+    assert len(ranges) == 16
+    assert ranges[0].start == 0
+    assert ranges[-1].end is None
+    for previous, following in zip(ranges, ranges[1:]):
+        assert previous.end == following.start
+    for byte_range in ranges:
+        assert byte_range.start in index.offsets
+        assert byte_range.section_offset <= byte_range.start
+
+    results = []
+    for byte_range in ranges:
+        results.extend(scan_range(big_capture, byte_range, _describe))
+    assert results == _expected(big_capture)
+
+
+def test_split_ranges_more_than_blocks(capture):
+    ranges = split_ranges(capture, 1000)
+    assert 1 < len(ranges) <= 46
+    results = []
+    for byte_range in ranges:
+        results.extend(scan_range(capture, byte_range, _describe))
+    assert results == _expected(capture)
+
+
+def test_parallel_scanner(big_capture):
+    scanner = ParallelScanner(big_capture, workers=2)
+    assert list(scanner.map(_describe)) == _expected(big_capture)
+
+
+def test_parallel_scanner_options(big_capture):
+    with open(big_capture, 'rb') as fp:
+        index = BlockIndex.build(fp)
+    scanner = ParallelScanner(big_capture, workers=2, index=index,
+                              block_types=[6], interfaces=[2])
+    assert list(scanner.map(_describe)) == [
+        item for item in _expected(big_capture)
+        if item[0] == 'EnhancedPacket' and item[1] == 'eth2']
+
+
+def test_split_ranges_embedded_capture(tmpdir):
+    # A packet holding a whole capture, with its own section header
+    inner = io.BytesIO()
+    shb = SectionHeader()
+    shb.write(inner)
+    shb.new_member(InterfaceDescription, link_type=105,
+                   options={'if_tsresol': b'\x09'}).write(inner)
+    path = tmpdir.join('capture.pcapng')
+    with path.open('wb') as fp:
+        shb = SectionHeader()
+        shb.write(fp)
+        shb.new_member(InterfaceDescription, link_type=1).write(fp)
+        for num in range(50):
+            data = b'packet %d' % num
+            if num == 25:
+                data = inner.getvalue() * 100
+            shb.new_member(EnhancedPacket, interface_id=0, timestamp_low=num,
+                           packet_data=data).write(fp)
+    path = str(path)
+
+    def describe(block):
+        if isinstance(block, EnhancedPacket):
+            return block.interface.link_type, block.timestamp
+        return type(block).__name__
+
+    ranges = split_ranges(path, 8)
+    assert len(ranges) > 2
+    assert all(byte_range.section_offset == 0 for byte_range in ranges)
+    results = []
+    for byte_range in ranges:
+        results.extend(scan_range(path, byte_range, describe))
+    with open(path, 'rb') as fp:
+        assert results == [describe(block) for block in FileScanner(fp)]
+    assert results[-1] == (1, 49e-6)
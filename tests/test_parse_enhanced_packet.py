@@ -160,3 +160,27 @@ def test_read_block_enhanced_packet_tsresol_bigendian(tsr_base, tsr_exp):
     resol = tsr_base ** tsr_exp
     assert blocks[2].timestamp_resolution == resol
     assert blocks[2].timestamp == 1420070400.0
+    assert blocks[2].timestamp_ns == 1420070400 * 10 ** 9
+
+
+def test_timestamp_ns_tsoffset():
+    stream = io.BytesIO()
+    shb = SectionHeader()
+    shb.write(stream)
+    shb.new_member(InterfaceDescription, link_type=1, options={
+        'if_tsresol': pack_timestamp_resolution(10, -9),
+        'if_tsoffset': 1420070400,
+    }).write(stream)
+    shb.new_member(EnhancedPacket, interface_id=0, timestamp_high=0,
+                   timestamp_low=123456789, packet_data=b'abcd').write(stream)
+
+    blocks = list(FileScanner(io.BytesIO(stream.getvalue())))
+    interface, packet = blocks[1], blocks[2]
+    assert packet.timestamp_ns == 1420070400123456789
+    assert interface.timestamp_converter is interface.timestamp_converter
+
+    # The converter follows changes to the options
+    interface.options['if_tsresol'] = pack_timestamp_resolution(10, -6)
+    assert packet.timestamp_ns == 1420070400 * 10 ** 9 + 123456789000
+    del interface.options['if_tsoffset']
+    assert packet.timestamp_ns == 123456789000
@@ -0,0 +1,87 @@
+import glob
+
+import pytest
+
+from pcapng import BlockParser, FileScanner
+from pcapng.blocks import EnhancedPacket, SectionHeader
+from pcapng.constants.block_types import BLK_ENHANCED_PACKET
+from pcapng.exceptions import TruncatedFile
+
+
+SAMPLE_FILES = sorted(
+    name for name in glob.glob('test_data/*.ntar')
+    if name != 'test_data/test006.ntar')
+
+
+def _summarize(block):
+    values = []
+    for name, field, default in getattr(block, 'schema', []):
+        value = getattr(block, name)
+        if name == 'options':
+            value = repr(value)
+        values.append((name, value))
+    return type(block), values
+
+
+def _chunks(data, size):
+    return [data[pos:pos + size] for pos in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 4096])
+@pytest.mark.parametrize('filename', SAMPLE_FILES)
+def test_parser_matches_scanner(filename, chunk_size):
+    with open(filename, 'rb') as fp:
+        expected = [_summarize(block) for block in FileScanner(fp)]
+        fp.seek(0)
+        data = fp.read()
+
+    parser = BlockParser()
+    blocks = []
+    for chunk in _chunks(data, chunk_size):
+        blocks.extend(parser.feed(chunk))
+    parser.close()
+    assert [_summarize(block) for block in blocks] == expected
+    assert parser.offset == len(data)
+
+
+def test_parser_returns_blocks_as_soon_as_complete(capture):
+    with open(capture, 'rb') as fp:
+        data = fp.read()
+        fp.seek(0)
+        offsets = []
+        scanner = FileScanner(fp)
+        for block in scanner:
+            offsets.append(scanner.offset)
+
+    parser = BlockParser()
+    position = 0
+    for num, offset in enumerate(offsets):
+        # Everything but the last byte of the block
+        assert parser.feed(memoryview(data)[position:offset - 1]) == []
+        blocks = parser.feed(bytearray(data[offset - 1:offset]))
+        assert len(blocks) == 1
+        position = offset
+    assert isinstance(blocks[0], EnhancedPacket)
+    assert blocks[0].section is not None
+
+
+def test_parser_filters(capture):
+    with open(capture, 'rb') as fp:
+        data = fp.read()
+    parser = BlockParser(block_types=[BLK_ENHANCED_PACKET], interfaces=[1],
+                         headers_only=True)
+    blocks = []
+    for chunk in _chunks(data, 100):
+        blocks.extend(parser.feed(chunk))
+    assert len(blocks) == 20
+    assert all(block.interface_id == 1 for block in blocks)
+    assert isinstance(parser.current_section, SectionHeader)
+
+
+def test_parser_close_truncated(capture):
+    with open(capture, 'rb') as fp:
+        data = fp.read()
+    parser = BlockParser()
+    parser.feed(data[:-3])
+    with pytest.raises(TruncatedFile):
+        parser.close()
@@ -0,0 +1,193 @@
+import io
+import struct
+
+import pytest
+
+from pcapng.exceptions import StreamEmpty, TruncatedFile
+from pcapng.readers import (
+    BufferedBlockReader, find_block_boundary, is_block_boundary)
+
+
+SECTION_HEADER = (
+    b'\x0a\x0d\x0d\x0a'  # Magic number
+    b'\x1c\x00\x00\x00'  # Block size (28 bytes)
+    b'\x4d\x3c\x2b\x1a'  # Byte order magic (little endian)
+    b'\x01\x00\x00\x00'  # Version
+    b'\xff\xff\xff\xff\xff\xff\xff\xff'  # Undefined section length
+    b'\x1c\x00\x00\x00')  # Block size (28 bytes)
+
+
+def _padded(payload):
+    return payload + b'\x00' * (-len(payload) % 4)
+
+
+def _unknown_block(payload):
+    # Block length includes the padding, which is then part of the data
+    length = struct.pack('<I', 12 + len(_padded(payload)))
+    return b'\xff\x00\x00\x00' + length + _padded(payload) + length
+
+
+class CountingStream(object):
+    def __init__(self, data):
+        self.data = data
+        self.stream = io.BytesIO(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return self.stream.read(size)
+
+
+def _read_all(reader):
+    endianness = '='
+    while True:
+        try:
+            block_type, endianness, data = reader.read_block(endianness)
+        except StreamEmpty:
+            return
+        yield block_type, data
+
+
+def test_buffered_reader_reads_in_chunks():
+    payloads = [b'packet %d' % i for i in range(1000)]
+    stream = CountingStream(
+        SECTION_HEADER + b''.join(_unknown_block(p) for p in payloads))
+    reader = BufferedBlockReader(stream, buffer_size=4096)
+
+    blocks = list(_read_all(reader))
+    assert [data for _, data in blocks[1:]] == [_padded(p) for p in payloads]
+    assert reader.offset == len(stream.data)
+    assert stream.reads < len(stream.data) // 4096 + 3
+
+
+@pytest.mark.parametrize('buffer_size', [1, 7, 64])
+def test_buffered_reader_blocks_larger_than_buffer(buffer_size):
+    payloads = [b'x' * 1000, b'y' * 3, b'z' * 4097]
+    stream = io.BytesIO(
+        SECTION_HEADER + b''.join(_unknown_block(p) for p in payloads))
+    reader = BufferedBlockReader(stream, buffer_size=buffer_size)
+
+    blocks = list(_read_all(reader))
+    assert blocks[0][0] == 0x0a0d0d0a
+    assert blocks[1:] == [(0xff, _padded(p)) for p in payloads]
+
+
+def test_buffered_reader_offsets():
+    stream = io.BytesIO(SECTION_HEADER + _unknown_block(b'abc'))
+    reader = BufferedBlockReader(stream)
+    assert reader.offset == 0
+    reader.read_block('=')
+    assert reader.offset == 28
+    reader.read_block('<')
+    assert reader.offset == 44
+
+
+def test_buffered_reader_truncated_stream():
+    stream = io.BytesIO(SECTION_HEADER + _unknown_block(b'abc')[:-2])
+    reader = BufferedBlockReader(stream, buffer_size=8)
+    reader.read_block('=')
+    with pytest.raises(TruncatedFile):
+        reader.read_block('<')
+
+
+def test_buffered_reader_view_types():
+    stream = io.BytesIO(SECTION_HEADER + _unknown_block(b'some data'))
+    reader = BufferedBlockReader(stream, buffer_size=16)
+
+    block_type, endianness, data = reader.read_block('=', view_types=(0xff,))
+    assert isinstance(data, bytes)  # Section header
+    block_type, endianness, data = reader.read_block('<', view_types=(0xff,))
+    assert block_type == 0xff
+    assert isinstance(data, memoryview)
+    assert data.tobytes() == _padded(b'some data')
+
+
+def test_buffered_reader_accept():
+    payloads = [b'packet %d' % i for i in range(10)]
+    stream = io.BytesIO(
+        SECTION_HEADER + b''.join(_unknown_block(p) for p in payloads))
+    reader = BufferedBlockReader(stream, buffer_size=64)
+
+    def accept(block_type, endianness, data):
+        assert isinstance(data, memoryview)
+        return block_type != 0xff or data[7:8] in (b'3', b'7')
+
+    blocks = []
+    endianness = '='
+    while True:
+        try:
+            block_type, endianness, data = reader.read_block(
+                endianness, accept=accept)
+        except StreamEmpty:
+            break
+        blocks.append(data)
+    assert blocks[1:] == [_padded(b'packet 3'), _padded(b'packet 7')]
+    assert all(isinstance(data, bytes) for data in blocks)
+
+
+def test_buffered_reader_end():
+    blocks = [_unknown_block(b'packet %d' % i) for i in range(4)]
+    data = SECTION_HEADER + b''.join(blocks)
+    end = len(SECTION_HEADER) + len(blocks[0]) + len(blocks[1])
+    reader = BufferedBlockReader(io.BytesIO(data), buffer_size=7, end=end)
+    assert [data for _, data in _read_all(reader)][1:] == \
+        [_padded(b'packet 0'), _padded(b'packet 1')]
+    assert reader.offset == end
+
+
+def test_find_block_boundary():
+    # Packet data looking like block headers, at aligned and unaligned
+    # offsets, with some plausible lengths
+    decoys = [
+        b'\x06\x00\x00\x00\x10\x00\x00\x00xxxx\x11\x00\x00\x00',
+        b'x\x06\x00\x00\x00\x10\x00\x00\x00xxxx\x10\x00\x00\x00',
+    ]
+    blocks = [struct.pack('<II', 6, 12 + len(_padded(payload))) +
+              _padded(payload) +
+              struct.pack('<I', 12 + len(_padded(payload)))
+              for payload in decoys * 3]
+    data = SECTION_HEADER + b''.join(blocks)
+    offsets = [len(SECTION_HEADER)]
+    for block in blocks:
+        offsets.append(offsets[-1] + len(block))
+
+    assert is_block_boundary(data, 0, '<')
+    assert is_block_boundary(data, offsets[-1], '<')
+    assert not is_block_boundary(data, offsets[0] + 8, '<')
+    for start in range(offsets[0] + 1, offsets[-2]):
+        expected = min(offset for offset in offsets if offset >= start)
+        assert find_block_boundary(data, start, '<') == expected
+    assert find_block_boundary(data, offsets[-1], '<') is None
+    assert find_block_boundary(data, 1, '<', end=offsets[0]) is None
+
+
+def test_buffered_reader_feed_large_block():
+    payload = b'x' * (1024 * 1024)
+    data = SECTION_HEADER + _unknown_block(payload)
+    reader = BufferedBlockReader(None)
+    found = []
+    for start in range(0, len(data), 4096):
+        reader.feed(data[start:start + 4096])
+        while True:
+            try:
+                found.append(reader.read_block('<')[2])
+            except (StreamEmpty, TruncatedFile):
+                break
+        # Pending chunks are only joined once the block is complete
+        assert len(reader.buffer) <= 4096 or len(found) == 2
+    assert found[1] == payload
+    assert reader.offset == len(data)
+    assert reader.buffered == 0
+
+
+def test_buffered_reader_short_reads():
+    class ShortReadStream(CountingStream):
+        def read(self, size=-1):
+            return super(ShortReadStream, self).read(min(size, 100))
+
+    payloads = [b'x' * 100000, b'y' * 3]
+    stream = ShortReadStream(
+        SECTION_HEADER + b''.join(_unknown_block(p) for p in payloads))
+    reader = BufferedBlockReader(stream, buffer_size=10)
+    blocks = list(_read_all(reader))
+    assert blocks[1:] == [(0xff, _padded(p)) for p in payloads]
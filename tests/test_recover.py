@@ -0,0 +1,87 @@
+import io
+
+import pytest
+
+from pcapng.blocks import EnhancedPacket
+from pcapng.exceptions import CorruptedFile, TruncatedFile
+from pcapng.index import BlockIndex
+from pcapng.scanner import FileScanner, SkippedRange
+
+from conftest import write_capture
+
+
+@pytest.fixture
+def capture_data():
+    fp = io.BytesIO()
+    written = write_capture(fp, packets=50)
+    data = fp.getvalue()
+    fp.seek(0)
+    return data, BlockIndex.build(fp), [item[3] for item in written]
+
+
+def _scan(data, use_mmap, tmpdir, **kwargs):
+    if use_mmap:
+        path = tmpdir.join('capture.pcapng')
+        path.write_binary(data)
+        with path.open('rb') as fp:
+            return list(FileScanner(fp, use_mmap=True, recover=True))
+    return list(FileScanner(io.BytesIO(data), recover=True, **kwargs))
+
+
+def _packets(blocks):
+    return [block.packet_data.tobytes()
+            if isinstance(block.packet_data, memoryview)
+            else block.packet_data
+            for block in blocks if isinstance(block, EnhancedPacket)]
+
+
+SCANS = [
+    (True, {}),
+    (False, {}),
+    (False, {'buffer_size': 64}),
+]
+
+
+@pytest.mark.parametrize('use_mmap,kwargs', SCANS)
+def test_recover_corrupted_blocks(capture_data, tmpdir, use_mmap, kwargs):
+    data, index, packets = capture_data
+    data = bytearray(data)
+    # Break the trailing length of packet 10 (block 13), and the leading
+    # length of packet 20 (block 23)
+    data[index.offsets[14] - 4] ^= 0x40
+    data[index.offsets[23] + 4] ^= 0x40
+    # Overwrite packets 30 to 32 (blocks 33 to 35) with garbage
+    data[index.offsets[33]:index.offsets[36]] = \
+        b'\x06\x00\x00\x00garbage!' * 30
+
+    blocks = _scan(bytes(data), use_mmap, tmpdir, **kwargs)
+    skipped = [block for block in blocks if isinstance(block, SkippedRange)]
+    assert [(block.start, block.end) for block in skipped] == [
+        (index.offsets[13], index.offsets[14]),
+        (index.offsets[23], index.offsets[24]),
+        (index.offsets[33], index.offsets[33] + 12 * 30),
+    ]
+    assert all(isinstance(block.error, (CorruptedFile, TruncatedFile))
+               for block in skipped)
+    assert _packets(blocks) == \
+        packets[:10] + packets[11:20] + packets[21:30] + packets[33:]
+
+
+@pytest.mark.parametrize('use_mmap,kwargs', SCANS)
+def test_recover_truncated_file(capture_data, tmpdir, use_mmap, kwargs):
+    data, index, packets = capture_data
+    data = data[:index.offsets[-1] + 10]
+
+    blocks = _scan(data, use_mmap, tmpdir, **kwargs)
+    assert isinstance(blocks[-1], SkippedRange)
+    assert (blocks[-1].start, blocks[-1].end) == (index.offsets[-1], len(data))
+    assert isinstance(blocks[-1].error, TruncatedFile)
+    assert _packets(blocks) == packets[:-1]
+
+
+def test_no_recover(capture_data):
+    data, index, packets = capture_data
+    data = bytearray(data)
+    data[index.offsets[14] - 4] ^= 0x40
+    with pytest.raises(CorruptedFile):
+        list(FileScanner(io.BytesIO(bytes(data))))
@@ -0,0 +1,120 @@
+"""
+Tests for reading from non-seekable streams (pipes, sockets, ...)
+"""
+
+import os
+import socket
+import threading
+
+import pytest
+
+from pcapng.blocks import SectionHeader, InterfaceDescription, EnhancedPacket
+from pcapng.scanner import FileScanner
+
+
+CAPTURE = (
+    # ---------- Section header
+    b"\x0a\x0d\x0d\x0a"  # Magic number
+    b"\x00\x00\x00\x1c"  # Block size (28 bytes)
+    b"\x1a\x2b\x3c\x4d"  # Magic number
+    b"\x00\x01\x00\x00"  # Version
+    b"\xff\xff\xff\xff\xff\xff\xff\xff"  # Undefined section length
+    b"\x00\x00\x00\x1c"  # Block size (28 bytes)
+
+    # ---------- Interface description
+    b'\x00\x00\x00\x01'  # block magic
+    b'\x00\x00\x00\x14'  # block syze (20 bytes)
+    b'\x00\x01'  # link type
+    b'\x00\x00'  # reserved block
+    b'\x00\x00\xff\xff'  # size limit
+    b'\x00\x00\x00\x14'  # block syze (20 bytes)
+
+    # ---------- Enhanced packet
+    b'\x00\x00\x00\x06'  # block magic
+    b'\x00\x00\x00\x28'  # block syze (40 bytes)
+    b'\x00\x00\x00\x00'  # interface id (first one, eth0)
+    b'\x00\x04\xf8\x1e' b'\x3c\x3e\xd5\xa9'  # timestamp (microseconds)
+    b'\x00\x00\x00\x05'  # Captured length
+    b'\x00\x00\x00\x05'  # Original length
+    b'Hello\x00\x00\x00'  # Packet data
+    b'\x00\x00\x00\x28'  # block syze (40 bytes)
+)
+
+BLOCK_ENDS = [28, 48, 88]
+
+
+class TrickleStream(object):
+    """Unbuffered stream only returning a few bytes at a time"""
+
+    def __init__(self, data, size):
+        self.data = data
+        self.size = size
+
+    def read(self, size=-1):
+        chunk, self.data = self.data[:self.size], self.data[self.size:]
+        return chunk
+
+    def tell(self):
+        raise IOError('Illegal seek')
+
+
+def _check_blocks(blocks):
+    assert [type(block) for block in blocks] == [
+        SectionHeader, InterfaceDescription, EnhancedPacket]
+    assert blocks[2].packet_data == b'Hello'
+
+
+@pytest.mark.parametrize('size', [1, 3, 16])
+def test_scan_short_reads(size):
+    _check_blocks(list(FileScanner(TrickleStream(CAPTURE, size))))
+
+
+def _scan_incrementally(read_fp, write, close):
+    """
+    Write the capture one block at a time, checking that each block is
+    returned by the scanner before the next one is written.
+    """
+    received = []
+    arrived = threading.Event()
+
+    def consume():
+        for block in FileScanner(read_fp):
+            received.append(block)
+            arrived.set()
+
+    consumer = threading.Thread(target=consume)
+    consumer.daemon = True
+    consumer.start()
+
+    timely = []
+    start = 0
+    for end in BLOCK_ENDS:
+        arrived.clear()
+        write(CAPTURE[start:end])
+        start = end
+        timely.append(arrived.wait(5))
+
+    close()
+    consumer.join(5)
+    assert not consumer.is_alive()
+    assert timely == [True, True, True], \
+        'Blocks not returned until more data arrived'
+    _check_blocks(received)
+
+
+def test_scan_pipe():
+    rfd, wfd = os.pipe()
+    with os.fdopen(rfd, 'rb') as read_fp:
+        write_fp = os.fdopen(wfd, 'wb', 0)
+        _scan_incrementally(read_fp, write_fp.write, write_fp.close)
+
+
+def test_scan_socket():
+    rsock, wsock = socket.socketpair()
+    try:
+        with rsock.makefile('rb') as read_fp:
+            _scan_incrementally(read_fp, wsock.sendall,
+                                lambda: wsock.shutdown(socket.SHUT_WR))
+    finally:
+        rsock.close()
+        wsock.close()
@@ -12,9 +12,20 @@ from pcapng.exceptions import (
     BadMagic, CorruptedFile, StreamEmpty, TruncatedFile)
 from pcapng.structs import (
     IntField, ListField, NameResolutionRecordField, Option, Options, OptionsField,
+    OptionsSchema,
     PacketBytes, RawBytes, read_block_data,
     read_bytes, read_bytes_padded, read_int, read_options, read_section_header,
-    struct_decode)
+    SkippedData, compile_schema, int_struct, struct_decode,
+    unpack_block_from)
+
+
+def compiled_decode(schema, stream, endianness='='):
+    return compile_schema(schema)(stream, endianness)
+
+
+# Decoding with a compiled schema must give the same results
+decoders = pytest.mark.parametrize(
+    'decode', [struct_decode, compiled_decode])
 
 
 def test_read_int():
@@ -46,6 +57,15 @@ def test_read_int():
     assert read_int(io.BytesIO(b'\x12\x34\x56\x78'), 32, True, '<') == 0x78563412  # noqa
 
 
+def test_int_struct():
+    compiled = int_struct(16, True, '>')
+    assert compiled is int_struct(16, True, '>')
+    assert compiled.format in ('>h', b'>h')
+    assert compiled.unpack(b'\xff\xfe') == (-2,)
+    assert int_struct(64).size == 8
+    assert int_struct(8, False, '<') is not int_struct(8, True, '<')
+
+
 def test_read_int_empty_stream():
     with pytest.raises(StreamEmpty):
         read_int(io.BytesIO(b''), 32)
@@ -148,6 +168,47 @@ def test_read_block_data_mismatching_lengths():
     assert str(ctx.value) == 'Mismatching block lengths: 17 and 4278190097'
 
 
+def test_unpack_block_from():
+    data = memoryview(
+        b'\x0a\x0d\x0d\x0a'  # section header magic
+        b'\x1c\x00\x00\x00'  # block length (28 bytes)
+        b'\x4d\x3c\x2b\x1a'  # byte order magic [little endian]
+        b'\x01\x00\x00\x00'  # version 1.0
+        b'\xff\xff\xff\xff\xff\xff\xff\xff'  # section length unknown
+        b'\x1c\x00\x00\x00'  # block length, again
+        b'\x06\x00\x00\x00'  # block type
+        b'\x11\x00\x00\x00' b'12345XXX' b'\x11\x00\x00\x00')
+
+    block_type, endianness, payload, offset = unpack_block_from(data, 0, '=')
+    assert block_type == 0x0a0d0d0a
+    assert endianness == '<'
+    assert payload == b'\x01\x00\x00\x00\xff\xff\xff\xff\xff\xff\xff\xff'
+    assert offset == 28
+
+    block_type, endianness, payload, offset = unpack_block_from(
+        data, offset, endianness)
+    assert block_type == 6
+    assert endianness == '<'
+    assert isinstance(payload, memoryview)
+    assert payload == b'12345'
+    assert offset == 48
+
+    with pytest.raises(StreamEmpty):
+        unpack_block_from(data, offset, endianness)
+
+    with pytest.raises(TruncatedFile):
+        unpack_block_from(data[:-1], 28, endianness)
+
+
+def test_unpack_block_from_mismatching_lengths():
+    data = (b'\x06\x00\x00\x00' b'\x11\x00\x00\x00' b'12345XXX'
+            b'\xff\x00\x00\x11')
+    with pytest.raises(CorruptedFile) as ctx:
+        unpack_block_from(data, 0, '<')
+
+    assert str(ctx.value) == 'Mismatching block lengths: 17 and 285212927'
+
+
 def test_read_bytes():
     data = io.BytesIO(b'foobar')
     assert read_bytes(data, 3) == b'foo'
@@ -165,6 +226,21 @@ def test_read_bytes():
     assert read_bytes(data, 0) == b''
 
 
+def test_read_bytes_short_reads():
+    class ShortReads(object):
+        """Stream returning at most two bytes per read, like a pipe would"""
+        def __init__(self, data):
+            self.data = io.BytesIO(data)
+
+        def read(self, size):
+            return self.data.read(min(size, 2))
+
+    data = ShortReads(b'foobar')
+    assert read_bytes(data, 5) == b'fooba'
+    with pytest.raises(TruncatedFile):
+        read_bytes(data, 2)
+
+
 def test_read_bytes_padded():
     data = io.BytesIO(b'spam')
     assert read_bytes_padded(data, 4) == b'spam'
@@ -187,7 +263,8 @@ def test_read_bytes_padded():
         read_bytes_padded(data, 3)
 
 
-def test_decode_simple_struct():
+@decoders
+def test_decode_simple_struct(decode):
     schema = [
         ('rawbytes', RawBytes(12), b''),
         ('int32s', IntField(32, True), 0),
@@ -204,7 +281,7 @@ def test_decode_simple_struct():
     stream.write(struct.pack('>H', 789))
 
     stream.seek(0)
-    decoded = struct_decode(schema, stream, '>')
+    decoded = decode(schema, stream, '>')
 
     assert decoded['rawbytes'] == b'Hello world!'
     assert decoded['int32s'] == -1234
@@ -245,6 +322,17 @@ def test_read_options_2():
     ]
 
 
+def test_read_options_bare_end_marker():
+    # The end marker may come without its length
+    data = io.BytesIO(b'\x01\x00\x04\x00abcd' b'\x00\x00')
+    assert read_options(data, '<') == [(1, b'abcd')]
+
+    data = io.BytesIO(b'\x01\x00\x04\x00abcd' b'\x00')
+    with pytest.raises(TruncatedFile) as excinfo:
+        read_options(data, '<')
+    assert str(excinfo.value) == 'Trying to read 2 bytes, only got 1'
+
+
 def test_options_object():
     schema = [
         Option(2, 'spam', 'bytes'),
@@ -313,7 +401,64 @@ def test_options_object():
     assert 12345 not in options
 
 
-def test_unpack_dummy_packet():
+def test_options_decoded_lazily():
+    schema = [
+        Option(2, 'flags', 'epb_flags'),
+        Option(3, 'eggs', 'u32'),
+    ]
+    raw_options = [
+        (1, b'A comment'),
+        (2, b'\x01\x00\x00\x00'),
+        (3, b'\x00\x01'),  # Invalid: too short for an u32
+    ]
+    options = Options(schema=schema, data=raw_options, endianness='<')
+
+    # Nothing gets decoded until accessed
+    assert len(options) == 3
+    assert 'eggs' in options
+    assert options.get_raw('eggs') == b'\x00\x01'
+    with pytest.raises(struct.error):
+        options['eggs']
+
+    flags = options['flags']
+    assert flags.inout == 'inbound'
+    assert options['flags'] is flags  # Memoized
+    assert options.get_raw('flags') == b'\x01\x00\x00\x00'
+
+    options.add('opt_comment', 'Another comment')
+    assert options.get_all('opt_comment') == ['A comment', 'Another comment']
+
+
+def test_options_data_decoded():
+    schema = [Option(3, 'eggs', 'u32')]
+    options = Options(schema=schema, data=[
+        (1, b'A comment'), (3, b'\x01\x00\x00\x00'), (5, b'raw')],
+        endianness='<')
+    assert options.data == {1: ['A comment'], 3: [1], 5: [b'raw']}
+    assert options.get_raw('eggs') == b'\x01\x00\x00\x00'
+
+
+def test_options_schema_shared():
+    schema = [Option(2, 'spam', 'bytes')]
+    field = OptionsField(schema)
+    first = field.load(io.BytesIO(b'\x00\x02\x00\x01x\x00\x00\x00'), '>')
+    second = field.load(io.BytesIO(b''), '>')
+    assert first['spam'] == b'x'
+    assert first.schema is second.schema
+    assert first.schema is field.compiled_schema.options
+    assert first.schema[1].name == 'opt_comment'
+    assert OptionsSchema.compile(schema).codes['spam'] == 2
+    assert OptionsSchema.compile(field.compiled_schema) is \
+        field.compiled_schema
+    # Ad-hoc schemas are compiled on their own
+    assert Options(schema, [], '<').schema == first.schema
+
+    with pytest.raises(TypeError):
+        Options([(3, 'eggs')], [], '<')
+
+
+@decoders
+def test_unpack_dummy_packet(decode):
     schema = [
         ('a_string', RawBytes(8), ''),
         ('a_number', IntField(32, False), 0),
@@ -368,7 +513,7 @@ def test_unpack_dummy_packet():
         b'\xaa\xbb\xcc\xdd'
     )
 
-    unpacked = struct_decode(schema, data, endianness='>')
+    unpacked = decode(schema, data, endianness='>')
     assert unpacked['a_string'] == b'\x01\x23\x45\x67\x89\xab\xcd\xef'
     assert unpacked['a_number'] == 0x100
 
@@ -392,3 +537,55 @@ def test_unpack_dummy_packet():
         {'type': 2,
             'address': '11:2233:4455:6677:8899:aabb:ccdd:eeff',
          'names': ['v6.example.net']}]
+
+
+def test_compile_schema_fuses_int_fields():
+    schema = [
+        ('a', IntField(8, False), 0),
+        ('b', IntField(8, True), 0),
+        ('c', IntField(16, False), 0),
+        ('e', IntField(64, True), 0),
+        ('raw', RawBytes(3), b''),
+        ('d', IntField(32, True), 0),
+    ]
+    reads = []
+
+    class Stream(io.BytesIO):
+        def read(self, size=-1):
+            reads.append(size)
+            return super(Stream, self).read(size)
+
+    data = (struct.pack('<BbHq', 1, -2, 3, -5) + b'xyz\x00' +
+            struct.pack('<i', -4))
+    decoded = compile_schema(schema)(Stream(data), '<')
+    assert decoded == {'a': 1, 'b': -2, 'c': 3, 'e': -5, 'raw': b'xyz',
+                       'd': -4}
+    assert reads[0] == 12  # a, b, c and e read at once
+
+
+def test_compile_schema_not_cached():
+    schema = [('a', IntField(32, False), 0)]
+    assert compile_schema(schema) is not compile_schema(schema)
+
+
+def test_compile_schema_truncated():
+    schema = [('a', IntField(32, False), 0), ('b', IntField(32, False), 0)]
+    with pytest.raises(StreamEmpty):
+        compile_schema(schema)(io.BytesIO(b''), '<')
+    with pytest.raises(TruncatedFile):
+        compile_schema(schema)(io.BytesIO(b'\x00' * 6), '<')
+
+
+def test_compile_schema_headers_only():
+    schema = [
+        ('captured_len', IntField(32, False), 0),
+        ('packet_data', PacketBytes('captured_len'), b''),
+        ('after', IntField(32, False), 0),
+    ]
+    data = struct.pack('>I', 5) + b'hello\x00\x00\x00' + struct.pack('>I', 7)
+    decoded = compile_schema(schema, headers_only=True)(io.BytesIO(data), '>')
+    assert isinstance(decoded['packet_data'], SkippedData)
+    assert len(decoded['packet_data']) == 5
+    assert decoded['after'] == 7
+    decoded = compile_schema(schema)(io.BytesIO(data), '>')
+    assert decoded['packet_data'] == b'hello'
@@ -1,8 +1,13 @@
+from array import array
+
+import pytest
+
 from six import int2byte
 
 from pcapng.utils import (
-    pack_timestamp_resolution, unpack_euiaddr, unpack_ipv4, unpack_ipv6,
-    unpack_macaddr, unpack_timestamp_resolution)
+    TimestampConverter, pack_timestamp_resolution, split_timestamps_to_ns,
+    timestamp_to_ns, unpack_euiaddr, unpack_ipv4, unpack_ipv6, unpack_macaddr,
+    unpack_timestamp_resolution)
 
 
 def test_unpack_ipv4():
@@ -49,3 +54,49 @@ def test_pack_tsresol():
     assert pack_timestamp_resolution(2, 0b00000011) == int2byte(0b10000011)
     assert pack_timestamp_resolution(2, 0b00000100) == int2byte(0b10000100)
     assert pack_timestamp_resolution(2, 0b00111100) == int2byte(0b10111100)
+
+
+def test_timestamp_to_ns():
+    assert timestamp_to_ns(1420070400123456) == 1420070400123456000
+    assert timestamp_to_ns(1420070400123456789, int2byte(9)) == \
+        1420070400123456789
+    assert timestamp_to_ns(1420070400, int2byte(0)) == 1420070400000000000
+    assert timestamp_to_ns(14200704001234567891, int2byte(10)) == \
+        1420070400123456789
+    assert timestamp_to_ns(3 << 20, int2byte(20 | 0b10000000)) == \
+        3000000000
+    assert timestamp_to_ns(1, int2byte(1 | 0b10000000)) == 500000000
+
+
+def test_timestamp_converter():
+    assert TimestampConverter().scale == (1000, 0, 1)
+    assert TimestampConverter(int2byte(0)).scale == (10 ** 9, 0, 1)
+    assert TimestampConverter(int2byte(9)).scale == (1, 0, 1)
+    assert TimestampConverter(int2byte(12)).scale == (1, 0, 1000)
+    assert TimestampConverter(int2byte(40 | 0b10000000)).scale == \
+        (10 ** 9, 40, 1)
+    converter = TimestampConverter(int2byte(40 | 0b10000000))
+    assert converter.to_ns(2 ** 64 - 1) == ((2 ** 64 - 1) * 10 ** 9) >> 40
+    assert TimestampConverter().resolution == 1e-6
+    assert TimestampConverter(int2byte(9)).resolution == 1e-9
+    with pytest.raises(ValueError):
+        timestamp_to_ns(1, b'\x09\x00')
+
+
+def test_timestamp_converter_offset():
+    converter = TimestampConverter(int2byte(9), tsoffset=1420070400)
+    assert converter.to_ns(123456789) == 1420070400123456789
+    assert converter.split_to_ns(0, 123456789) == 1420070400123456789
+    converter = TimestampConverter(tsoffset=-1)
+    assert converter.to_ns(1) == -999999000
+
+
+def test_split_timestamps_to_ns():
+    timestamps = [0, 1420070400123456789, 1420070400123456790, 2 ** 62 + 1]
+    highs = array('I', [ts >> 32 for ts in timestamps])
+    lows = array('I', [ts & 0xffffffff for ts in timestamps])
+    found = split_timestamps_to_ns(highs, lows, int2byte(9), 5)
+    assert found.typecode == 'q'
+    assert list(found) == [ts + 5 * 10 ** 9 for ts in timestamps]
+    assert list(split_timestamps_to_ns([0, 1], [2, 3])) == \
+        [2000, (1 << 32) * 1000 + 3000]
@@ -0,0 +1,107 @@
+import glob
+import io
+
+import pytest
+
+import pcapng.strictness as strictness
+from pcapng import FileScanner
+from pcapng.blocks import (
+    BasePacketBlock, EnhancedPacket, InterfaceDescription, ObsoletePacket,
+    SectionHeader, SimplePacket)
+from pcapng.constants.block_types import BLK_ENHANCED_PACKET
+from pcapng.views import PacketView
+
+from conftest import write_capture
+
+
+SAMPLE_FILES = sorted(
+    name for name in glob.glob('test_data/*.ntar')
+    if name != 'test_data/test006.ntar')
+
+
+def _summarize(packet):
+    timestamp = options = None
+    if getattr(packet, 'timestamp_high', None) is not None:
+        # Not a simple packet
+        timestamp = packet.timestamp_ns
+        options = repr(packet.options)
+    return (timestamp, packet.interface_id, packet.captured_len,
+            packet.packet_len, bytes(packet.packet_data), options)
+
+
+@pytest.mark.parametrize('filename', SAMPLE_FILES)
+def test_views_match_blocks(filename):
+    with open(filename, 'rb') as fp:
+        expected = [_summarize(block) for block in FileScanner(fp)
+                    if isinstance(block, BasePacketBlock)]
+    found = []
+    with open(filename, 'rb') as fp:
+        for block in FileScanner(fp).iter_views():
+            if isinstance(block, PacketView):
+                found.append(_summarize(block))
+                assert _summarize(block.freeze()) == found[-1]
+    assert found == expected
+
+
+def test_views_reused(capture):
+    with open(capture, 'rb') as fp:
+        views = [block for block in FileScanner(fp).iter_views()
+                 if isinstance(block, PacketView)]
+    assert len(views) > 1
+    assert all(view is views[0] for view in views)
+    assert views[0].block_type == BLK_ENHANCED_PACKET
+
+
+def test_view_fields():
+    stream = io.BytesIO()
+    written = write_capture(stream, sections=2, packets=3)
+    stream.seek(0)
+    found = []
+    frozen = []
+    for block in FileScanner(stream).iter_views():
+        if isinstance(block, PacketView):
+            found.append((block.interface_id,
+                          (block.timestamp_high << 32) + block.timestamp_low,
+                          block.timestamp_ns, bytes(block.packet_data)))
+            frozen.append(block.freeze())
+    assert found == [(interface_id, timestamp, timestamp * 1000, data)
+                     for _, interface_id, timestamp, data in written]
+    # Frozen packets outlive the view
+    assert all(isinstance(packet, EnhancedPacket) for packet in frozen)
+    assert [bytes(packet.packet_data) for packet in frozen] == \
+        [data for _, _, _, data in written]
+
+
+def test_simple_and_obsolete_views(monkeypatch):
+    # Allow writing an obsolete packet
+    monkeypatch.setattr(strictness, 'strictness', strictness.STRICTNESS_NONE)
+    stream = io.BytesIO()
+    shb = SectionHeader()
+    shb.write(stream)
+    shb.new_member(InterfaceDescription, link_type=1, snaplen=4).write(stream)
+    shb.new_member(SimplePacket, packet_data=b'abcdef').write(stream)
+    shb.new_member(ObsoletePacket, interface_id=0, drops_count=1,
+                   timestamp_high=0, timestamp_low=5,
+                   packet_data=b'ab').write(stream)
+    stream.seek(0)
+    views = [block for block in FileScanner(stream).iter_views()
+             if isinstance(block, PacketView)]
+    assert len(views) == 2
+    spb, opb = views
+    assert spb.packet_len == 6
+    assert spb.captured_len == 4
+    assert bytes(spb.packet_data) == b'abcd'
+    assert spb.timestamp_ns is None
+    with pytest.raises(AttributeError):
+        spb.options
+    assert isinstance(spb.freeze(), SimplePacket)
+    assert opb.timestamp_ns == 5000
+    assert bytes(opb.packet_data) == b'ab'
+    assert isinstance(opb.freeze(), ObsoletePacket)
+
+
+def test_view_errors():
+    with pytest.raises(ValueError):
+        PacketView(0x0A0D0D0A)
+    with pytest.raises(ValueError):
+        PacketView(BLK_ENHANCED_PACKET).freeze()
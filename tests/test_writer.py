@@ -0,0 +1,112 @@
+import glob
+import io
+import struct
+
+import pytest
+
+import pcapng.strictness as strictness
+from pcapng import FileScanner, FileWriter
+from pcapng.blocks import (
+    EnhancedPacket, InterfaceDescription, InterfaceStatistics, SectionHeader,
+    UnknownBlock)
+
+from conftest import write_capture
+
+
+SAMPLE_FILES = sorted(
+    name for name in glob.glob('test_data/*.ntar')
+    if name != 'test_data/test006.ntar')
+
+
+def _summarize(block):
+    values = []
+    for name, field, default in getattr(block, 'schema', []):
+        value = getattr(block, name)
+        if isinstance(value, memoryview):
+            value = value.tobytes()
+        elif name == 'options':
+            value = repr(value)
+        values.append((name, value))
+    return type(block), values
+
+
+def test_writer_matches_block_write():
+    stream = io.BytesIO()
+    write_capture(stream, sections=2, packets=10)
+    blocks = list(FileScanner(io.BytesIO(stream.getvalue())))
+    blocks[3].options['opt_comment'] = 'comment'
+    blocks[4].options['epb_flags'] = 1
+
+    expected = io.BytesIO()
+    for block in blocks:
+        block.write(expected)
+    out = io.BytesIO()
+    with FileWriter(out, buffer_size=100) as writer:
+        writer.write_blocks(blocks)
+    assert out.getvalue() == expected.getvalue()
+
+
+@pytest.mark.parametrize('filename', SAMPLE_FILES)
+def test_writer_round_trip(filename, monkeypatch):
+    # Write the sample files as they are
+    monkeypatch.setattr(strictness, 'strictness', strictness.STRICTNESS_NONE)
+    with open(filename, 'rb') as fp:
+        blocks = list(FileScanner(fp))
+    out = io.BytesIO()
+    writer = FileWriter(out)
+    writer.write_blocks(blocks)
+    writer.close()
+    found = [_summarize(block)
+             for block in FileScanner(io.BytesIO(out.getvalue()))]
+    assert found == [_summarize(block) for block in blocks]
+
+
+def test_writer_big_endian():
+    shb = SectionHeader(endianness='>')
+    idb = shb.new_member(InterfaceDescription, link_type=1, options={
+        'if_tsresol': b'\x09'})
+    epb = shb.new_member(EnhancedPacket, interface_id=0, timestamp_high=1,
+                         timestamp_low=2, packet_data=b'abcde',
+                         options={'opt_comment': 'hello'})
+    isb = shb.new_member(InterfaceStatistics, interface_id=0,
+                         timestamp_high=1, timestamp_low=3)
+    out = io.BytesIO()
+    with FileWriter(out) as writer:
+        writer.write_blocks([shb, idb, epb, isb,
+                             UnknownBlock(0x80000001, b'data')])
+    data = out.getvalue()
+    assert data[8:12] == b'\x1a\x2b\x3c\x4d'
+
+    blocks = list(FileScanner(io.BytesIO(data)))
+    assert blocks[0].endianness == '>'
+    assert blocks[2].timestamp_ns == (1 << 32) + 2
+    assert blocks[2].packet_data == b'abcde'
+    assert blocks[2].options['opt_comment'] == 'hello'
+    assert blocks[3].timestamp_low == 3
+    assert blocks[4].block_type == 0x80000001
+    assert blocks[4].data == b'data'
+    assert struct.unpack('>I', data[-4:])[0] == 16
+
+
+def test_writer_buffering():
+    shb = SectionHeader()
+    shb.new_member(InterfaceDescription, link_type=1)
+    out = io.BytesIO()
+    writer = FileWriter(out, buffer_size=1000)
+    writer.write_block(shb)
+    writer.write_block(shb.interfaces[0])
+    assert out.getvalue() == b''
+    for num in range(20):
+        writer.write_block(shb.new_member(
+            EnhancedPacket, interface_id=0, packet_data=b'x' * 100))
+    assert 1000 <= len(out.getvalue()) < 20 * 128
+    writer.flush()
+    assert len(list(FileScanner(io.BytesIO(out.getvalue())))) == 22
+
+
+def test_writer_skipped_data(capture):
+    with open(capture, 'rb') as fp:
+        blocks = list(FileScanner(fp, headers_only=True))
+    packets = [block for block in blocks if isinstance(block, EnhancedPacket)]
+    with pytest.raises(ValueError):
+        FileWriter(io.BytesIO()).write_block(packets[0])
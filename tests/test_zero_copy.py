@@ -0,0 +1,82 @@
+import glob
+import io
+import struct
+
+import pytest
+
+from pcapng.blocks import (
+    BasePacketBlock, InterfaceDescription, SectionHeader, SimplePacket,
+    UnknownBlock)
+from pcapng.scanner import BlockParser, FileScanner
+from pcapng.views import PacketView
+
+from conftest import write_capture
+
+
+SAMPLE_FILES = sorted(
+    name for name in glob.glob('test_data/*.ntar')
+    if name != 'test_data/test006.ntar')
+
+
+def _summarize(block):
+    values = []
+    for name, field, default in getattr(block, 'schema', []):
+        value = getattr(block, name)
+        if isinstance(value, memoryview):
+            value = value.tobytes()
+        elif name == 'options':
+            value = repr(value)
+        values.append((name, value))
+    return type(block), values
+
+
+@pytest.mark.parametrize('filename', SAMPLE_FILES)
+def test_zero_copy_matches_copies(filename):
+    with open(filename, 'rb') as fp:
+        expected = [_summarize(block) for block in FileScanner(fp)]
+
+    with open(filename, 'rb') as fp:
+        blocks = list(FileScanner(fp, buffer_size=64, zero_copy=True))
+    assert [_summarize(block) for block in blocks] == expected
+    for block in blocks:
+        if isinstance(block, BasePacketBlock):
+            assert isinstance(block.packet_data, memoryview)
+        elif isinstance(block, InterfaceDescription):
+            assert not any(isinstance(value, memoryview)
+                           for value in block.options.values())
+
+
+def test_zero_copy_simple_and_unknown_blocks():
+    stream = io.BytesIO()
+    shb = SectionHeader()
+    shb.write(stream)
+    shb.new_member(InterfaceDescription, link_type=1).write(stream)
+    shb.new_member(SimplePacket, packet_data=b'abcdef').write(stream)
+    stream.write(struct.pack('<II', 0x80000001, 16) + b'data' +
+                 struct.pack('<I', 16))
+    data = stream.getvalue()
+
+    parser = BlockParser(zero_copy=True)
+    blocks = parser.feed(data)
+    parser.close()
+    assert isinstance(blocks[2], SimplePacket)
+    assert isinstance(blocks[2].packet_data, memoryview)
+    assert blocks[2].packet_data == b'abcdef'
+    assert isinstance(blocks[3], UnknownBlock)
+    assert isinstance(blocks[3].data, memoryview)
+    assert blocks[3].data == b'data'
+
+    blocks = BlockParser().feed(data)
+    assert isinstance(blocks[2].packet_data, bytes)
+    assert isinstance(blocks[3].data, bytes)
+
+
+def test_zero_copy_views():
+    stream = io.BytesIO()
+    written = write_capture(stream, packets=5)
+    stream.seek(0)
+    frozen = [block.freeze()
+              for block in FileScanner(stream, zero_copy=True).iter_views()
+              if isinstance(block, PacketView)]
+    assert [bytes(packet.packet_data) for packet in frozen] == \
+        [data for _, _, _, data in written]